@@ -0,0 +1,31 @@
+# actualizar_cubo.py
+# Actualiza el cubo de circulación (analitica.py) con los préstamos nuevos y devueltos
+#
+# Ejecutar: python actualizar_cubo.py [--reconstruir]
+# Conviene programarlo (por ejemplo cada hora) para que /api/reportes/cubo
+# solo tenga que leer los préstamos de los últimos minutos:
+#   0 * * * * cd /ruta/ProyectoDemoBiblioteca && python actualizar_cubo.py
+
+import argparse
+import sys
+from analitica import cubo_circulacion
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Actualiza el cubo de circulación')
+    parser.add_argument('--reconstruir', action='store_true', help='Recalcular el cubo desde cero')
+    args = parser.parse_args()
+
+    resumen = cubo_circulacion.actualizar(reconstruir=args.reconstruir)
+    estado = cubo_circulacion.estado()
+    print(f"Cubo {'reconstruido' if resumen['reconstruido'] else 'actualizado'} en {resumen['segundos']:.2f} s: "
+          f"{resumen['nuevos']} préstamo(s) nuevo(s), {resumen['devueltos']} devuelto(s); "
+          f"último PrestamoID {estado['ultimo_prestamo_id']}, {estado['prestamos_pendientes']} pendiente(s), "
+          f"forma {'×'.join(map(str, estado['forma']))} ({cubo_circulacion.archivo})")
+    if resumen['error']:
+        print(f"[ERROR] {resumen['error']}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+# acumular_multas.py
+# Proceso nocturno: acumula las multas de los préstamos vencidos
+#
+# Ejecutar: python acumular_multas.py [--fecha AAAA-MM-DD] [--lote 5000]
+# Programarlo una vez al día (cron o el Programador de tareas de Windows), por ejemplo:
+#   5 0 * * * cd /ruta/ProyectoDemoBiblioteca && python acumular_multas.py
+
+import argparse
+import sys
+from datetime import date
+from controllers import PrestamoController
+from instrumentacion import perfilar
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Acumula las multas de los préstamos vencidos')
+    parser.add_argument('--fecha', type=date.fromisoformat, default=None,
+                        help='Fecha de cálculo (AAAA-MM-DD, por defecto hoy)')
+    parser.add_argument('--lote', type=int, default=5000, help='Préstamos actualizados por transacción')
+    args = parser.parse_args()
+
+    with perfilar('acumular_multas') as perfil:
+        resumen = PrestamoController().acumular_multas(fecha=args.fecha, tamano_lote=args.lote)
+
+    print(f"Multas al {resumen['fecha']}: {resumen['filas']} préstamo(s) actualizado(s) "
+          f"en {resumen['lotes']} lote(s), {resumen['segundos']:.2f} s "
+          f"({perfil.consultas} consultas, {perfil.segundos_bd:.2f} s en la base de datos)")
+    if resumen['error']:
+        print(f"[ERROR] {resumen['error']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+# analitica.py
+# Cubo de circulación (mes × categoría × nacionalidad del autor) calculado con NumPy
+#
+# Requiere numpy; app.py importa este módulo solo al consultar /api/reportes/cubo
+
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import select, func, cast, Float
+from config import config
+from database import db
+from models import Prestamo, Libro, Autor, Categoria
+
+DIMENSIONES = ('mes', 'categoria', 'nacionalidad')
+SIN_NACIONALIDAD = 'Sin dato'
+VERSION_ARCHIVO = 1
+
+# Préstamos por consulta al leer hechos nuevos
+TAMANO_BLOQUE = 50000
+# Préstamos pendientes por IN (...): SQL Server admite unos 2100 parámetros por sentencia
+TAMANO_LOTE_PENDIENTES = 1000
+
+# Medidas del cubo: conteos enteros y sumas en coma flotante
+_CONTEOS = ('prestamos', 'devueltos', 'tardios')
+_SUMAS = ('dias', 'multas')
+
+
+def _columnas(filas, cantidad):
+    """Transpone las filas de un resultado en `cantidad` tuplas por columna"""
+    return tuple(zip(*filas)) if filas else ((),) * cantidad
+
+
+class CuboCirculacion:
+    """
+    Cubo de circulación en arrays de NumPy con forma (meses, categorías,
+    nacionalidades) y las medidas: préstamos, devueltos, días prestados
+    (suma), devoluciones tardías y multas.
+
+    Los hechos se leen por bloques de PrestamoID y se agregan con
+    np.bincount sobre el índice plano de la celda. El cubo se guarda en un
+    .npz y se actualiza de forma incremental: los préstamos con PrestamoID
+    mayor al último procesado se suman, y los que estaban abiertos se
+    vuelven a consultar por ID para sumar duración, retraso y multa cuando
+    se devuelven (la multa es definitiva al cerrar el préstamo).
+    """
+
+    def __init__(self, archivo=None, tamano_bloque=TAMANO_BLOQUE):
+        self.archivo = archivo or config.ARCHIVO_CUBO_CIRCULACION
+        self.tamano_bloque = tamano_bloque
+        self._lock = threading.Lock()
+        self._estado = None
+
+    # ---------- Estado y archivo ----------
+
+    @staticmethod
+    def _vacio():
+        estado = {
+            'meses': np.zeros(0, dtype=np.int64),          # meses desde 1970-01 (datetime64[M])
+            'categorias': np.zeros(0, dtype=np.int64),     # CategoriaID
+            'nacionalidades': np.zeros(0, dtype='U50'),
+            'ultimo_id': 0,
+            'pendientes_ids': np.zeros(0, dtype=np.int64),         # préstamos abiertos, ordenados
+            'pendientes_celdas': np.zeros((0, 3), dtype=np.int64),  # su celda (mes, categoría, nacionalidad)
+        }
+        for nombre in _CONTEOS:
+            estado[nombre] = np.zeros((0, 0, 0), dtype=np.int64)
+        for nombre in _SUMAS:
+            estado[nombre] = np.zeros((0, 0, 0), dtype=np.float64)
+        return estado
+
+    def _cargar(self):
+        """Lee el cubo del archivo (o uno vacío si no existe o es de otra versión)"""
+        if not os.path.exists(self.archivo):
+            return self._vacio()
+        try:
+            with np.load(self.archivo, allow_pickle=False) as datos:
+                if int(datos['version']) != VERSION_ARCHIVO:
+                    return self._vacio()
+                estado = {clave: datos[clave] for clave in datos.files if clave != 'version'}
+            estado['ultimo_id'] = int(estado['ultimo_id'])
+            return estado
+        except Exception as e:
+            print(f"Error al leer el cubo de circulación ({self.archivo}): {e}")
+            return self._vacio()
+
+    def _guardar(self):
+        """Escribe el cubo en un archivo temporal y lo reemplaza de forma atómica"""
+        directorio = os.path.dirname(self.archivo)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = f"{self.archivo}.{os.getpid()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            np.savez(archivo, version=VERSION_ARCHIVO, **self._estado)
+        os.replace(temporal, self.archivo)
+
+    def _asegurar_cargado(self):
+        if self._estado is None:
+            self._estado = self._cargar()
+
+    # ---------- Agregación ----------
+
+    def _indices(self, dimension, valores):
+        """
+        Traduce los valores de una dimensión a su posición en el eje del
+        cubo, agregando al final los valores nuevos
+
+        Returns:
+            ndarray: Posición de cada valor
+        """
+        etiquetas = self._estado[dimension]
+        unicos, inversos = np.unique(valores, return_inverse=True)
+        posiciones = {valor: i for i, valor in enumerate(etiquetas.tolist())}
+        nuevos = [valor for valor in unicos.tolist() if valor not in posiciones]
+        if nuevos:
+            for valor in nuevos:
+                posiciones[valor] = len(posiciones)
+            self._estado[dimension] = np.concatenate([etiquetas, np.array(nuevos, dtype=etiquetas.dtype)])
+            self._crecer()
+        return np.array([posiciones[valor] for valor in unicos.tolist()], dtype=np.int64)[inversos]
+
+    def _crecer(self):
+        """Amplía las medidas con ceros hasta el tamaño actual de las dimensiones"""
+        forma = tuple(len(self._estado[d]) for d in ('meses', 'categorias', 'nacionalidades'))
+        for nombre in _CONTEOS + _SUMAS:
+            medida = self._estado[nombre]
+            if medida.shape != forma:
+                self._estado[nombre] = np.pad(medida, [(0, n - actual) for n, actual in zip(forma, medida.shape)])
+
+    def _acumular(self, celdas, devuelto, dias, tardio, multas, contar_prestamos):
+        """Suma un bloque de hechos a las celdas (array (n, 3)) con np.bincount"""
+        forma = self._estado['prestamos'].shape
+        tamano = int(np.prod(forma))
+        planos = np.ravel_multi_index(celdas.T, forma)
+        cerrados = planos[devuelto]
+
+        sumas = {
+            'prestamos': np.bincount(planos, minlength=tamano) if contar_prestamos else None,
+            'devueltos': np.bincount(cerrados, minlength=tamano),
+            'tardios': np.bincount(planos[devuelto & tardio], minlength=tamano),
+            'dias': np.bincount(cerrados, weights=dias[devuelto], minlength=tamano),
+            'multas': np.bincount(cerrados, weights=multas[devuelto], minlength=tamano),
+        }
+        for nombre, suma in sumas.items():
+            if suma is not None:
+                self._estado[nombre] += suma.reshape(forma).astype(self._estado[nombre].dtype)
+
+    @staticmethod
+    def _medidas(fecha_prestamo, esperada, real, multa):
+        """
+        Calcula las medidas por préstamo de forma vectorizada
+
+        Returns:
+            tuple: (devuelto, dias, tardio, multas) como arrays
+        """
+        fecha_prestamo = np.array(fecha_prestamo, dtype='datetime64[s]')
+        real = np.array(real, dtype='datetime64[s]')
+        devuelto = ~np.isnat(real)
+        dias = np.where(devuelto, (real - fecha_prestamo) / np.timedelta64(1, 'D'), 0.0)
+        tardio = devuelto & (real.astype('datetime64[D]') > np.array(esperada, dtype='datetime64[D]'))
+        return devuelto, dias, tardio, np.array(multa, dtype=np.float64)
+
+    # ---------- Lectura de hechos ----------
+
+    def _procesar_nuevos(self, session):
+        """Agrega los préstamos con PrestamoID mayor al último procesado; retorna cuántos"""
+        consulta = select(
+            Prestamo.PrestamoID, Prestamo.FechaPrestamo, Prestamo.FechaDevolucionEsperada,
+            Prestamo.FechaDevolucionReal, cast(func.coalesce(Prestamo.Multa, 0), Float),
+            Libro.CategoriaID, func.coalesce(Autor.Nacionalidad, '')
+        ).join(Libro, Prestamo.LibroID == Libro.LibroID).join(
+            Autor, Libro.AutorID == Autor.AutorID
+        ).order_by(Prestamo.PrestamoID).limit(self.tamano_bloque)
+
+        total = 0
+        while True:
+            filas = session.execute(consulta.where(Prestamo.PrestamoID > self._estado['ultimo_id'])).all()
+            if not filas:
+                return total
+            ids, fechas, esperadas, reales, multas, categorias, nacionalidades = _columnas(filas, 7)
+
+            ids = np.array(ids, dtype=np.int64)
+            fecha_prestamo = np.array(fechas, dtype='datetime64[s]')
+            celdas = np.column_stack([
+                self._indices('meses', fecha_prestamo.astype('datetime64[M]').astype(np.int64)),
+                self._indices('categorias', np.array(categorias, dtype=np.int64)),
+                self._indices('nacionalidades', np.array([n.strip() or SIN_NACIONALIDAD for n in nacionalidades],
+                                                         dtype='U50')),
+            ])
+            devuelto, dias, tardio, multa = self._medidas(fecha_prestamo, esperadas, reales, multas)
+            self._acumular(celdas, devuelto, dias, tardio, multa, contar_prestamos=True)
+
+            # Los abiertos se guardan con su celda para sumarlos al devolverse
+            abiertos = ~devuelto
+            self._estado['pendientes_ids'] = np.concatenate([self._estado['pendientes_ids'], ids[abiertos]])
+            self._estado['pendientes_celdas'] = np.concatenate([self._estado['pendientes_celdas'], celdas[abiertos]])
+            self._estado['ultimo_id'] = int(ids[-1])
+            total += len(ids)
+
+    def _procesar_devueltos(self, session):
+        """Suma duración, retraso y multa de los préstamos pendientes ya devueltos; retorna cuántos"""
+        pendientes = self._estado['pendientes_ids']
+        cerrados = []
+        for inicio in range(0, len(pendientes), TAMANO_LOTE_PENDIENTES):
+            lote = pendientes[inicio:inicio + TAMANO_LOTE_PENDIENTES].tolist()
+            cerrados += session.execute(
+                select(Prestamo.PrestamoID, Prestamo.FechaPrestamo, Prestamo.FechaDevolucionEsperada,
+                       Prestamo.FechaDevolucionReal, cast(func.coalesce(Prestamo.Multa, 0), Float))
+                .where(Prestamo.PrestamoID.in_(lote), Prestamo.FechaDevolucionReal.isnot(None))
+            ).all()
+        if not cerrados:
+            return 0
+
+        ids, fechas, esperadas, reales, multas = _columnas(cerrados, 5)
+        ids = np.array(ids, dtype=np.int64)
+        posiciones = np.searchsorted(pendientes, ids)
+        devuelto, dias, tardio, multa = self._medidas(fechas, esperadas, reales, multas)
+        self._acumular(self._estado['pendientes_celdas'][posiciones], devuelto, dias, tardio, multa,
+                       contar_prestamos=False)
+
+        restantes = np.ones(len(pendientes), dtype=bool)
+        restantes[posiciones] = False
+        self._estado['pendientes_ids'] = pendientes[restantes]
+        self._estado['pendientes_celdas'] = self._estado['pendientes_celdas'][restantes]
+        return len(ids)
+
+    # ---------- API pública ----------
+
+    def actualizar(self, reconstruir=False):
+        """
+        Incorpora al cubo los préstamos nuevos y las devoluciones desde la
+        última actualización, y lo guarda en disco si hubo cambios
+
+        Args:
+            reconstruir (bool): Descartar el cubo y recalcularlo desde cero
+
+        Returns:
+            dict: nuevos, devueltos, reconstruido, segundos y error (None si todo fue bien)
+        """
+        inicio = time.perf_counter()
+        resumen = {'nuevos': 0, 'devueltos': 0, 'reconstruido': reconstruir, 'segundos': 0.0, 'error': None}
+        with self._lock:
+            self._asegurar_cargado()
+            session = db.obtener_sesion()
+            try:
+                # Si el último ID procesado ya no existe, la base fue recreada
+                maximo = session.scalar(select(func.max(Prestamo.PrestamoID))) or 0
+                if reconstruir or maximo < self._estado['ultimo_id']:
+                    self._estado = self._vacio()
+                    resumen['reconstruido'] = True
+
+                resumen['devueltos'] = self._procesar_devueltos(session)
+                resumen['nuevos'] = self._procesar_nuevos(session)
+                if resumen['nuevos'] or resumen['devueltos'] or resumen['reconstruido']:
+                    self._guardar()
+            except Exception as e:
+                print(f"Error al actualizar el cubo de circulación: {e}")
+                resumen['error'] = str(e)
+                # Lo procesado a medias no se guardó: se vuelve al último estado en disco
+                self._estado = None
+            finally:
+                db.liberar_sesion(session)
+        resumen['segundos'] = time.perf_counter() - inicio
+        return resumen
+
+    def consultar(self, agrupar=DIMENSIONES, desde=None, hasta=None):
+        """
+        Obtiene las celdas no vacías del cubo, agregadas por las dimensiones pedidas
+
+        Args:
+            agrupar (iterable): Subconjunto de DIMENSIONES; las demás se suman
+            desde (str): Primer mes incluido (AAAA-MM)
+            hasta (str): Último mes incluido (AAAA-MM)
+
+        Returns:
+            list: Diccionarios con las dimensiones pedidas y prestamos,
+                devueltos, duracion_promedio (días), proporcion_tardios y multas
+        """
+        agrupar = [d for d in DIMENSIONES if d in agrupar]
+        with self._lock:
+            self._asegurar_cargado()
+            estado = self._estado
+            meses = estado['meses']
+            mascara = np.ones(len(meses), dtype=bool)
+            if desde:
+                mascara &= meses >= np.datetime64(desde, 'M').astype(np.int64)
+            if hasta:
+                mascara &= meses <= np.datetime64(hasta, 'M').astype(np.int64)
+
+            # Suma sobre las dimensiones no pedidas, conservando los ejes
+            ejes = tuple(i for i, d in enumerate(DIMENSIONES) if d not in agrupar)
+            medidas = {nombre: estado[nombre][mascara].sum(axis=ejes, keepdims=True)
+                       for nombre in _CONTEOS + _SUMAS}
+            etiquetas = [
+                np.datetime_as_string(meses[mascara].astype('datetime64[M]')),
+                estado['categorias'],
+                estado['nacionalidades'],
+            ]
+
+        nombres_categoria = {}
+        if 'categoria' in agrupar:
+            nombres_categoria = self._nombres_categorias()
+
+        celdas = []
+        for posicion in zip(*np.nonzero(medidas['prestamos'])):
+            devueltos = int(medidas['devueltos'][posicion])
+            celda = {}
+            for eje, dimension in enumerate(DIMENSIONES):
+                if dimension in agrupar:
+                    valor = etiquetas[eje][posicion[eje]].item()
+                    celda[dimension] = nombres_categoria.get(valor, valor) if dimension == 'categoria' else valor
+            celda.update({
+                'prestamos': int(medidas['prestamos'][posicion]),
+                'devueltos': devueltos,
+                'duracion_promedio': round(float(medidas['dias'][posicion]) / devueltos, 2) if devueltos else None,
+                'proporcion_tardios': round(int(medidas['tardios'][posicion]) / devueltos, 4) if devueltos else None,
+                'multas': round(float(medidas['multas'][posicion]), 2),
+            })
+            celdas.append(celda)
+        celdas.sort(key=lambda c: tuple(str(c[d]) for d in agrupar))
+        return celdas
+
+    def estado(self):
+        """Retorna el último PrestamoID procesado, los pendientes y el tamaño del cubo"""
+        with self._lock:
+            self._asegurar_cargado()
+            return {
+                'ultimo_prestamo_id': self._estado['ultimo_id'],
+                'prestamos_pendientes': int(len(self._estado['pendientes_ids'])),
+                'forma': list(self._estado['prestamos'].shape),
+            }
+
+    @staticmethod
+    def _nombres_categorias():
+        session = db.obtener_sesion()
+        try:
+            return dict(session.execute(select(Categoria.CategoriaID, Categoria.NombreCategoria)).tuples().all())
+        except Exception as e:
+            print(f"Error al obtener categorías: {e}")
+            return {}
+        finally:
+            db.liberar_sesion(session)
+
+
+# Instancia global usada por la API y por actualizar_cubo.py
+cubo_circulacion = CuboCirculacion()
@@ -1,10 +1,24 @@
 # app.py
 # Aplicación web Flask para el Sistema de Biblioteca
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from controllers import LibroController, UsuarioController, PrestamoController, CategoriaController, AutorController
-from datetime import datetime
-from database import db
+from flask import (Flask, Response, render_template, request, redirect, url_for, flash, jsonify,
+                   stream_with_context, g, send_from_directory)
+from werkzeug.utils import secure_filename
+from controllers import (LibroController, UsuarioController, PrestamoController, CategoriaController,
+                         AutorController, EstadisticaController, ReporteController)
+from datetime import datetime, timedelta
+from database import db, SessionContext
+from exportacion import generar_ndjson, generar_csv
+from importacion import ImportacionLibros
+from indice_busqueda import indice_libros
+from autocompletado import autocompletado
+from cache import cache_referencia
+from config import config
+import instrumentacion
+from metricas import metricas
+from consultas_lentas import consultas_lentas
+import os
+import time
 
 app = Flask(__name__)
 app.secret_key = 'biblioteca_secret_key_change_in_production_2025'
@@ -15,6 +29,114 @@ usuario_controller = UsuarioController()
 prestamo_controller = PrestamoController()
 categoria_controller = CategoriaController()
 autor_controller = AutorController()
+estadistica_controller = EstadisticaController()
+reporte_controller = ReporteController()
+
+# ==================== UNIDAD DE TRABAJO POR PETICIÓN ====================
+# Cada petición usa una sola sesión (y una sola conexión del pool) para todos
+# los controladores; la sesión se cierra al terminar la petición.
+
+@app.before_request
+def abrir_unidad_de_trabajo():
+    g.unidad_de_trabajo = SessionContext().activar()
+
+@app.teardown_appcontext
+def cerrar_unidad_de_trabajo(error=None):
+    unidad = g.pop('unidad_de_trabajo', None)
+    if unidad is not None:
+        unidad.finalizar(error)
+
+# ==================== INSTRUMENTACIÓN SQL ====================
+# Cuenta las consultas de cada petición; con INSTRUMENTACION_SQL activo las
+# expone en cabeceras X-SQL-* (X-SQL-N1 lista las SELECT sospechosas de N+1)
+
+@app.before_request
+def iniciar_perfil_sql():
+    g.perfil_sql = instrumentacion.iniciar(f"{request.method} {request.path}")
+
+@app.after_request
+def agregar_cabeceras_sql(response):
+    perfil_token = g.pop('perfil_sql', None)
+    if perfil_token is None:
+        return response
+    perfil = perfil_token[0]
+    instrumentacion.terminar(*perfil_token)
+
+    if config.INSTRUMENTACION_SQL:
+        response.headers['X-SQL-Consultas'] = str(perfil.consultas)
+        response.headers['X-SQL-Tiempo-ms'] = f"{perfil.segundos_bd * 1000:.1f}"
+        response.headers['X-SQL-Filas'] = str(perfil.filas)
+        sospechosos = perfil.sospechosos_n_mas_1()
+        if sospechosos:
+            n_mas_1 = ', '.join(
+                f"{veces}x {instrumentacion.abreviar_sentencia(sentencia, 80)}" for veces, sentencia in sospechosos
+            )
+            # Las cabeceras HTTP solo admiten latin-1
+            response.headers['X-SQL-N1'] = n_mas_1.encode('latin-1', 'replace').decode('latin-1')
+    return response
+
+@app.teardown_request
+def cerrar_perfil_sql(error=None):
+    # Si la vista falló after_request no se ejecuta
+    perfil_token = g.pop('perfil_sql', None)
+    if perfil_token is not None:
+        instrumentacion.terminar(*perfil_token)
+
+# ==================== MÉTRICAS ====================
+# Latencia por endpoint y errores; se exponen en /metrics junto con los
+# medidores del pool de conexiones y de la caché
+
+@app.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+
+@app.after_request
+def registrar_medicion(response):
+    inicio = g.pop('inicio_peticion', None)
+    if inicio is not None:
+        endpoint = request.endpoint or 'sin_ruta'
+        metricas.observar('biblioteca_http_peticion_segundos', time.perf_counter() - inicio,
+                          endpoint=endpoint, metodo=request.method)
+        metricas.incrementar('biblioteca_http_peticiones_total',
+                             endpoint=endpoint, metodo=request.method, codigo=response.status_code)
+    return response
+
+@app.teardown_request
+def registrar_error(error=None):
+    if error is not None:
+        metricas.incrementar('biblioteca_http_errores_total', endpoint=request.endpoint or 'sin_ruta',
+                             tipo=type(error).__name__)
+
+def _medidores_pool():
+    pool = db.estadisticas_pool()
+    return {(('estado', clave),): pool[clave] for clave in ('en_uso', 'en_reposo', 'overflow_en_uso') if clave in pool}
+
+def _medidores_cache():
+    cache = cache_referencia.estadisticas()
+    return {(('tipo', clave),): cache[clave] for clave in ('aciertos', 'fallos', 'invalidaciones')}
+
+# Los timeouts y las operaciones de la caché solo crecen: se exponen como
+# contadores y la tasa de aciertos se calcula en Prometheus, por ejemplo
+#   sum(rate(biblioteca_cache_operaciones_total{tipo="aciertos"}[5m]))
+#     / sum(rate(biblioteca_cache_operaciones_total{tipo=~"aciertos|fallos"}[5m]))
+metricas.medidor('biblioteca_pool_conexiones', 'Conexiones del pool por estado', _medidores_pool)
+metricas.medidor('biblioteca_pool_timeouts_total', 'Esperas del pool que agotaron el tiempo',
+                 lambda: db.estadisticas_pool().get('timeouts', 0), tipo='counter')
+metricas.medidor('biblioteca_cache_operaciones_total', 'Aciertos, fallos e invalidaciones de la caché de referencia',
+                 _medidores_cache, tipo='counter')
+
+@app.route('/metrics')
+def metrics():
+    """Métricas de la aplicación en formato de texto de Prometheus"""
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+def _parametros_pagina():
+    """Lee los parámetros de paginación keyset (?after=&before=&limit=) de la URL"""
+    return {
+        'after': request.args.get('after'),
+        'before': request.args.get('before'),
+        'limite': request.args.get('limit')
+    }
 
 # ==================== RUTAS PRINCIPALES ====================
 
@@ -22,34 +144,49 @@ autor_controller = AutorController()
 def index():
     """Página de inicio con estadísticas"""
     try:
-        # Obtener datos para el dashboard
-        libros = libro_controller.obtener_todos()
-        usuarios = usuario_controller.obtener_todos()
-        prestamos = prestamo_controller.obtener_prestamos_activos()
-        prestamos_vencidos = prestamo_controller.obtener_prestamos_vencidos()
-        disponibles = libro_controller.obtener_disponibles()
-
-        stats = {
-            'total_libros': len(libros),
-            'total_usuarios': len(usuarios),
-            'prestamos_activos': len(prestamos),
-            'prestamos_vencidos': len(prestamos_vencidos),
-            'libros_disponibles': len(disponibles)
-        }
+        # Contadores del dashboard calculados en el servidor con una sola consulta
+        stats = estadistica_controller.obtener_resumen()
 
         return render_template('index.html', stats=stats)
     except Exception as e:
         flash(f'Error al cargar estadísticas: {e}', 'danger')
         return render_template('index.html', stats={})
 
+@app.route('/reportes')
+def reportes():
+    """Reportes de circulación por período (?dias= o ?desde=&hasta=, limite=)"""
+    hoy = datetime.now().date()
+    dias = request.args.get('dias', '30')
+    try:
+        if request.args.get('desde') or request.args.get('hasta'):
+            dias = None
+            desde = datetime.strptime(request.args['desde'], '%Y-%m-%d').date() if request.args.get('desde') else None
+            hasta = datetime.strptime(request.args['hasta'], '%Y-%m-%d').date() if request.args.get('hasta') else hoy
+        elif dias == 'todo':
+            desde, hasta = None, None
+        else:
+            hasta = hoy
+            desde = hoy - timedelta(days=max(1, int(dias)) - 1)
+    except ValueError:
+        flash('Las fechas deben tener el formato AAAA-MM-DD', 'danger')
+        return redirect(url_for('reportes'))
+    if desde and hasta and desde > hasta:
+        flash('La fecha inicial no puede ser posterior a la final', 'danger')
+        return redirect(url_for('reportes'))
+
+    limite = min(max(request.args.get('limite', 10, type=int), 1), 100)
+    reporte = reporte_controller.obtener_reporte(desde, hasta, limite)
+    return render_template('reportes/index.html', reporte=reporte, desde=desde, hasta=hasta,
+                           dias=dias, limite=limite)
+
 # ==================== RUTAS DE LIBROS ====================
 
 @app.route('/libros')
 def libros_lista():
     """Lista todos los libros"""
     try:
-        libros = libro_controller.obtener_todos()
-        return render_template('libros/lista.html', libros=libros)
+        pagina = libro_controller.obtener_pagina(**_parametros_pagina())
+        return render_template('libros/lista.html', libros=pagina, pagina=pagina)
     except Exception as e:
         flash(f'Error al cargar libros: {e}', 'danger')
         return render_template('libros/lista.html', libros=[])
@@ -62,7 +199,7 @@ def libros_buscar():
         if termino:
             libros = libro_controller.buscar(termino)
         else:
-            libros = libro_controller.obtener_todos()
+            return redirect(url_for('libros_lista'))
         return render_template('libros/lista.html', libros=libros, termino_busqueda=termino)
     except Exception as e:
         flash(f'Error en la búsqueda: {e}', 'danger')
@@ -111,17 +248,8 @@ def libro_nuevo():
             flash(f'Error al crear libro: {e}', 'danger')
 
     # Obtener autores y categorías para el formulario
-    from models import Autor, Categoria
-    session = db.get_session()
-    try:
-        autores = session.query(Autor).order_by(Autor.Nombre, Autor.Apellido).all()
-        categorias = session.query(Categoria).order_by(Categoria.NombreCategoria).all()
-        for autor in autores:
-            session.expunge(autor)
-        for categoria in categorias:
-            session.expunge(categoria)
-    finally:
-        session.close()
+    autores = autor_controller.obtener_opciones()
+    categorias = categoria_controller.obtener_opciones()
 
     from datetime import datetime
     current_year = datetime.now().year
@@ -162,17 +290,8 @@ def libro_editar(libro_id):
             flash(f'Error al actualizar libro: {e}', 'danger')
 
     # Obtener autores y categorías para el formulario
-    from models import Autor, Categoria
-    session = db.get_session()
-    try:
-        autores = session.query(Autor).order_by(Autor.Nombre, Autor.Apellido).all()
-        categorias = session.query(Categoria).order_by(Categoria.NombreCategoria).all()
-        for autor in autores:
-            session.expunge(autor)
-        for categoria in categorias:
-            session.expunge(categoria)
-    finally:
-        session.close()
+    autores = autor_controller.obtener_opciones()
+    categorias = categoria_controller.obtener_opciones()
 
     from datetime import datetime
     current_year = datetime.now().year
@@ -201,8 +320,8 @@ def libro_eliminar(libro_id):
 def usuarios_lista():
     """Lista todos los usuarios"""
     try:
-        usuarios = usuario_controller.obtener_todos()
-        return render_template('usuarios/lista.html', usuarios=usuarios)
+        pagina = usuario_controller.obtener_pagina(**_parametros_pagina())
+        return render_template('usuarios/lista.html', usuarios=pagina, pagina=pagina)
     except Exception as e:
         flash(f'Error al cargar usuarios: {e}', 'danger')
         return render_template('usuarios/lista.html', usuarios=[])
@@ -286,8 +405,8 @@ def usuario_editar(usuario_id):
 def categorias_lista():
     """Lista todas las categorías"""
     try:
-        categorias = categoria_controller.obtener_todos()
-        return render_template('categorias/lista.html', categorias=categorias)
+        pagina = categoria_controller.obtener_pagina(**_parametros_pagina())
+        return render_template('categorias/lista.html', categorias=pagina, pagina=pagina)
     except Exception as e:
         flash(f'Error al cargar categorías: {e}', 'danger')
         return render_template('categorias/lista.html', categorias=[])
@@ -300,7 +419,7 @@ def categorias_buscar():
         if termino:
             categorias = categoria_controller.buscar(termino)
         else:
-            categorias = categoria_controller.obtener_todos()
+            return redirect(url_for('categorias_lista'))
         return render_template('categorias/lista.html', categorias=categorias, termino_busqueda=termino)
     except Exception as e:
         flash(f'Error en la búsqueda: {e}', 'danger')
@@ -391,8 +510,8 @@ def categoria_eliminar(categoria_id):
 def autores_lista():
     """Lista todos los autores"""
     try:
-        autores = autor_controller.obtener_todos()
-        return render_template('autores/lista.html', autores=autores)
+        pagina = autor_controller.obtener_pagina(**_parametros_pagina())
+        return render_template('autores/lista.html', autores=pagina, pagina=pagina)
     except Exception as e:
         flash(f'Error al cargar autores: {e}', 'danger')
         return render_template('autores/lista.html', autores=[])
@@ -405,7 +524,7 @@ def autores_buscar():
         if termino:
             autores = autor_controller.buscar(termino)
         else:
-            autores = autor_controller.obtener_todos()
+            return redirect(url_for('autores_lista'))
         return render_template('autores/lista.html', autores=autores, termino_busqueda=termino)
     except Exception as e:
         flash(f'Error en la búsqueda: {e}', 'danger')
@@ -514,8 +633,8 @@ def autor_eliminar(autor_id):
 def prestamos_lista():
     """Lista todos los préstamos activos"""
     try:
-        prestamos = prestamo_controller.obtener_prestamos_activos()
-        return render_template('prestamos/lista.html', prestamos=prestamos, titulo='Préstamos Activos')
+        pagina = prestamo_controller.obtener_pagina_activos(**_parametros_pagina())
+        return render_template('prestamos/lista.html', prestamos=pagina, pagina=pagina, titulo='Préstamos Activos')
     except Exception as e:
         flash(f'Error al cargar préstamos: {e}', 'danger')
         return render_template('prestamos/lista.html', prestamos=[], titulo='Préstamos Activos')
@@ -530,6 +649,34 @@ def prestamos_vencidos():
         flash(f'Error al cargar préstamos vencidos: {e}', 'danger')
         return render_template('prestamos/lista.html', prestamos=[], titulo='Préstamos Vencidos')
 
+@app.route('/prestamos/historial/exportar')
+def prestamos_exportar_historial():
+    """Exporta el historial de préstamos como CSV en streaming (?desde=&hasta=&estado=&separador=)"""
+    try:
+        desde = datetime.strptime(request.args['desde'], '%Y-%m-%d').date() if request.args.get('desde') else None
+        hasta = datetime.strptime(request.args['hasta'], '%Y-%m-%d').date() if request.args.get('hasta') else None
+    except ValueError:
+        flash('Las fechas deben tener el formato AAAA-MM-DD', 'danger')
+        return redirect(url_for('prestamos_lista'))
+    if desde and hasta and desde > hasta:
+        flash('La fecha inicial no puede ser posterior a la final', 'danger')
+        return redirect(url_for('prestamos_lista'))
+
+    estados = [e for e in request.args.getlist('estado') if e in ('Prestado', 'Devuelto', 'Vencido')]
+    separador = request.args.get('separador', ',')
+    if separador not in (',', ';'):
+        separador = ','
+
+    nombre = 'historial_prestamos'
+    if desde or hasta:
+        nombre += f"_{desde or 'inicio'}_{hasta or 'hoy'}"
+    filas = prestamo_controller.exportar_historial(desde=desde, hasta=hasta, estados=estados)
+    return Response(
+        stream_with_context(generar_csv(filas, prestamo_controller.COLUMNAS_HISTORIAL, separador=separador)),
+        mimetype='text/csv; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename={nombre}.csv'}
+    )
+
 @app.route('/prestamos/nuevo', methods=['GET', 'POST'])
 def prestamo_nuevo():
     """Crea un nuevo préstamo"""
@@ -551,12 +698,68 @@ def prestamo_nuevo():
 
     # Obtener libros disponibles y usuarios activos para el formulario
     libros_disponibles = libro_controller.obtener_disponibles()
-    usuarios_activos = [u for u in usuario_controller.obtener_todos() if u.Estado == 'Activo']
+    usuarios_activos = [u for u in usuario_controller.obtener_todos()
+                        if u.Estado == 'Activo' and not u.tiene_prestamos_vencidos]
 
     return render_template('prestamos/form.html',
                           libros_disponibles=libros_disponibles,
                           usuarios_activos=usuarios_activos)
 
+@app.route('/prestamos/lote', methods=['GET', 'POST'])
+def prestamos_lote():
+    """Crea varios préstamos para un mismo usuario en una sola operación"""
+    if request.method == 'POST':
+        try:
+            usuario_id = int(request.form['usuario_id'])
+            libro_ids = [int(libro_id) for libro_id in request.form.getlist('libro_ids')]
+            dias = int(request.form.get('dias_prestamo', 14))
+
+            exito, mensaje, resultados = prestamo_controller.crear_prestamos_lote(usuario_id, libro_ids, dias)
+
+            # Informar cada libro que no se pudo prestar
+            for resultado in resultados:
+                if not resultado['exito']:
+                    flash(resultado['mensaje'], 'warning')
+
+            if exito:
+                flash(mensaje, 'success')
+                return redirect(url_for('prestamos_lista'))
+            else:
+                flash(mensaje, 'danger')
+        except Exception as e:
+            flash(f'Error al crear préstamos: {e}', 'danger')
+
+    libros_disponibles = libro_controller.obtener_disponibles()
+    usuarios_activos = [u for u in usuario_controller.obtener_todos()
+                        if u.Estado == 'Activo' and not u.tiene_prestamos_vencidos]
+
+    return render_template('prestamos/lote.html',
+                          libros_disponibles=libros_disponibles,
+                          usuarios_activos=usuarios_activos)
+
+@app.route('/prestamos/devolver-lote', methods=['GET', 'POST'])
+def prestamos_devolver_lote():
+    """Procesa la devolución de varios libros (IDs de préstamo o ISBN, uno por línea)"""
+    resultados = []
+    if request.method == 'POST':
+        try:
+            codigos = [c.strip() for c in request.form.get('codigos', '').splitlines() if c.strip()]
+            if request.form.get('tipo') == 'isbn':
+                exito, mensaje, resultados = prestamo_controller.devolver_lote(isbns=codigos)
+            else:
+                exito, mensaje, resultados = prestamo_controller.devolver_lote(
+                    prestamo_ids=[int(codigo) for codigo in codigos]
+                )
+
+            flash(mensaje, 'success' if exito else 'danger')
+        except ValueError:
+            flash('Los IDs de préstamo deben ser números', 'danger')
+        except Exception as e:
+            flash(f'Error al devolver libros: {e}', 'danger')
+
+    return render_template('prestamos/devolucion_lote.html', resultados=resultados,
+                          tipo=request.form.get('tipo', 'prestamo'))
+
 @app.route('/prestamos/<int:prestamo_id>/devolver', methods=['POST'])
 def prestamo_devolver(prestamo_id):
     """Procesa la devolución de un libro"""
@@ -572,6 +775,65 @@ def prestamo_devolver(prestamo_id):
 
     return redirect(url_for('prestamos_lista'))
 
+# ==================== RUTAS DE ADMINISTRACIÓN ====================
+
+@app.route('/admin/consultas-lentas')
+def admin_consultas_lentas():
+    """Sentencias registradas como lentas, ordenadas por tiempo total"""
+    try:
+        peores = consultas_lentas.peores(request.args.get('limite', 20, type=int))
+    except Exception as e:
+        flash(f'Error al leer el registro de consultas lentas: {e}', 'danger')
+        peores = []
+    return render_template('admin/consultas_lentas.html', peores=peores, registro=consultas_lentas)
+
+@app.route('/admin/importar-libros', methods=['GET', 'POST'])
+def admin_importar_libros():
+    """Importa libros desde un CSV subido; si el mismo archivo se interrumpió, continúa donde quedó"""
+    resumen = nombre_archivo = None
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        if not archivo or not archivo.filename:
+            flash('Seleccione un archivo CSV', 'danger')
+        else:
+            try:
+                nombre_archivo = secure_filename(archivo.filename) or 'importacion.csv'
+                os.makedirs(config.DIRECTORIO_IMPORTACIONES, exist_ok=True)
+                ruta = os.path.join(config.DIRECTORIO_IMPORTACIONES, nombre_archivo)
+                archivo.save(ruta)
+
+                resumen = ImportacionLibros(
+                    crear_referencias=not request.form.get('sin_crear'),
+                    archivo_control=f"{ruta}.control.json",
+                    archivo_rechazados=f"{ruta}.rechazados.csv"
+                ).ejecutar(ruta)
+
+                if resumen['insertados']:
+                    # La importación pudo crear autores y categorías, y los índices
+                    # en memoria no incluyen los libros nuevos
+                    cache_referencia.invalidar('autores', 'categorias')
+                    if indice_libros.construido:
+                        libro_controller.construir_indice()
+                    if autocompletado.construido:
+                        _cargar_autocompletado()
+
+                if resumen['error']:
+                    flash(f"La importación se detuvo: {resumen['error']}. Suba el mismo archivo para continuar.",
+                          'danger')
+                else:
+                    flash(f"{resumen['insertados']} libro(s) importado(s), {resumen['rechazados']} fila(s) rechazada(s)",
+                          'success' if not resumen['rechazados'] else 'warning')
+            except Exception as e:
+                flash(f'Error al importar libros: {e}', 'danger')
+
+    return render_template('admin/importar_libros.html', resumen=resumen, nombre_archivo=nombre_archivo)
+
+@app.route('/admin/importar-libros/<nombre>/rechazados')
+def admin_importar_libros_rechazados(nombre):
+    """Descarga el CSV de filas rechazadas de una importación"""
+    return send_from_directory(os.path.abspath(config.DIRECTORIO_IMPORTACIONES),
+                               f"{secure_filename(nombre)}.rechazados.csv", as_attachment=True)
+
 # ==================== API ENDPOINTS (JSON) ====================
 
 @app.route('/api/libros')
@@ -638,6 +900,118 @@ def api_prestamos():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _cargar_autocompletado():
+    """Carga los índices de autocompletado de títulos, autores y categorías"""
+    libro_controller.cargar_autocompletado()
+    autor_controller.cargar_autocompletado()
+    categoria_controller.cargar_autocompletado()
+
+@app.route('/api/autocompletar')
+def api_autocompletar():
+    """API endpoint de autocompletado por prefijo (títulos, autores y categorías)"""
+    prefijo = request.args.get('q', '')
+    n = max(1, min(request.args.get('n', 5, type=int), 20))
+
+    if not autocompletado.construido:
+        _cargar_autocompletado()
+
+    completaciones = autocompletado.completar(prefijo, n)
+    return jsonify({
+        'libros': [{'id': id_, 'texto': texto, 'url': url_for('libro_detalle', libro_id=id_)}
+                   for id_, texto in completaciones['libros']],
+        'autores': [{'id': id_, 'texto': texto, 'url': url_for('autor_detalle', autor_id=id_)}
+                    for id_, texto in completaciones['autores']],
+        'categorias': [{'id': id_, 'texto': texto, 'url': url_for('categoria_detalle', categoria_id=id_)}
+                       for id_, texto in completaciones['categorias']]
+    })
+
+@app.route('/api/admin/pool')
+def api_admin_pool():
+    """API endpoint con el estado del pool de conexiones"""
+    return jsonify(db.estadisticas_pool())
+
+@app.route('/api/admin/cache')
+def api_admin_cache():
+    """API endpoint con los contadores de la caché de datos de referencia"""
+    return jsonify(cache_referencia.estadisticas())
+
+@app.route('/api/admin/consultas-lentas')
+def api_admin_consultas_lentas():
+    """API endpoint con las consultas lentas de mayor tiempo total"""
+    return jsonify(consultas_lentas.peores(request.args.get('limite', 20, type=int)))
+
+def _respuesta_ndjson(filas, nombre_archivo):
+    """Envuelve un iterable de diccionarios en una respuesta NDJSON en streaming"""
+    return Response(
+        stream_with_context(generar_ndjson(filas)),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={nombre_archivo}'}
+    )
+
+@app.route('/api/libros/exportar')
+def api_libros_exportar():
+    """Exporta todos los libros como NDJSON en streaming"""
+    return _respuesta_ndjson(libro_controller.exportar(), 'libros.ndjson')
+
+@app.route('/api/usuarios/exportar')
+def api_usuarios_exportar():
+    """Exporta los usuarios activos como NDJSON en streaming"""
+    return _respuesta_ndjson(usuario_controller.exportar(), 'usuarios.ndjson')
+
+@app.route('/api/prestamos/exportar')
+def api_prestamos_exportar():
+    """Exporta los préstamos activos como NDJSON en streaming"""
+    return _respuesta_ndjson(prestamo_controller.exportar_activos(), 'prestamos.ndjson')
+
+def _mes_parametro(nombre):
+    """
+    Lee un mes AAAA-MM de la URL y lo normaliza: strptime acepta '2024-1',
+    pero el cubo (numpy) exige el mes con dos dígitos
+
+    Raises:
+        ValueError: Si el valor no es un mes válido
+    """
+    mes = request.args.get(nombre)
+    if not mes:
+        return None
+    fecha = datetime.strptime(mes, '%Y-%m')
+    return f"{fecha.year:04d}-{fecha.month:02d}"
+
+@app.route('/api/reportes/cubo')
+def api_reportes_cubo():
+    """
+    API endpoint del cubo de circulación (?agrupar=mes,categoria,nacionalidad&desde=AAAA-MM&hasta=AAAA-MM).
+    Antes de responder incorpora los préstamos nuevos y devueltos (actualizar=0 lo omite).
+    """
+    try:
+        # numpy solo se importa cuando se usa el cubo
+        from analitica import cubo_circulacion, DIMENSIONES
+    except ImportError as e:
+        return jsonify({'error': f'El cubo de circulación requiere numpy: {e}'}), 503
+
+    agrupar = [d.strip() for d in request.args.get('agrupar', ','.join(DIMENSIONES)).split(',') if d.strip()]
+    if any(d not in DIMENSIONES for d in agrupar):
+        return jsonify({'error': f"Dimensiones válidas: {', '.join(DIMENSIONES)}"}), 400
+    try:
+        desde, hasta = _mes_parametro('desde'), _mes_parametro('hasta')
+    except ValueError:
+        return jsonify({'error': 'Los meses deben tener el formato AAAA-MM'}), 400
+
+    actualizacion = None
+    if request.args.get('actualizar', '1') != '0':
+        actualizacion = cubo_circulacion.actualizar()
+        if actualizacion['error']:
+            return jsonify({'error': actualizacion['error']}), 500
+
+    return jsonify({
+        'dimensiones': agrupar,
+        'desde': desde,
+        'hasta': hasta,
+        'actualizacion': actualizacion,
+        **cubo_circulacion.estado(),
+        'celdas': cubo_circulacion.consultar(agrupar, desde, hasta)
+    })
+
 # ==================== MANEJO DE ERRORES ====================
 
 @app.errorhandler(404)
@@ -677,4 +1051,8 @@ if __name__ == '__main__':
     print("\nPresiona Ctrl+C para detener el servidor")
     print("=" * 80)
 
+    # Construir los índices de búsqueda y autocompletado antes de atender peticiones
+    libro_controller.construir_indice()
+    _cargar_autocompletado()
+
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,174 @@
+# autocompletado.py
+# Índice de prefijos en memoria para el autocompletado de búsquedas
+
+import re
+import threading
+from bisect import bisect_left, insort
+from heapq import nlargest
+from indice_busqueda import normalizar
+
+# Los prefijos que abarcan muchas entradas memorizan su top-N hasta la próxima escritura
+ENTRADAS_PARA_MEMORIZAR = 256
+MAXIMO_MEMORIZADOS = 10000
+
+_PATRON_ESPACIOS = re.compile(r'\s+')
+
+
+def _clave(texto):
+    """Clave de ordenamiento: texto normalizado con espacios simples"""
+    return _PATRON_ESPACIOS.sub(' ', normalizar(texto)).strip()
+
+
+class IndicePrefijos:
+    """
+    Arreglo ordenado de claves normalizadas con búsqueda por bisect.
+
+    Cada entrada tiene un texto a mostrar, alias opcionales (por ejemplo,
+    "Apellido Nombre") y un peso (popularidad); las completaciones de un
+    prefijo son las N entradas de mayor peso con alguna clave que empiece
+    con ese prefijo.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._claves = []       # lista ordenada de (clave, id)
+        self._entradas = {}     # id -> (claves, texto, peso)
+        self._memoria = {}      # (prefijo, n) -> completaciones
+        self.construido = False
+
+    @staticmethod
+    def _claves_de(texto, alias):
+        return tuple(dict.fromkeys(_clave(t) for t in (texto, *alias) if t))
+
+    def construir(self, filas):
+        """
+        Reconstruye el índice completo
+
+        Args:
+            filas (iterable): Tuplas (id, texto, peso, alias)
+        """
+        entradas = {}
+        for id_, texto, peso, alias in filas:
+            if texto:
+                entradas[id_] = (self._claves_de(texto, alias), texto, peso or 0)
+        claves = sorted(
+            (clave, id_) for id_, (claves_entrada, _, _) in entradas.items() for clave in claves_entrada
+        )
+        with self._lock:
+            self._entradas = entradas
+            self._claves = claves
+            self._memoria = {}
+            self.construido = True
+
+    def agregar(self, id_, texto, peso=None, alias=()):
+        """
+        Agrega o reemplaza una entrada. Si no se indica peso se conserva
+        el de la entrada existente.
+
+        Args:
+            id_ (int): ID del elemento
+            texto (str): Texto a completar
+            peso (int): Popularidad del elemento
+            alias (tuple): Textos alternativos que también deben completar
+        """
+        with self._lock:
+            anterior = self._entradas.get(id_)
+            if peso is None:
+                peso = anterior[2] if anterior else 0
+            self._quitar(id_)
+            claves = self._claves_de(texto, alias)
+            self._entradas[id_] = (claves, texto, peso)
+            for clave in claves:
+                insort(self._claves, (clave, id_))
+            self._memoria = {}
+
+    def eliminar(self, id_):
+        """
+        Elimina una entrada
+
+        Args:
+            id_ (int): ID del elemento
+        """
+        with self._lock:
+            self._quitar(id_)
+            self._memoria = {}
+
+    def _quitar(self, id_):
+        entrada = self._entradas.pop(id_, None)
+        if entrada is None:
+            return
+        for clave in entrada[0]:
+            posicion = bisect_left(self._claves, (clave, id_))
+            if posicion < len(self._claves) and self._claves[posicion] == (clave, id_):
+                del self._claves[posicion]
+
+    def completar(self, prefijo, n=5):
+        """
+        Retorna las N entradas de mayor peso que empiezan con el prefijo
+
+        Args:
+            prefijo (str): Texto escrito por el usuario
+            n (int): Número máximo de completaciones
+
+        Returns:
+            list: Tuplas (id, texto)
+        """
+        prefijo = _clave(prefijo)
+        if not prefijo:
+            return []
+
+        with self._lock:
+            memorizado = self._memoria.get((prefijo, n))
+            if memorizado is not None:
+                return memorizado
+
+            claves = self._claves
+            inicio = bisect_left(claves, (prefijo,))
+            # Todas las claves con el prefijo están entre (prefijo,) y (prefijo + U+FFFF,)
+            fin = bisect_left(claves, (prefijo + '\uffff',), inicio)
+            ids = {claves[i][1] for i in range(inicio, fin)}
+            mejores = nlargest(n, ids, key=lambda id_: (self._entradas[id_][2], -id_))
+            resultado = [(id_, self._entradas[id_][1]) for id_ in mejores]
+
+            if fin - inicio > ENTRADAS_PARA_MEMORIZAR:
+                if len(self._memoria) >= MAXIMO_MEMORIZADOS:
+                    self._memoria = {}
+                self._memoria[(prefijo, n)] = resultado
+            return resultado
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+class Autocompletado:
+    """Índices de prefijos para títulos, autores y categorías"""
+
+    def __init__(self):
+        self.libros = IndicePrefijos()
+        self.autores = IndicePrefijos()
+        self.categorias = IndicePrefijos()
+
+    @property
+    def construido(self):
+        return self.libros.construido and self.autores.construido and self.categorias.construido
+
+    def completar(self, prefijo, n=5):
+        """
+        Completa un prefijo en los tres índices
+
+        Args:
+            prefijo (str): Texto escrito por el usuario
+            n (int): Máximo de completaciones por tipo
+
+        Returns:
+            dict: Listas de tuplas (id, texto) por tipo
+        """
+        return {
+            'libros': self.libros.completar(prefijo, n),
+            'autores': self.autores.completar(prefijo, n),
+            'categorias': self.categorias.completar(prefijo, n)
+        }
+
+
+# Instancia global del autocompletado
+autocompletado = Autocompletado()
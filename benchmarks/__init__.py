@@ -0,0 +1,7 @@
+# benchmarks/__init__.py
+# Scripts de medición de rendimiento sobre una base SQLite sustituta
+#
+# Ejecutar desde la raíz del proyecto, por ejemplo:
+#   python -m benchmarks.bench_estadisticas --libros 100000
+#   python -m benchmarks.suite --escala pequena   (suite completa con línea base)
+#   python -m benchmarks.carga --escenario mostrador   (prueba de carga sobre el servidor local)
@@ -0,0 +1,107 @@
+# benchmarks/bench_analitica.py
+# Cubo de circulación (analitica.py): agregación recorriendo objetos del ORM
+# contra la construcción vectorizada con NumPy y la actualización incremental
+#
+# Ejecutar: python -m benchmarks.bench_analitica --prestamos 200000,1000000
+
+import argparse
+import os
+import tempfile
+import time
+from collections import defaultdict
+from sqlalchemy import select, update
+from sqlalchemy.orm import joinedload
+from analitica import CuboCirculacion
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from database import db
+from models import Prestamo, Libro
+
+
+def cubo_con_orm():
+    """Mismas medidas que el cubo, iterando préstamos del ORM en Python"""
+    session = db.get_session()
+    try:
+        celdas = defaultdict(lambda: [0, 0, 0.0, 0, 0.0])
+        prestamos = session.query(Prestamo).options(
+            joinedload(Prestamo.libro).joinedload(Libro.autor)
+        ).all()
+        for prestamo in prestamos:
+            celda = celdas[(prestamo.FechaPrestamo.strftime('%Y-%m'), prestamo.libro.CategoriaID,
+                            prestamo.libro.autor.Nacionalidad or 'Sin dato')]
+            celda[0] += 1
+            if prestamo.FechaDevolucionReal:
+                celda[1] += 1
+                celda[2] += (prestamo.FechaDevolucionReal - prestamo.FechaPrestamo).total_seconds() / 86400
+                celda[3] += prestamo.FechaDevolucionReal.date() > prestamo.FechaDevolucionEsperada
+                celda[4] += float(prestamo.Multa or 0)
+        return len(celdas)
+    finally:
+        session.close()
+
+
+def simular_actividad(prestamos_nuevos, devoluciones):
+    """Devuelve préstamos abiertos y copia préstamos recientes como nuevos (SQL directo)"""
+    with db.engine.begin() as conn:
+        abiertos = conn.execute(
+            select(Prestamo.PrestamoID).where(Prestamo.Estado == 'Prestado').limit(devoluciones)
+        ).scalars().all()
+        conn.execute(update(Prestamo).where(Prestamo.PrestamoID.in_(abiertos)).values(
+            Estado='Devuelto', FechaDevolucionReal=Prestamo.FechaDevolucionEsperada, Multa=0
+        ))
+        filas = conn.execute(select(
+            Prestamo.LibroID, Prestamo.UsuarioID, Prestamo.FechaPrestamo, Prestamo.FechaDevolucionEsperada,
+            Prestamo.FechaDevolucionReal, Prestamo.Estado, Prestamo.Multa
+        ).order_by(Prestamo.PrestamoID.desc()).limit(prestamos_nuevos)).mappings().all()
+        conn.execute(Prestamo.__table__.insert(), [dict(fila) for fila in filas])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del cubo de circulación')
+    parser.add_argument('--prestamos', default='200000,1000000', help='Tamaños separados por coma')
+    parser.add_argument('--orm-hasta', type=int, default=200000,
+                        help='Medir la agregación con el ORM solo hasta este tamaño')
+    parser.add_argument('--nuevos', type=int, default=2000, help='Préstamos nuevos antes de la actualización')
+    parser.add_argument('--devoluciones', type=int, default=2000, help='Devoluciones antes de la actualización')
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='bench_analitica_')
+    print(f"{'Préstamos':>10s}  {'Método':34s} {'s':>8s}")
+    for prestamos in (int(n) for n in args.prestamos.split(',')):
+        ruta = crear_base_sqlite(libros=20000, usuarios=10000, prestamos=prestamos, autores=2000)
+        archivo = os.path.join(directorio, 'cubo.npz')
+        try:
+            if prestamos <= args.orm_hasta:
+                inicio = time.perf_counter()
+                cubo_con_orm()
+                print(f"{prestamos:10d}  {'ORM, agregación en Python':34s} {time.perf_counter() - inicio:8.2f}")
+
+            cubo = CuboCirculacion(archivo=archivo)
+            resumen = cubo.actualizar(reconstruir=True)
+            print(f"{prestamos:10d}  {'NumPy, construcción completa':34s} {resumen['segundos']:8.2f}")
+
+            inicio = time.perf_counter()
+            cubo = CuboCirculacion(archivo=archivo)
+            cubo.consultar()
+            print(f"{prestamos:10d}  {'NumPy, carga del .npz y consulta':34s} {time.perf_counter() - inicio:8.2f}")
+
+            simular_actividad(args.nuevos, args.devoluciones)
+            resumen = cubo.actualizar()
+            nombre = f"incremental (+{resumen['nuevos']}, {resumen['devueltos']} dev.)"
+            print(f"{prestamos:10d}  {nombre:34s} {resumen['segundos']:8.2f}")
+
+            completo = CuboCirculacion(archivo=os.path.join(directorio, 'completo.npz'))
+            completo.actualizar()
+            iguales = cubo.consultar() == completo.consultar()
+            print(f"{'':10s}  incremental == reconstruido: {'OK' if iguales else 'DIFERENTE'}")
+            if not iguales:
+                raise SystemExit(1)
+        finally:
+            db.engine.dispose()
+            os.remove(ruta)
+            for nombre in os.listdir(directorio):
+                os.remove(os.path.join(directorio, nombre))
+    os.rmdir(directorio)
+
+
+if __name__ == '__main__':
+    main()
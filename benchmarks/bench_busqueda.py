@@ -0,0 +1,81 @@
+# benchmarks/bench_busqueda.py
+# Compara la búsqueda de libros: índice invertido vs. LIKE '%termino%'
+#
+# Ejecutar: python -m benchmarks.bench_busqueda --libros 1000000
+
+import argparse
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from benchmarks.datos_sinteticos import crear_base_sqlite, PALABRAS, APELLIDOS
+from controllers import LibroController
+from indice_busqueda import indice_libros
+
+
+def medir_consultas(funcion, consultas):
+    """Retorna las latencias (ms) de ejecutar `funcion` con cada consulta"""
+    tiempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        funcion(consulta)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def resumen(tiempos):
+    """Retorna (p50, p95) de una lista de latencias"""
+    ordenados = sorted(tiempos)
+    return statistics.median(ordenados), ordenados[int(len(ordenados) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de búsqueda de libros')
+    parser.add_argument('--libros', type=int, default=100000)
+    parser.add_argument('--consultas', type=int, default=50)
+    parser.add_argument('--sin-like', action='store_true',
+                        help='Omitir la ruta LIKE (muy lenta con catálogos grandes)')
+    args = parser.parse_args()
+
+    print(f"Creando base SQLite con {args.libros} libros...")
+    ruta = crear_base_sqlite(libros=args.libros, usuarios=100, prestamos=100,
+                             autores=max(10, args.libros // 20))
+    try:
+        controller = LibroController()
+
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        controller.construir_indice()
+        t_construccion = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Índice construido en {t_construccion:.1f} s "
+              f"({pico / (1024 * 1024):.0f} MB pico, {indice_libros.estadisticas()})")
+
+        rnd = random.Random(7)
+        consultas = []
+        for i in range(args.consultas):
+            if i % 3 == 0:
+                consultas.append(rnd.choice(PALABRAS))
+            elif i % 3 == 1:
+                consultas.append(f"{rnd.choice(PALABRAS)} {rnd.choice(PALABRAS)}")
+            else:
+                consultas.append(rnd.choice(APELLIDOS))
+
+        filas = [('Índice invertido (top 100)', medir_consultas(controller.buscar, consultas))]
+        if not args.sin_like:
+            filas.append(('LIKE (todas las filas)', medir_consultas(controller._buscar_like, consultas)))
+
+        print("\n" + "=" * 60)
+        print(f"{'Ruta':<30} {'p50 (ms)':>12} {'p95 (ms)':>12}")
+        print("-" * 60)
+        for nombre, tiempos in filas:
+            p50, p95 = resumen(tiempos)
+            print(f"{nombre:<30} {p50:>12.1f} {p95:>12.1f}")
+    finally:
+        os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_estadisticas.py
+# Compara el cálculo de estadísticas del dashboard: ruta anterior vs. agregada
+#
+# Ejecutar: python -m benchmarks.bench_estadisticas --libros 100000
+
+import argparse
+import os
+import time
+import tracemalloc
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from controllers import LibroController, UsuarioController, PrestamoController, EstadisticaController
+
+
+def ruta_anterior(libro_ctrl, usuario_ctrl, prestamo_ctrl):
+    """Réplica del cálculo original de app.index(): cargar todo y usar len()"""
+    return {
+        'total_libros': len(libro_ctrl.obtener_todos()),
+        'total_usuarios': len(usuario_ctrl.obtener_todos()),
+        'prestamos_activos': len(prestamo_ctrl.obtener_prestamos_activos()),
+        'prestamos_vencidos': len(prestamo_ctrl.obtener_prestamos_vencidos()),
+        'libros_disponibles': len(libro_ctrl.obtener_disponibles())
+    }
+
+
+def medir(funcion, repeticiones):
+    """Retorna (mejor tiempo en ms, pico de memoria en MB, resultado)"""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(tiempos), pico / (1024 * 1024), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de estadísticas del dashboard')
+    parser.add_argument('--libros', type=int, default=50000)
+    parser.add_argument('--usuarios', type=int, default=5000)
+    parser.add_argument('--prestamos', type=int, default=100000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Creando base SQLite: {args.libros} libros, {args.usuarios} usuarios, {args.prestamos} préstamos...")
+    ruta = crear_base_sqlite(libros=args.libros, usuarios=args.usuarios, prestamos=args.prestamos)
+
+    try:
+        libro_ctrl = LibroController()
+        usuario_ctrl = UsuarioController()
+        prestamo_ctrl = PrestamoController()
+        estadistica_ctrl = EstadisticaController()
+
+        t_anterior, m_anterior, r_anterior = medir(
+            lambda: ruta_anterior(libro_ctrl, usuario_ctrl, prestamo_ctrl), args.repeticiones)
+        t_nuevo, m_nuevo, r_nuevo = medir(estadistica_ctrl.obtener_resumen, args.repeticiones)
+
+        coinciden = all(r_anterior[clave] == r_nuevo[clave] for clave in r_anterior)
+
+        print("\n" + "=" * 60)
+        print(f"{'Ruta':<25} {'Tiempo (ms)':>15} {'Memoria pico (MB)':>18}")
+        print("-" * 60)
+        print(f"{'Anterior (ORM + len)':<25} {t_anterior:>15.1f} {m_anterior:>18.1f}")
+        print(f"{'Agregada (1 consulta)':<25} {t_nuevo:>15.1f} {m_nuevo:>18.1f}")
+        print("-" * 60)
+        print(f"Aceleración: {t_anterior / t_nuevo:.1f}x")
+        print(f"Resultados coinciden: {'sí' if coinciden else 'NO'}")
+    finally:
+        os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_exportacion.py
+# Memoria y velocidad de la exportación del historial de préstamos a CSV
+# según el número de préstamos, frente a materializar el grafo del ORM
+#
+# Ejecutar: python -m benchmarks.bench_exportacion --prestamos 100000,500000
+
+import argparse
+import os
+import time
+import tracemalloc
+from sqlalchemy.orm import joinedload
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from controllers import PrestamoController
+from database import db
+from exportacion import generar_csv
+from models import Prestamo
+
+
+def exportar_csv():
+    """Consume la exportación CSV completa; retorna (filas, bytes)"""
+    controller = PrestamoController()
+    filas = bytes_ = 0
+    for bloque in generar_csv(controller.exportar_historial(), controller.COLUMNAS_HISTORIAL):
+        filas += bloque.count('\n')
+        bytes_ += len(bloque.encode('utf-8'))
+    return filas - 1, bytes_
+
+
+def materializar_orm():
+    """Carga todos los préstamos con libro y usuario como objetos del ORM"""
+    session = db.get_session()
+    try:
+        prestamos = session.query(Prestamo).options(
+            joinedload(Prestamo.libro), joinedload(Prestamo.usuario)
+        ).all()
+        return len(prestamos), 0
+    finally:
+        session.close()
+
+
+def medir(funcion):
+    """
+    Retorna (resultado, segundos, pico de memoria en MB). tracemalloc hace
+    mucho más lento el código, así que la memoria se mide en una segunda pasada.
+    """
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, segundos, pico / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la exportación del historial de préstamos')
+    parser.add_argument('--prestamos', default='100000,500000', help='Tamaños separados por coma')
+    parser.add_argument('--orm-hasta', type=int, default=200000,
+                        help='Medir la carga con el ORM solo hasta este tamaño')
+    args = parser.parse_args()
+
+    print(f"{'Préstamos':>10s}  {'Método':18s} {'Filas':>9s} {'s':>7s} {'filas/s':>9s} {'pico MB':>8s}")
+    for prestamos in (int(n) for n in args.prestamos.split(',')):
+        ruta = crear_base_sqlite(libros=20000, usuarios=10000, prestamos=prestamos, autores=2000)
+        try:
+            casos = [('CSV en streaming', exportar_csv)]
+            if prestamos <= args.orm_hasta:
+                casos.append(('ORM (joinedload)', materializar_orm))
+            for nombre, funcion in casos:
+                (filas, _), segundos, pico = medir(funcion)
+                print(f"{prestamos:10d}  {nombre:18s} {filas:9d} {segundos:7.2f} {filas / segundos:9.0f} {pico:8.1f}")
+        finally:
+            db.engine.dispose()
+            os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/bench_importacion.py
+# Importación del catálogo: LibroController.crear fila por fila contra la
+# importación en lotes (importacion.py), incluida la reanudación
+#
+# Ejecutar: python -m benchmarks.bench_importacion --filas 200000
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import func, select
+from benchmarks.datos_sinteticos import crear_base_sqlite, PALABRAS, NOMBRES, APELLIDOS
+from controllers import LibroController
+from database import db
+from generador_datos import CATEGORIAS, EDITORIALES, isbn13
+from importacion import ImportacionLibros
+from models import Libro
+
+LIBROS_EXISTENTES = 1000
+
+
+class Interrupcion(Exception):
+    """Simula una caída a mitad de la importación"""
+
+
+def escribir_csv(ruta, filas, semilla=7, proporcion_invalidas=0.01, proporcion_duplicadas=0.01):
+    """
+    Escribe un CSV de catálogo (separado por punto y coma, como lo exporta
+    Excel en español) con algunas filas sin título y algunos ISBN que ya
+    existen en la base
+
+    Returns:
+        int: Filas válidas esperadas
+    """
+    rnd = random.Random(semilla)
+    autores = [f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}" for _ in range(max(10, filas // 20))]
+    validas = 0
+    with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+        escritor = csv.writer(archivo, delimiter=';')
+        escritor.writerow(['Título', 'ISBN', 'Autor', 'Categoría', 'Editorial', 'Año', 'Páginas', 'Copias'])
+        for i in range(filas):
+            isbn = isbn13(LIBROS_EXISTENTES + 1 + i)
+            titulo = ' '.join(rnd.choice(PALABRAS) for _ in range(rnd.randint(2, 6))).capitalize()
+            azar = rnd.random()
+            if azar < proporcion_invalidas:
+                titulo = ''
+            elif azar < proporcion_invalidas + proporcion_duplicadas:
+                isbn = isbn13(rnd.randint(1, LIBROS_EXISTENTES))  # ya está en la base
+            else:
+                validas += 1
+            escritor.writerow([titulo, isbn, rnd.choice(autores), rnd.choice(CATEGORIAS[:25]),
+                               rnd.choice(EDITORIALES), rnd.randint(1950, 2025), rnd.randint(80, 900),
+                               rnd.randint(1, 5)])
+    return validas
+
+
+def contar_libros():
+    with db.engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Libro)).scalar()
+
+
+def medir_fila_por_fila(filas):
+    """Crea `filas` libros con LibroController.crear; retorna filas por segundo"""
+    controller = LibroController()
+    inicio = time.perf_counter()
+    for i in range(filas):
+        controller.crear({'titulo': f'Libro individual {i}', 'isbn': f'IND-{i:08d}', 'autor_id': 1 + i % 50,
+                          'categoria_id': 1 + i % 10, 'copias': 1})
+    return filas / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la importación masiva de libros')
+    parser.add_argument('--filas', type=int, default=200000, help='Filas del CSV')
+    parser.add_argument('--lote', type=int, default=5000)
+    parser.add_argument('--muestra', type=int, default=1000, help='Filas creadas con LibroController.crear')
+    args = parser.parse_args()
+
+    ruta_base = crear_base_sqlite(libros=LIBROS_EXISTENTES, usuarios=100, prestamos=0, autores=200)
+    directorio = tempfile.mkdtemp(prefix='bench_importacion_')
+    ruta_csv = os.path.join(directorio, 'catalogo.csv')
+    try:
+        validas = escribir_csv(ruta_csv, args.filas)
+        print(f"CSV de {args.filas} filas ({validas} válidas, "
+              f"{os.path.getsize(ruta_csv) / 1024 / 1024:.1f} MB)")
+
+        por_segundo_crear = medir_fila_por_fila(args.muestra)
+        print(f"  LibroController.crear: {por_segundo_crear:8.0f} filas/s "
+              f"(estimado para {args.filas}: {args.filas / por_segundo_crear / 60:.1f} min)")
+
+        antes = contar_libros()
+        lotes_antes_de_caer = max(1, args.filas // args.lote // 2)
+
+        def _caer(resumen):
+            if resumen['lotes'] == lotes_antes_de_caer:
+                raise Interrupcion(f"interrupción simulada tras {resumen['lotes']} lote(s)")
+
+        opciones = {'tamano_lote': args.lote, 'archivo_control': f'{ruta_csv}.control.json',
+                    'archivo_rechazados': f'{ruta_csv}.rechazados.csv'}
+        primera = ImportacionLibros(progreso=_caer, **opciones).ejecutar(ruta_csv)
+        segunda = ImportacionLibros(**opciones).ejecutar(ruta_csv)
+        insertados = contar_libros() - antes
+        segundos = primera['segundos'] + segunda['segundos']
+
+        print(f"  Importación en lotes:  {args.filas / segundos:8.0f} filas/s "
+              f"({segundos:.1f} s, {args.filas / segundos / por_segundo_crear:.0f}x)")
+        print(f"  Primera ejecución: {primera['insertados']} insertados, error: {primera['error']}")
+        print(f"  Reanudada desde la línea {segunda['reanudado_desde']}: total {segunda['insertados']} insertados, "
+              f"{segunda['rechazados']} rechazados, {segunda['autores_creados']} autores y "
+              f"{segunda['categorias_creadas']} categorías creados")
+
+        with open(opciones['archivo_rechazados'], encoding='utf-8') as archivo:
+            lineas_rechazadas = sum(1 for _ in archivo) - 1
+        correcto = (insertados == segunda['insertados'] == validas and segunda['error'] is None
+                    and lineas_rechazadas == segunda['rechazados'] == args.filas - validas)
+        print(f"  Libros nuevos en la base: {insertados}, rechazos en archivo: {lineas_rechazadas} "
+              f"{'OK' if correcto else 'INCONSISTENTE'}")
+        if not correcto:
+            raise SystemExit(1)
+    finally:
+        db.engine.dispose()
+        os.remove(ruta_base)
+        for nombre in os.listdir(directorio):
+            os.remove(os.path.join(directorio, nombre))
+        os.rmdir(directorio)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_indices.py
+# Consultas de los controladores antes y después del paquete de índices
+#
+# Ejecutar: python -m benchmarks.bench_indices --prestamos 200000
+
+import argparse
+import os
+import time
+from datetime import datetime
+from sqlalchemy import text
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from controllers import LibroController, PrestamoController
+from database import db
+import migraciones
+
+# Consultas SQL equivalentes a los predicados de cada método, para el plan
+PLANES = {
+    'obtener_prestamos_vencidos':
+        "SELECT PrestamoID, UsuarioID, LibroID, Multa FROM Prestamos "
+        "WHERE Estado = 'Prestado' AND FechaDevolucionEsperada < :hoy",
+    'elegibilidad (vencidos de un usuario)':
+        "SELECT COUNT(*) FROM Prestamos WHERE UsuarioID = :usuario AND Estado = 'Prestado' "
+        "AND FechaDevolucionEsperada < :hoy",
+    'obtener_por_libro':
+        "SELECT PrestamoID, Estado FROM Prestamos WHERE LibroID = :libro ORDER BY FechaPrestamo DESC",
+    'obtener_disponibles':
+        "SELECT LibroID, Titulo FROM Libros WHERE CopiasDisponibles > 0",
+}
+
+
+def consultas(libro_ctrl, prestamo_ctrl, usuarios, libros):
+    """Retorna (nombre, función) de cada consulta a medir"""
+    hoy = datetime.now().date()
+
+    def _elegibilidad():
+        # El conteo directo que usa _contar_vencidos cuando no hay resumen
+        with db.engine.connect() as conn:
+            for usuario in range(1, min(usuarios, 200) + 1):
+                conn.execute(text(PLANES['elegibilidad (vencidos de un usuario)']),
+                             {'usuario': usuario, 'hoy': hoy}).scalar()
+
+    def _por_libro():
+        for libro in range(1, min(libros, 50) + 1):
+            prestamo_ctrl.obtener_por_libro(libro)
+
+    return [
+        ('obtener_prestamos_vencidos', prestamo_ctrl.obtener_prestamos_vencidos),
+        ('elegibilidad (vencidos de un usuario)', _elegibilidad),
+        ('obtener_por_libro', _por_libro),
+        ('obtener_disponibles', libro_ctrl.obtener_disponibles),
+    ]
+
+
+def medir(funcion, repeticiones):
+    """Retorna el mejor tiempo en ms"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return min(tiempos)
+
+
+def plan(nombre):
+    """Retorna el EXPLAIN QUERY PLAN de SQLite en una línea"""
+    parametros = {'hoy': datetime.now().date(), 'usuario': 1, 'libro': 1}
+    with db.engine.connect() as conn:
+        filas = conn.execute(text("EXPLAIN QUERY PLAN " + PLANES[nombre]), parametros).all()
+    return ' | '.join(fila[-1] for fila in filas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de consultas antes y después de los índices')
+    parser.add_argument('--libros', type=int, default=20000)
+    parser.add_argument('--usuarios', type=int, default=5000)
+    parser.add_argument('--prestamos', type=int, default=200000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Creando base SQLite: {args.libros} libros, {args.usuarios} usuarios, {args.prestamos} préstamos...")
+    ruta = crear_base_sqlite(libros=args.libros, usuarios=args.usuarios, prestamos=args.prestamos,
+                             indices=False)
+    lista = consultas(LibroController(), PrestamoController(), args.usuarios, args.libros)
+
+    try:
+        antes = {nombre: (medir(f, args.repeticiones), plan(nombre)) for nombre, f in lista}
+
+        nuevas = migraciones.migrar()
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+        print(f"Migraciones aplicadas: {', '.join(nuevas) or 'ninguna'}\n")
+
+        despues = {nombre: (medir(f, args.repeticiones), plan(nombre)) for nombre, f in lista}
+
+        print(f"{'Consulta':40s} {'antes (ms)':>12s} {'después (ms)':>13s} {'mejora':>8s}")
+        for nombre, _ in lista:
+            t_antes, t_despues = antes[nombre][0], despues[nombre][0]
+            print(f"{nombre:40s} {t_antes:12.1f} {t_despues:13.1f} {t_antes / t_despues:7.1f}x")
+
+        print("\nPlanes de ejecución:")
+        for nombre, _ in lista:
+            print(f"  {nombre}")
+            print(f"    antes:   {antes[nombre][1]}")
+            print(f"    después: {despues[nombre][1]}")
+    finally:
+        db.engine.dispose()
+        os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/bench_metricas.py
+# Costo de registrar métricas: por operación, por hilo y por petición
+#
+# Ejecutar: python -m benchmarks.bench_metricas --iteraciones 200000
+
+import argparse
+import os
+import threading
+import time
+from bisect import bisect_left
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from metricas import RegistroMetricas, LIMITES_LATENCIA, medir_controlador, metricas
+
+
+class RegistroConLock:
+    """Alternativa ingenua: un solo diccionario protegido por un lock global"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores = {}
+        self.histogramas = {}
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            serie = self.histogramas.setdefault(clave, [0] * (len(LIMITES_LATENCIA) + 2))
+            serie[bisect_left(LIMITES_LATENCIA, valor)] += 1
+            serie[-1] += valor
+
+
+def costo_por_operacion(registro, iteraciones, hilos):
+    """Nanosegundos por (observar + incrementar), repartidos entre `hilos` hilos"""
+    por_hilo = iteraciones // hilos
+    barrera = threading.Barrier(hilos + 1)
+
+    def _trabajo():
+        barrera.wait()
+        for i in range(por_hilo):
+            registro.observar('latencia', 0.003, endpoint='libros_lista', metodo='GET')
+            registro.incrementar('peticiones_total', endpoint='libros_lista', metodo='GET', codigo=200)
+
+    lista = [threading.Thread(target=_trabajo) for _ in range(hilos)]
+    for hilo in lista:
+        hilo.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for hilo in lista:
+        hilo.join()
+    return (time.perf_counter() - inicio) * 1e9 / (por_hilo * hilos)
+
+
+def costo_controlador(iteraciones):
+    """Nanosegundos que agrega @medir_controlador a una llamada"""
+    class Simple:
+        def obtener(self, x):
+            return x
+
+    medido = medir_controlador(type('Medido', (), {'obtener': Simple.obtener}))()
+    simple = Simple()
+    tiempos = []
+    for objeto in (simple, medido):
+        inicio = time.perf_counter()
+        for i in range(iteraciones):
+            objeto.obtener(i)
+        tiempos.append((time.perf_counter() - inicio) * 1e9 / iteraciones)
+    return tiempos[1] - tiempos[0]
+
+
+def costo_por_peticion(peticiones):
+    """Microsegundos por petición con y sin métricas, sobre una ruta real"""
+    import app as aplicacion
+    cliente = aplicacion.app.test_client()
+    resultados = {}
+    for activo in (False, True, False, True):
+        metricas.activo = activo
+        cliente.get('/autores')  # calentar la caché
+        inicio = time.perf_counter()
+        for _ in range(peticiones):
+            cliente.get('/autores')
+        resultados[activo] = (time.perf_counter() - inicio) * 1e6 / peticiones
+    metricas.activo = True
+    return resultados[False], resultados[True]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del registro de métricas')
+    parser.add_argument('--iteraciones', type=int, default=200000)
+    parser.add_argument('--peticiones', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"Costo por operación (observar + incrementar), {args.iteraciones} operaciones:")
+    print(f"  {'hilos':>5s} {'fragmentos (ns)':>16s} {'lock global (ns)':>17s}")
+    for hilos in (1, 4, 8):
+        fragmentos = costo_por_operacion(RegistroMetricas(), args.iteraciones, hilos)
+        con_lock = costo_por_operacion(RegistroConLock(), args.iteraciones, hilos)
+        print(f"  {hilos:5d} {fragmentos:16.0f} {con_lock:17.0f}")
+
+    print(f"\nSobrecarga de @medir_controlador: {costo_controlador(args.iteraciones):.0f} ns por llamada")
+
+    ruta = crear_base_sqlite(libros=500, usuarios=100, prestamos=500, autores=50)
+    try:
+        sin, con = costo_por_peticion(args.peticiones)
+        print(f"Petición GET /autores: {sin:.0f} µs sin métricas, {con:.0f} µs con métricas "
+              f"({con - sin:+.0f} µs, {100 * (con - sin) / sin:+.1f}%)")
+
+        inicio = time.perf_counter()
+        texto = metricas.exportar()
+        print(f"Exportar /metrics: {(time.perf_counter() - inicio) * 1000:.2f} ms, "
+              f"{len(texto.splitlines())} líneas")
+    finally:
+        from database import db
+        db.engine.dispose()
+        os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
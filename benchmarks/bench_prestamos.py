@@ -0,0 +1,193 @@
+# benchmarks/bench_prestamos.py
+# Préstamos concurrentes sobre un libro muy solicitado: sobreventa y rendimiento
+#
+# Ejecutar: python -m benchmarks.bench_prestamos --clientes 50
+
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, text, update
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from controllers import PrestamoController
+from database import db
+from models import Libro, Prestamo
+
+LIBRO_POPULAR = 1
+
+
+def crear_prestamo_legado(libro_id, usuario_id):
+    """
+    Versión anterior de crear_prestamo: lee CopiasDisponibles en Python,
+    lo compara y asigna el valor restado (lectura-modificación-escritura)
+    """
+    session = db.get_session()
+    try:
+        libro = session.query(Libro).filter(Libro.LibroID == libro_id).first()
+        if libro.CopiasDisponibles <= 0:
+            return (False, "Sin copias", None)
+        prestamo = Prestamo(
+            LibroID=libro_id, UsuarioID=usuario_id, FechaPrestamo=datetime.now(),
+            FechaDevolucionEsperada=(datetime.now() + timedelta(days=14)).date(),
+            Estado='Prestado', Multa=0
+        )
+        libro.CopiasDisponibles -= 1
+        session.add(prestamo)
+        session.commit()
+        return (True, "OK", prestamo.PrestamoID)
+    except Exception as e:
+        session.rollback()
+        return (False, str(e), None)
+    finally:
+        session.close()
+
+
+def preparar_libro(copias):
+    """Deja el libro popular con `copias` copias libres y sin préstamos"""
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM Prestamos"))
+        conn.execute(
+            update(Libro).where(Libro.LibroID == LIBRO_POPULAR)
+            .values(CopiasDisponibles=copias, CopiasTotal=copias)
+        )
+
+
+def estado_libro():
+    """Retorna (copias disponibles, copias totales, préstamos activos) del libro popular"""
+    with db.engine.connect() as conn:
+        disponibles, total = conn.execute(
+            select(Libro.CopiasDisponibles, Libro.CopiasTotal).where(Libro.LibroID == LIBRO_POPULAR)
+        ).one()
+        activos = conn.execute(
+            select(func.count()).select_from(Prestamo)
+            .where(Prestamo.LibroID == LIBRO_POPULAR, Prestamo.Estado == 'Prestado')
+        ).scalar()
+    return disponibles, total, activos
+
+
+def ejecutar_clientes(clientes, trabajo):
+    """Ejecuta `trabajo(indice_cliente)` en `clientes` hilos que arrancan a la vez"""
+    barrera = threading.Barrier(clientes)
+    resultados = [None] * clientes
+
+    def _cliente(i):
+        barrera.wait()
+        resultados[i] = trabajo(i)
+
+    hilos = [threading.Thread(target=_cliente, args=(i,)) for i in range(clientes)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados, time.perf_counter() - inicio
+
+
+def prueba_sobreventa(crear, clientes, intentos, copias):
+    """
+    Todos los clientes intentan llevarse el libro a la vez. Retorna un
+    diccionario con préstamos concedidos y el estado final del libro.
+    """
+    preparar_libro(copias)
+
+    def _trabajo(i):
+        concedidos = 0
+        for j in range(intentos):
+            # Cada intento usa un usuario distinto (sin préstamos vencidos)
+            exito, _, _ = crear(LIBRO_POPULAR, i * intentos + j + 1)
+            concedidos += exito
+        return concedidos
+
+    resultados, segundos = ejecutar_clientes(clientes, _trabajo)
+    disponibles, total, activos = estado_libro()
+    return {
+        'concedidos': sum(resultados),
+        'copias': copias,
+        'disponibles_final': disponibles,
+        'prestamos_activos': activos,
+        'segundos': segundos
+    }
+
+
+def prueba_rendimiento(controller, clientes, segundos, copias):
+    """Cada cliente presta y devuelve el libro popular en bucle durante `segundos`"""
+    preparar_libro(copias)
+    fin = time.perf_counter() + segundos
+
+    def _trabajo(i):
+        operaciones = rechazados = 0
+        usuario_id = i + 1
+        while time.perf_counter() < fin:
+            exito, _, prestamo_id = controller.crear_prestamo(LIBRO_POPULAR, usuario_id)
+            if not exito:
+                rechazados += 1
+                continue
+            controller.devolver_libro(prestamo_id)
+            operaciones += 2
+        return operaciones, rechazados
+
+    resultados, duracion = ejecutar_clientes(clientes, _trabajo)
+    disponibles, total, activos = estado_libro()
+    return {
+        'operaciones': sum(r[0] for r in resultados),
+        'rechazados': sum(r[1] for r in resultados),
+        'por_segundo': sum(r[0] for r in resultados) / duracion,
+        'disponibles_final': disponibles,
+        'copias_total': total,
+        'prestamos_activos': activos
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de préstamos concurrentes sobre un libro popular')
+    parser.add_argument('--clientes', type=int, default=50)
+    parser.add_argument('--intentos', type=int, default=4, help='Préstamos que intenta cada cliente')
+    parser.add_argument('--copias', type=int, default=20)
+    parser.add_argument('--segundos', type=float, default=5.0)
+    parser.add_argument('--legado', action='store_true',
+                        help='Ejecutar también la versión anterior (lectura-modificación-escritura)')
+    args = parser.parse_args()
+
+    usuarios = args.clientes * args.intentos
+    ruta = crear_base_sqlite(libros=100, usuarios=usuarios, prestamos=0, autores=10)
+    with db.engine.begin() as conn:
+        conn.execute(text("UPDATE Usuarios SET Estado = 'Activo'"))
+
+    controller = PrestamoController()
+    pruebas = [('condicional', controller.crear_prestamo)]
+    if args.legado:
+        pruebas.append(('legado', crear_prestamo_legado))
+
+    try:
+        print(f"{args.clientes} clientes x {args.intentos} intentos sobre {args.copias} copias")
+        correcto = True
+        for nombre, crear in pruebas:
+            r = prueba_sobreventa(crear, args.clientes, args.intentos, args.copias)
+            esperado = min(args.copias, usuarios)
+            ok = (r['concedidos'] == r['prestamos_activos'] == esperado
+                  and r['disponibles_final'] == args.copias - esperado)
+            print(f"  {nombre:12s} concedidos={r['concedidos']:4d} activos={r['prestamos_activos']:4d} "
+                  f"disponibles={r['disponibles_final']:4d} ({r['segundos']:.2f} s) "
+                  f"{'OK' if ok else 'SOBREVENTA'}")
+            if nombre == 'condicional':
+                correcto = ok
+
+        r = prueba_rendimiento(controller, args.clientes, args.segundos, max(1, args.clientes // 2))
+        invariante = r['disponibles_final'] + r['prestamos_activos'] == r['copias_total']
+        print(f"\nRendimiento ({args.clientes} clientes, {args.segundos:.0f} s): "
+              f"{r['por_segundo']:.0f} operaciones/s, {r['rechazados']} rechazos por falta de copias, "
+              f"invariante de copias {'OK' if invariante else 'ROTA'}")
+        pool = db.estadisticas_pool()
+        print(f"Pool: espera promedio {pool.get('espera_promedio_ms')} ms, "
+              f"máxima {pool.get('espera_maxima_ms')} ms, timeouts {pool.get('timeouts')}")
+
+        if not (correcto and invariante):
+            raise SystemExit(1)
+    finally:
+        db.engine.dispose()
+        os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_proyecciones.py
+# Listas de las cinco entidades: objetos del ORM con sus relaciones (como
+# los cargaban los controladores) contra los modelos de lectura con
+# __slots__ de proyecciones.py. Mide tiempo de hidratación y memoria por fila.
+#
+# Ejecutar: python -m benchmarks.bench_proyecciones --filas 100000
+
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+from sqlalchemy.orm import joinedload
+import migraciones
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from database import db
+from models import Libro, Usuario, Categoria, Autor, Prestamo
+import proyecciones
+
+
+def _orm(consulta):
+    """Ejecuta una consulta del ORM y separa los objetos de la sesión, como lo hacían los controladores"""
+    def cargar():
+        session = db.get_session()
+        try:
+            objetos = consulta(session).all()
+            for objeto in objetos:
+                session.expunge(objeto)
+            return objetos
+        finally:
+            session.close()
+    return cargar
+
+
+def _proyeccion(consulta, construir):
+    def cargar():
+        session = db.get_session()
+        try:
+            return construir(consulta(session))
+        finally:
+            session.close()
+    return cargar
+
+
+CASOS = [
+    ('Libros',
+     _orm(lambda s: s.query(Libro).options(joinedload(Libro.autor), joinedload(Libro.categoria),
+                                           joinedload(Libro.prestamos))),
+     _orm(lambda s: s.query(Libro).options(joinedload(Libro.autor), joinedload(Libro.categoria))),
+     _proyeccion(proyecciones.consulta_libros, proyecciones.construir_libros)),
+    ('Usuarios',
+     None,
+     _orm(lambda s: s.query(Usuario).options(joinedload(Usuario.resumen))),
+     _proyeccion(proyecciones.consulta_usuarios, proyecciones.construir_usuarios)),
+    ('Autores',
+     None,
+     _orm(lambda s: s.query(Autor).options(joinedload(Autor.libros))),
+     _proyeccion(proyecciones.consulta_autores, proyecciones.construir_autores)),
+    ('Categorías',
+     None,
+     _orm(lambda s: s.query(Categoria).options(joinedload(Categoria.libros))),
+     _proyeccion(proyecciones.consulta_categorias, proyecciones.construir_categorias)),
+    ('Préstamos',
+     None,
+     _orm(lambda s: s.query(Prestamo).options(joinedload(Prestamo.usuario), joinedload(Prestamo.libro))),
+     _proyeccion(proyecciones.consulta_prestamos, proyecciones.construir_prestamos)),
+]
+
+
+def medir(cargar):
+    """
+    Retorna (filas, segundos, bytes retenidos por la lista). tracemalloc
+    hace más lento el código, así que la memoria se mide en una segunda pasada.
+    """
+    gc.collect()
+    inicio = time.perf_counter()
+    filas = len(cargar())
+    segundos = time.perf_counter() - inicio
+
+    gc.collect()
+    tracemalloc.start()
+    resultado = cargar()
+    gc.collect()
+    retenido, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return filas, segundos, retenido
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los modelos de lectura de las listas')
+    parser.add_argument('--filas', type=int, default=100000, help='Libros, usuarios, autores y préstamos')
+    args = parser.parse_args()
+
+    ruta = crear_base_sqlite(libros=args.filas, usuarios=args.filas, prestamos=args.filas, autores=args.filas)
+    migraciones.migrar()
+    try:
+        print(f"{'Lista':11s} {'Método':28s} {'Filas':>8s} {'s':>7s} {'µs/fila':>8s} {'bytes/fila':>11s}")
+        for nombre, con_prestamos, orm, proyeccion in CASOS:
+            metodos = [('ORM + relaciones', orm), ('Proyección __slots__', proyeccion)]
+            if con_prestamos:
+                metodos.insert(0, ('ORM + relaciones + préstamos', con_prestamos))
+            for metodo, cargar in metodos:
+                filas, segundos, retenido = medir(cargar)
+                print(f"{nombre:11s} {metodo:28s} {filas:8d} {segundos:7.2f} "
+                      f"{segundos / filas * 1e6:8.1f} {retenido / filas:11.0f}")
+    finally:
+        db.engine.dispose()
+        os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_reportes.py
+# Reportes de circulación: ranking en Python sobre todos los libros con sus
+# préstamos (como lo hacía menu_reportes) contra ReporteController
+# (GROUP BY + TOP-N), con un historial que crece a ritmo constante de
+# préstamos por día
+#
+# Ejecutar: python -m benchmarks.bench_reportes --prestamos 50000,200000,800000
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+import generador_datos
+import migraciones
+from sqlalchemy.orm import joinedload
+from controllers import ReporteController
+from database import db
+from models import Libro
+
+
+def ranking_en_python():
+    """Top 5 de libros como lo calculaba menu_reportes (carga libros y préstamos)"""
+    session = db.get_session()
+    try:
+        libros = session.query(Libro).options(
+            joinedload(Libro.autor), joinedload(Libro.categoria), joinedload(Libro.prestamos)
+        ).all()
+        conteos = {libro.Titulo: len(libro.prestamos) for libro in libros if libro.prestamos}
+        return sorted(conteos.items(), key=lambda x: x[1], reverse=True)[:5]
+    finally:
+        session.close()
+
+
+def medir(funcion, repeticiones):
+    """Mejor tiempo en ms de `repeticiones` ejecuciones"""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return mejor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los reportes de circulación')
+    parser.add_argument('--prestamos', default='50000,200000,800000', help='Tamaños separados por coma')
+    parser.add_argument('--por-dia', type=int, default=250, help='Préstamos por día del historial')
+    parser.add_argument('--libros', type=int, default=20000)
+    parser.add_argument('--usuarios', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--python-hasta', type=int, default=200000,
+                        help='Medir el ranking en Python solo hasta este tamaño')
+    args = parser.parse_args()
+
+    reportes = ReporteController()
+    hasta = date.today()
+    desde = hasta - timedelta(days=29)
+
+    print(f"{'Préstamos':>10s} {'Días':>6s}  {'Reporte':32s} {'ms':>9s}")
+    for prestamos in (int(n) for n in args.prestamos.split(',')):
+        fd, ruta = tempfile.mkstemp(prefix='biblioteca_bench_', suffix='.db')
+        os.close(fd)
+        os.remove(ruta)
+        dias = max(30, prestamos // args.por_dia)
+        try:
+            generador_datos.generar(url=f"sqlite:///{ruta}", libros=args.libros, usuarios=args.usuarios,
+                                    prestamos=prestamos, dias_historial=dias)
+            migraciones.migrar(hasta='0002')
+
+            casos = []
+            if prestamos <= args.python_hasta:
+                casos.append(('Top 5 en Python (histórico)', ranking_en_python))
+            casos += [
+                ('Top 5 SQL (histórico)', lambda: reportes.libros_mas_prestados(limite=5)),
+                ('Reporte 30 días, sin índice', lambda: reportes.obtener_reporte(desde, hasta, 10)),
+            ]
+            for nombre, funcion in casos:
+                print(f"{prestamos:10d} {dias:6d}  {nombre:32s} {medir(funcion, args.repeticiones):9.1f}")
+
+            migraciones.migrar()  # 0003: IX_Prestamos_FechaPrestamo
+            ms = medir(lambda: reportes.obtener_reporte(desde, hasta, 10), args.repeticiones)
+            print(f"{prestamos:10d} {dias:6d}  {'Reporte 30 días, con índice':32s} {ms:9.1f}")
+        finally:
+            db.engine.dispose()
+            os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,436 @@
+# benchmarks/carga.py
+# Prueba de carga concurrente de la aplicación Flask sobre la base SQLite sustituta
+#
+# Levanta app.py en un servidor werkzeug local (un hilo por petición) y lo
+# recorre con N usuarios virtuales, cada uno en su hilo, según un escenario
+# JSON de benchmarks/escenarios/. Todo corre sin red externa.
+#
+# Ejecutar:
+#   python -m benchmarks.carga --escenario mostrador
+#   python -m benchmarks.carga --escenario hora_pico --usuarios-virtuales 32 --pool 10
+#   python -m benchmarks.carga --escenario catalogo --base /tmp/carga.db   (reutilizar la base)
+
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import re
+import sys
+import threading
+import time
+from bisect import bisect
+from datetime import datetime
+from urllib.parse import quote, urlencode
+from sqlalchemy import func, select
+from werkzeug.serving import make_server
+from benchmarks.datos_sinteticos import crear_base_sqlite, PALABRAS
+from benchmarks.suite import percentil, DIRECTORIO_RESULTADOS
+from config import config
+from database import db
+from generador_datos import Zipf
+from models import Libro, Usuario
+import migraciones
+
+DIRECTORIO_ESCENARIOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'escenarios')
+
+# Datos por defecto si el escenario no indica otros
+DATOS_POR_DEFECTO = {'libros': 10_000, 'usuarios': 5_000, 'prestamos': 50_000, 'autores': 1_000}
+
+_MARCADOR = re.compile(r'\{(\w+)\}')
+
+
+class Operacion:
+    """Una petición del escenario con su peso en la mezcla"""
+
+    def __init__(self, definicion):
+        self.nombre = definicion['nombre']
+        self.peso = float(definicion.get('peso', 1))
+        self.metodo = definicion.get('metodo', 'GET').upper()
+        self.ruta = definicion['ruta']
+        self.formulario = definicion.get('formulario')
+        self.esperado = set(definicion.get('esperado', [302] if self.metodo == 'POST' else [200]))
+        # Si la respuesta es la esperada, el libro prestado pasa a la "mochila" del usuario virtual
+        self.registra_prestamo = definicion.get('registra_prestamo', False)
+        plantillas = self.ruta + json.dumps(self.formulario or {})
+        self.marcadores = set(_MARCADOR.findall(plantillas))
+        self.requiere_prestamo = 'isbn_prestado' in self.marcadores
+
+
+class Escenario:
+    """Escenario de carga leído de un archivo JSON"""
+
+    def __init__(self, ruta):
+        with open(ruta, encoding='utf-8') as archivo:
+            definicion = json.load(archivo)
+        self.ruta = ruta
+        self.nombre = definicion.get('nombre', os.path.splitext(os.path.basename(ruta))[0])
+        self.descripcion = definicion.get('descripcion', '')
+        self.usuarios_virtuales = definicion.get('usuarios_virtuales', 8)
+        self.duracion_s = definicion.get('duracion_s', 30)
+        self.rampa_s = definicion.get('rampa_s', 0)
+        self.pausa_ms = tuple(definicion.get('pausa_ms', (0, 0)))
+        self.zipf = definicion.get('exponente_zipf', 0.9)
+        self.datos = dict(DATOS_POR_DEFECTO, **definicion.get('datos', {}))
+        self.operaciones = [Operacion(op) for op in definicion['operaciones']]
+        if not self.operaciones:
+            raise ValueError(f"El escenario {ruta} no tiene operaciones")
+        self.acumulado = list(itertools.accumulate(op.peso for op in self.operaciones))
+
+    @classmethod
+    def cargar(cls, nombre):
+        """
+        Carga un escenario por nombre (benchmarks/escenarios/<nombre>.json) o por ruta
+
+        Args:
+            nombre (str): Nombre o ruta del archivo
+
+        Returns:
+            Escenario: Escenario leído
+        """
+        ruta = nombre if os.path.exists(nombre) else os.path.join(DIRECTORIO_ESCENARIOS, f'{nombre}.json')
+        return cls(ruta)
+
+    def elegir(self, rnd):
+        return self.operaciones[min(bisect(self.acumulado, rnd.random() * self.acumulado[-1]),
+                                    len(self.operaciones) - 1)]
+
+
+def listar_escenarios():
+    """Retorna los nombres de los escenarios incluidos"""
+    return sorted(os.path.splitext(nombre)[0] for nombre in os.listdir(DIRECTORIO_ESCENARIOS)
+                  if nombre.endswith('.json'))
+
+
+class Catalogo:
+    """IDs e ISBN de la base para generar las peticiones"""
+
+    def __init__(self, exponente_zipf):
+        with db.engine.connect() as conn:
+            self.isbn = dict(conn.execute(select(Libro.LibroID, Libro.ISBN)).all())
+            self.maximo_usuario = conn.execute(select(func.max(Usuario.UsuarioID))).scalar() or 1
+        self.libros = sorted(self.isbn)
+        # Mismos libros populares que el generador de datos (misma permutación de rangos)
+        self.popularidad = Zipf(len(self.libros), exponente_zipf)
+
+    def valores(self, operacion, rnd, mochila):
+        """
+        Calcula los valores de los marcadores de una operación: {libro},
+        {isbn}, {usuario}, {palabra}, {prefijo} e {isbn_prestado}
+        """
+        valores = {}
+        if operacion.marcadores & {'libro', 'isbn'} or operacion.registra_prestamo:
+            valores['libro'] = self.libros[self.popularidad.muestra(rnd) - 1]
+            valores['isbn'] = self.isbn[valores['libro']]
+        if 'usuario' in operacion.marcadores:
+            valores['usuario'] = rnd.randint(1, self.maximo_usuario)
+        if operacion.marcadores & {'palabra', 'prefijo'}:
+            valores['palabra'] = rnd.choice(PALABRAS)
+            valores['prefijo'] = valores['palabra'][:rnd.randint(2, 3)]
+        if operacion.requiere_prestamo:
+            valores['isbn_prestado'] = mochila.pop(rnd.randrange(len(mochila)))
+        return valores
+
+
+class Resultado:
+    """Latencias y conteos de un usuario virtual (sin locks; se suman al final)"""
+
+    def __init__(self):
+        self.latencias = {}   # operación -> [segundos]
+        self.errores = {}     # operación -> {descripción: veces}
+        self.rechazos = {}    # operación -> veces
+
+    def registrar(self, nombre, segundos):
+        self.latencias.setdefault(nombre, []).append(segundos)
+
+    def error(self, nombre, descripcion):
+        errores = self.errores.setdefault(nombre, {})
+        errores[descripcion] = errores.get(descripcion, 0) + 1
+
+    def rechazo(self, nombre):
+        self.rechazos[nombre] = self.rechazos.get(nombre, 0) + 1
+
+
+def peticion(puerto, operacion, valores, timeout=60):
+    """
+    Envía una petición al servidor local y lee la respuesta completa
+
+    Returns:
+        int: Código de estado HTTP
+    """
+    ruta = operacion.ruta.format(**{clave: quote(str(valor)) for clave, valor in valores.items()})
+    cuerpo, cabeceras = None, {}
+    if operacion.formulario is not None:
+        cuerpo = urlencode({clave: str(valor).format(**valores) for clave, valor in operacion.formulario.items()})
+        cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=timeout)
+    try:
+        conexion.request(operacion.metodo, ruta, body=cuerpo, headers=cabeceras)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        return respuesta.status
+    finally:
+        conexion.close()
+
+
+def usuario_virtual(indice, escenario, catalogo, puerto, inicio, fin, semilla):
+    """
+    Recorre la mezcla de operaciones hasta `fin`. Los préstamos concedidos
+    se guardan en una mochila y se devuelven después por ISBN, como en el
+    mostrador de circulación.
+    """
+    rnd = random.Random(f"{semilla}-{indice}")
+    resultado = Resultado()
+    mochila = []
+    pausa_min, pausa_max = escenario.pausa_ms
+
+    time.sleep(max(0.0, inicio - time.perf_counter()))
+    while time.perf_counter() < fin:
+        operacion = escenario.elegir(rnd)
+        if operacion.requiere_prestamo and not mochila:
+            continue
+        valores = catalogo.valores(operacion, rnd, mochila)
+
+        comienzo = time.perf_counter()
+        try:
+            estado = peticion(puerto, operacion, valores)
+        except Exception as e:
+            resultado.registrar(operacion.nombre, time.perf_counter() - comienzo)
+            resultado.error(operacion.nombre, type(e).__name__)
+            continue
+        resultado.registrar(operacion.nombre, time.perf_counter() - comienzo)
+
+        if estado in operacion.esperado:
+            if operacion.registra_prestamo:
+                mochila.append(valores['isbn'])
+        elif estado == 200 and operacion.metodo == 'POST':
+            # El formulario se volvió a mostrar con un mensaje (sin copias, usuario con vencidos...)
+            resultado.rechazo(operacion.nombre)
+        else:
+            resultado.error(operacion.nombre, f"HTTP {estado}")
+
+        if pausa_max:
+            time.sleep(rnd.uniform(pausa_min, pausa_max) / 1000)
+    return resultado
+
+
+def vigilar_pool(detener, muestras, intervalo=0.1):
+    """Muestrea las conexiones en uso del pool hasta que se active `detener`"""
+    while not detener.wait(intervalo):
+        pool = db.estadisticas_pool()
+        muestras.append(pool.get('en_uso', 0))
+
+
+def ejecutar(escenario, catalogo, usuarios_virtuales=None, duracion_s=None, semilla=42):
+    """
+    Levanta el servidor local, ejecuta el escenario y resume los resultados
+
+    Args:
+        escenario (Escenario): Escenario a ejecutar
+        catalogo (Catalogo): IDs e ISBN de la base
+        usuarios_virtuales (int): Reemplaza el número del escenario
+        duracion_s (float): Reemplaza la duración del escenario
+        semilla (int): Semilla de los usuarios virtuales
+
+    Returns:
+        dict: Rendimiento total, percentiles, errores y rechazos por
+            operación, y el estado del pool de conexiones
+    """
+    from app import app
+
+    usuarios_virtuales = usuarios_virtuales or escenario.usuarios_virtuales
+    duracion_s = duracion_s or escenario.duracion_s
+
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    hilo_servidor = threading.Thread(target=servidor.serve_forever, name='servidor-carga', daemon=True)
+    hilo_servidor.start()
+
+    metricas_pool = getattr(db.engine.pool, 'metricas', None)
+    if metricas_pool is not None:
+        metricas_pool.reiniciar()
+    detener, muestras_pool = threading.Event(), []
+    vigia = threading.Thread(target=vigilar_pool, args=(detener, muestras_pool), daemon=True)
+    vigia.start()
+
+    resultados = [None] * usuarios_virtuales
+    comienzo = time.perf_counter()
+    fin = comienzo + duracion_s
+
+    def _ejecutar(i):
+        # La rampa reparte el arranque de los usuarios virtuales
+        inicio = comienzo + escenario.rampa_s * i / usuarios_virtuales
+        resultados[i] = usuario_virtual(i, escenario, catalogo, servidor.server_port, inicio, fin, semilla)
+
+    hilos = [threading.Thread(target=_ejecutar, args=(i,), name=f'uv-{i}') for i in range(usuarios_virtuales)]
+    try:
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.perf_counter() - comienzo
+    finally:
+        detener.set()
+        servidor.shutdown()
+
+    return resumir(escenario, resultados, segundos, usuarios_virtuales, muestras_pool)
+
+
+def resumir(escenario, resultados, segundos, usuarios_virtuales, muestras_pool):
+    """Suma los resultados de los usuarios virtuales y calcula percentiles"""
+    operaciones = {}
+    total = errores_total = 0
+    for op in escenario.operaciones:
+        latencias = sorted(itertools.chain.from_iterable(r.latencias.get(op.nombre, []) for r in resultados))
+        errores = {}
+        for r in resultados:
+            for descripcion, veces in r.errores.get(op.nombre, {}).items():
+                errores[descripcion] = errores.get(descripcion, 0) + veces
+        rechazos = sum(r.rechazos.get(op.nombre, 0) for r in resultados)
+        total += len(latencias)
+        errores_total += sum(errores.values())
+        operaciones[op.nombre] = {
+            'peticiones': len(latencias),
+            'por_segundo': round(len(latencias) / segundos, 2),
+            'p50_ms': round(percentil(latencias, 0.50) * 1000, 2) if latencias else None,
+            'p95_ms': round(percentil(latencias, 0.95) * 1000, 2) if latencias else None,
+            'p99_ms': round(percentil(latencias, 0.99) * 1000, 2) if latencias else None,
+            'maximo_ms': round(latencias[-1] * 1000, 2) if latencias else None,
+            'errores': errores,
+            'rechazos': rechazos,
+        }
+
+    todas = sorted(itertools.chain.from_iterable(
+        itertools.chain.from_iterable(r.latencias.values()) for r in resultados))
+    pool = db.estadisticas_pool()
+    return {
+        'escenario': escenario.nombre,
+        'usuarios_virtuales': usuarios_virtuales,
+        'segundos': round(segundos, 2),
+        'peticiones': total,
+        'por_segundo': round(total / segundos, 2),
+        'tasa_errores': round(errores_total / total, 4) if total else 0.0,
+        'p50_ms': round(percentil(todas, 0.50) * 1000, 2) if todas else None,
+        'p95_ms': round(percentil(todas, 0.95) * 1000, 2) if todas else None,
+        'p99_ms': round(percentil(todas, 0.99) * 1000, 2) if todas else None,
+        'operaciones': operaciones,
+        'pool': {
+            'tamano': pool.get('tamano'),
+            'max_overflow': pool.get('max_overflow'),
+            'en_uso_maximo': max(muestras_pool, default=0),
+            'en_uso_promedio': round(sum(muestras_pool) / len(muestras_pool), 2) if muestras_pool else 0,
+            'espera_promedio_ms': pool.get('espera_promedio_ms'),
+            'espera_maxima_ms': pool.get('espera_maxima_ms'),
+            'timeouts': pool.get('timeouts'),
+        },
+    }
+
+
+def imprimir(resumen):
+    print(f"\n{'Operación':22s} {'n':>7s} {'req/s':>8s} {'p50 (ms)':>10s} {'p95 (ms)':>10s} "
+          f"{'p99 (ms)':>10s} {'errores':>8s} {'rechazos':>9s}")
+    for nombre, op in resumen['operaciones'].items():
+        if not op['peticiones']:
+            print(f"{nombre:22s} {0:7d}")
+            continue
+        print(f"{nombre:22s} {op['peticiones']:7d} {op['por_segundo']:8.1f} {op['p50_ms']:10.2f} "
+              f"{op['p95_ms']:10.2f} {op['p99_ms']:10.2f} {sum(op['errores'].values()):8d} {op['rechazos']:9d}")
+        for descripcion, veces in op['errores'].items():
+            print(f"{'':22s}   {veces}x {descripcion}")
+
+    pool = resumen['pool']
+    print(f"\nTotal: {resumen['peticiones']} peticiones en {resumen['segundos']:.1f} s "
+          f"({resumen['por_segundo']:.1f} req/s) con {resumen['usuarios_virtuales']} usuarios virtuales; "
+          f"p50 {resumen['p50_ms']} ms, p95 {resumen['p95_ms']} ms, p99 {resumen['p99_ms']} ms; "
+          f"errores {resumen['tasa_errores']:.2%}")
+    print(f"Pool: tamaño {pool['tamano']} + {pool['max_overflow']} overflow, en uso máx. {pool['en_uso_maximo']} "
+          f"(prom. {pool['en_uso_promedio']}), espera promedio {pool['espera_promedio_ms']} ms, "
+          f"máxima {pool['espera_maxima_ms']} ms, timeouts {pool['timeouts']}")
+
+
+def preparar_base(escenario, ruta):
+    """
+    Reutiliza la base SQLite indicada o genera una con los datos del escenario
+
+    Returns:
+        tuple: (ruta del archivo, True si hay que borrarlo al terminar)
+    """
+    if ruta and os.path.exists(ruta):
+        print(f"Reutilizando {ruta}")
+        db.configure(f"sqlite:///{ruta}")
+        migraciones.migrar()
+        return ruta, False
+
+    datos = escenario.datos
+    print(f"Generando base: {datos['libros']} libros, {datos['usuarios']} usuarios, {datos['prestamos']} préstamos...")
+    inicio = time.perf_counter()
+    ruta_creada = crear_base_sqlite(ruta, **datos)
+    migraciones.migrar()
+    print(f"  lista en {time.perf_counter() - inicio:.1f} s")
+    return ruta_creada, ruta is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga concurrente de la aplicación web')
+    parser.add_argument('--escenario', default='mostrador',
+                        help=f"Nombre en benchmarks/escenarios/ ({', '.join(listar_escenarios())}) o ruta a un JSON")
+    parser.add_argument('--usuarios-virtuales', type=int, help='Reemplaza el valor del escenario')
+    parser.add_argument('--duracion', type=float, help='Segundos de carga (reemplaza el valor del escenario)')
+    parser.add_argument('--pool', type=int, help='Tamaño del pool de conexiones (default: config.POOL_SIZE)')
+    parser.add_argument('--overflow', type=int, help='Conexiones de overflow (default: config.MAX_OVERFLOW)')
+    parser.add_argument('--base', help='Archivo SQLite a reutilizar (se crea si no existe)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Archivo JSON de resultados (default: benchmarks/resultados/)')
+    parser.add_argument('--max-errores', type=float, default=0.01,
+                        help='Tasa de errores tolerada; si se supera termina con código 1')
+    parser.add_argument('--detalle', action='store_true', help='Mostrar el registro de cada petición y las advertencias SQL')
+    args = parser.parse_args()
+
+    escenario = Escenario.cargar(args.escenario)
+    if not args.detalle:
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        logging.getLogger('biblioteca.sql').setLevel(logging.ERROR)
+
+    ruta, borrar = preparar_base(escenario, args.base)
+    if args.pool is not None or args.overflow is not None:
+        # El pool se dimensiona al configurar el engine
+        config.POOL_SIZE = config.POOL_SIZE if args.pool is None else args.pool
+        config.MAX_OVERFLOW = config.MAX_OVERFLOW if args.overflow is None else args.overflow
+        db.configure(f"sqlite:///{ruta}")
+
+    try:
+        catalogo = Catalogo(escenario.zipf)
+        usuarios_virtuales = args.usuarios_virtuales or escenario.usuarios_virtuales
+        print(f"\nEscenario '{escenario.nombre}': {escenario.descripcion}")
+        print(f"{usuarios_virtuales} usuarios virtuales durante {args.duracion or escenario.duracion_s} s "
+              f"(rampa {escenario.rampa_s} s, pausa {escenario.pausa_ms[0]}-{escenario.pausa_ms[1]} ms)")
+        resumen = ejecutar(escenario, catalogo, args.usuarios_virtuales, args.duracion, args.semilla)
+    finally:
+        db.engine.dispose()
+        if borrar:
+            os.remove(ruta)
+
+    imprimir(resumen)
+    resumen.update({
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'datos': escenario.datos,
+    })
+    salida = args.salida or os.path.join(
+        DIRECTORIO_RESULTADOS, f"carga-{escenario.nombre}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(salida) or '.', exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resumen, archivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados: {salida}")
+
+    if resumen['tasa_errores'] > args.max_errores:
+        print(f"[ERROR] La tasa de errores {resumen['tasa_errores']:.2%} supera {args.max_errores:.2%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
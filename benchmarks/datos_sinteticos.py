@@ -0,0 +1,41 @@
+# benchmarks/datos_sinteticos.py
+# Construcción de una base SQLite sustituta con datos sintéticos
+
+import os
+import tempfile
+import generador_datos
+from generador_datos import PALABRAS, NOMBRES, APELLIDOS  # noqa: F401  (usados por los benchmarks)
+
+
+def crear_base_sqlite(ruta=None, libros=10000, usuarios=1000, prestamos=20000,
+                      autores=500, categorias=20, semilla=42, indices=True):
+    """
+    Crea una base SQLite con el esquema de los modelos y datos sintéticos
+    (ver generador_datos.py), y reconfigura la instancia global `db` para
+    que apunte a ella.
+
+    Args:
+        ruta (str): Archivo SQLite (por defecto uno temporal)
+        libros (int): Número de libros
+        usuarios (int): Número de usuarios
+        prestamos (int): Número de préstamos
+        autores (int): Número de autores
+        categorias (int): Número de categorías
+        semilla (int): Semilla para reproducibilidad
+        indices (bool): Crear los índices de la migración 0002 (False para
+            medir las consultas sin ellos)
+
+    Returns:
+        str: Ruta del archivo SQLite creado
+    """
+    if ruta is None:
+        fd, ruta = tempfile.mkstemp(prefix='biblioteca_bench_', suffix='.db')
+        os.close(fd)
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+    generador_datos.generar(
+        url=f"sqlite:///{ruta}", libros=libros, usuarios=usuarios, prestamos=prestamos,
+        autores=autores, categorias=categorias, semilla=semilla, indices=indices
+    )
+    return ruta
@@ -0,0 +1,401 @@
+# benchmarks/suite.py
+# Suite de rendimiento: todos los métodos públicos de los controladores y las
+# rutas principales de Flask sobre un catálogo sintético grande
+#
+# Ejecutar:
+#   python -m benchmarks.suite --escala pequena                 (medir y comparar con la línea base)
+#   python -m benchmarks.suite --escala pequena --guardar-base  (fijar la línea base)
+#   python -m benchmarks.suite --escala pequena --exigir-base   (en CI: falla si no hay línea base)
+#   python -m benchmarks.suite --escala grande --bases /tmp/bases  (reutilizar la base generada)
+#
+# Termina con código 1 si el p50 o el p95 de algún caso empeora más que
+# --umbral respecto a benchmarks/linea_base/<escala>.json, o si falta la
+# línea base y se pasó --exigir-base (para que CI no pase sin comparar).
+
+import argparse
+import inspect
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from controllers import (LibroController, UsuarioController, PrestamoController, CategoriaController,
+                         AutorController, EstadisticaController)
+from database import db
+import migraciones
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_RESULTADOS = os.path.join(DIRECTORIO, 'resultados')
+DIRECTORIO_LINEA_BASE = os.path.join(DIRECTORIO, 'linea_base')
+
+ESCALAS = {
+    'pequena': {'libros': 10_000, 'usuarios': 10_000, 'prestamos': 50_000, 'autores': 2_000},
+    'mediana': {'libros': 100_000, 'usuarios': 100_000, 'prestamos': 500_000, 'autores': 10_000},
+    'grande': {'libros': 1_000_000, 'usuarios': 100_000, 'prestamos': 5_000_000, 'autores': 50_000},
+}
+
+RUTAS = [
+    '/', '/libros', '/libros?limit=100', '/libros/buscar?q=amor', '/libros/1', '/libros/nuevo',
+    '/usuarios', '/usuarios/1', '/categorias', '/categorias/1', '/autores', '/autores/1',
+    '/prestamos', '/prestamos/vencidos', '/prestamos/nuevo',
+    '/api/libros', '/api/usuarios', '/api/prestamos', '/api/autocompletar?q=am',
+]
+
+
+class Caso:
+    """Una operación a medir; `funcion(i)` recibe el número de iteración"""
+
+    def __init__(self, nombre, funcion, escritura=False):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.escritura = escritura
+
+
+def _consumir(iterable):
+    """Recorre un generador (exportaciones) y retorna cuántos elementos produjo"""
+    return sum(1 for _ in iterable)
+
+
+def casos_controladores():
+    """
+    Casos para cada método público de los controladores. Las escrituras se
+    encadenan (crear -> actualizar -> eliminar) sobre registros creados por
+    la propia suite, para no alterar los datos sintéticos.
+
+    Returns:
+        list: Casos en orden de ejecución
+    """
+    libros, usuarios, prestamos = LibroController(), UsuarioController(), PrestamoController()
+    categorias, autores, estadisticas = CategoriaController(), AutorController(), EstadisticaController()
+    sufijo = datetime.now().strftime('%H%M%S')
+    creados = {'libros': [], 'usuarios': [], 'autores': [], 'categorias': [], 'prestamos': [], 'lotes': []}
+
+    # Usuario y libro propios para los préstamos (siempre elegibles y con copias)
+    _, _, usuario_suite = usuarios.crear({
+        'numero_carnet': f'SUITE{sufijo}', 'nombre': 'Suite', 'apellido': 'Benchmark',
+        'email': f'suite{sufijo}@example.com'
+    })
+    _, _, libro_suite = libros.crear({
+        'titulo': f'Libro de la suite {sufijo}', 'isbn': f'SUITE-{sufijo}', 'autor_id': 1,
+        'categoria_id': 1, 'copias': 100000
+    })
+
+    def _crear_libro(i):
+        exito, mensaje, libro_id = libros.crear({
+            'titulo': f'Suite {sufijo} {i}', 'isbn': f'S{sufijo}-{i}', 'autor_id': 1, 'categoria_id': 1, 'copias': 1
+        })
+        creados['libros'].append(libro_id)
+
+    def _crear_usuario(i):
+        _, _, usuario_id = usuarios.crear({
+            'numero_carnet': f'S{sufijo}-{i}', 'nombre': 'Suite', 'apellido': f'Usuario {i}',
+            'email': f's{sufijo}.{i}@example.com'
+        })
+        creados['usuarios'].append(usuario_id)
+
+    def _crear_autor(i):
+        creados['autores'].append(autores.crear({'nombre': 'Suite', 'apellido': f'Autor {sufijo} {i}'})[2])
+
+    def _crear_categoria(i):
+        creados['categorias'].append(categorias.crear({'nombre_categoria': f'Suite {sufijo} {i}'})[2])
+
+    def _crear_prestamo(i):
+        creados['prestamos'].append(prestamos.crear_prestamo(libro_suite, usuario_suite)[2])
+
+    def _crear_lote(i):
+        _, _, resultados = prestamos.crear_prestamos_lote(usuario_suite, [libro_suite, 1, 2])
+        creados['lotes'].append([r['prestamo_id'] for r in resultados if r['prestamo_id']])
+
+    def _siguiente(lista, i):
+        return lista[i % len(lista)] if lista else None
+
+    return [
+        # ---- Estadísticas ----
+        Caso('EstadisticaController.obtener_resumen', lambda i: estadisticas.obtener_resumen()),
+        # ---- Libros ----
+        Caso('LibroController.obtener_todos', lambda i: libros.obtener_todos()),
+        Caso('LibroController.obtener_pagina', lambda i: libros.obtener_pagina()),
+        Caso('LibroController.exportar', lambda i: _consumir(libros.exportar())),
+        Caso('LibroController.obtener_por_id', lambda i: libros.obtener_por_id(i + 1)),
+        Caso('LibroController.construir_indice', lambda i: libros.construir_indice()),
+        Caso('LibroController.cargar_autocompletado', lambda i: libros.cargar_autocompletado()),
+        Caso('LibroController.buscar', lambda i: libros.buscar(('amor', 'guerra tiempo', 'ciencia', 'caribe')[i % 4])),
+        Caso('LibroController.obtener_disponibles', lambda i: libros.obtener_disponibles()),
+        Caso('LibroController.crear', _crear_libro, escritura=True),
+        Caso('LibroController.actualizar', lambda i: libros.actualizar(
+            _siguiente(creados['libros'], i), {'titulo': f'Suite {sufijo} {i} editado'}), escritura=True),
+        Caso('LibroController.eliminar', lambda i: libros.eliminar(creados['libros'].pop()), escritura=True),
+        # ---- Usuarios ----
+        Caso('UsuarioController.obtener_todos', lambda i: usuarios.obtener_todos()),
+        Caso('UsuarioController.obtener_pagina', lambda i: usuarios.obtener_pagina()),
+        Caso('UsuarioController.exportar', lambda i: _consumir(usuarios.exportar())),
+        Caso('UsuarioController.obtener_por_id', lambda i: usuarios.obtener_por_id(i + 1)),
+        Caso('UsuarioController.obtener_por_carnet', lambda i: usuarios.obtener_por_carnet(f'USR{i + 1:07d}')),
+        Caso('UsuarioController.obtener_prestamos_activos', lambda i: usuarios.obtener_prestamos_activos(i + 1)),
+        Caso('UsuarioController.crear', _crear_usuario, escritura=True),
+        Caso('UsuarioController.actualizar', lambda i: usuarios.actualizar(
+            _siguiente(creados['usuarios'], i), {'telefono': f'809-555-{i:04d}'}), escritura=True),
+        Caso('UsuarioController.desactivar', lambda i: usuarios.desactivar(
+            _siguiente(creados['usuarios'], i)), escritura=True),
+        Caso('UsuarioController.activar', lambda i: usuarios.activar(
+            _siguiente(creados['usuarios'], i)), escritura=True),
+        # ---- Categorías ----
+        Caso('CategoriaController.obtener_todos', lambda i: categorias.obtener_todos()),
+        Caso('CategoriaController.obtener_opciones', lambda i: categorias.obtener_opciones()),
+        Caso('CategoriaController.obtener_pagina', lambda i: categorias.obtener_pagina()),
+        Caso('CategoriaController.cargar_autocompletado', lambda i: categorias.cargar_autocompletado()),
+        Caso('CategoriaController.obtener_por_id', lambda i: categorias.obtener_por_id(i % 10 + 1)),
+        Caso('CategoriaController.buscar', lambda i: categorias.buscar('Ciencia')),
+        Caso('CategoriaController.contar_libros', lambda i: categorias.contar_libros(i % 10 + 1)),
+        Caso('CategoriaController.crear', _crear_categoria, escritura=True),
+        Caso('CategoriaController.actualizar', lambda i: categorias.actualizar(
+            _siguiente(creados['categorias'], i), {'descripcion': f'Editada {i}'}), escritura=True),
+        Caso('CategoriaController.eliminar', lambda i: categorias.eliminar(creados['categorias'].pop()),
+             escritura=True),
+        # ---- Autores ----
+        Caso('AutorController.obtener_todos', lambda i: autores.obtener_todos()),
+        Caso('AutorController.obtener_opciones', lambda i: autores.obtener_opciones()),
+        Caso('AutorController.obtener_pagina', lambda i: autores.obtener_pagina()),
+        Caso('AutorController.cargar_autocompletado', lambda i: autores.cargar_autocompletado()),
+        Caso('AutorController.obtener_por_id', lambda i: autores.obtener_por_id(i + 1)),
+        Caso('AutorController.buscar', lambda i: autores.buscar(('García', 'Ana', 'Pérez')[i % 3])),
+        Caso('AutorController.contar_libros', lambda i: autores.contar_libros(i + 1)),
+        Caso('AutorController.crear', _crear_autor, escritura=True),
+        Caso('AutorController.actualizar', lambda i: autores.actualizar(
+            _siguiente(creados['autores'], i), {'nacionalidad': 'Dominicana'}), escritura=True),
+        Caso('AutorController.eliminar', lambda i: autores.eliminar(creados['autores'].pop()), escritura=True),
+        # ---- Préstamos ----
+        Caso('PrestamoController.obtener_prestamos_activos', lambda i: prestamos.obtener_prestamos_activos()),
+        Caso('PrestamoController.obtener_pagina_activos', lambda i: prestamos.obtener_pagina_activos()),
+        Caso('PrestamoController.exportar_activos', lambda i: _consumir(prestamos.exportar_activos())),
+        Caso('PrestamoController.obtener_prestamos_vencidos', lambda i: prestamos.obtener_prestamos_vencidos()),
+        Caso('PrestamoController.obtener_por_id', lambda i: prestamos.obtener_por_id(i + 1)),
+        Caso('PrestamoController.obtener_por_libro', lambda i: prestamos.obtener_por_libro(i + 1)),
+        Caso('PrestamoController.crear_prestamo', _crear_prestamo, escritura=True),
+        Caso('PrestamoController.devolver_libro', lambda i: prestamos.devolver_libro(creados['prestamos'].pop()),
+             escritura=True),
+        Caso('PrestamoController.crear_prestamos_lote', _crear_lote, escritura=True),
+        Caso('PrestamoController.devolver_lote', lambda i: prestamos.devolver_lote(
+            prestamo_ids=creados['lotes'].pop()), escritura=True),
+        Caso('PrestamoController.acumular_multas', lambda i: prestamos.acumular_multas(), escritura=True),
+    ]
+
+
+def casos_rutas():
+    """Casos para las rutas principales a través del cliente de pruebas de Flask"""
+    import app as aplicacion
+    cliente = aplicacion.app.test_client()
+
+    def _get(url):
+        def _peticion(i):
+            respuesta = cliente.get(url)
+            if respuesta.status_code >= 400:
+                raise RuntimeError(f"{url} respondió {respuesta.status_code}")
+            return respuesta
+        return _peticion
+
+    return [Caso(f"GET {url}", _get(url)) for url in RUTAS]
+
+
+def verificar_cobertura(casos):
+    """Advierte de los métodos públicos de controladores que no tienen caso"""
+    medidos = {caso.nombre for caso in casos}
+    faltantes = []
+    for clase in (LibroController, UsuarioController, PrestamoController, CategoriaController,
+                  AutorController, EstadisticaController):
+        for nombre, _ in inspect.getmembers(clase, inspect.isfunction):
+            if not nombre.startswith('_') and f"{clase.__name__}.{nombre}" not in medidos:
+                faltantes.append(f"{clase.__name__}.{nombre}")
+    if faltantes:
+        print(f"[AVISO] Métodos sin caso en la suite: {', '.join(faltantes)}")
+    return faltantes
+
+
+def percentil(muestras, fraccion):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    return muestras[max(0, math.ceil(fraccion * len(muestras)) - 1)]
+
+
+def medir(caso, repeticiones, maximo_segundos):
+    """
+    Ejecuta un caso hasta `repeticiones` veces (o hasta agotar
+    `maximo_segundos`, con al menos una ejecución) y resume sus tiempos
+
+    Returns:
+        dict: Muestras y p50/p95/media/mínimo/máximo en ms, o el error
+    """
+    if not caso.escritura:
+        caso.funcion(0)  # calentamiento (cachés del ORM y de SQLite)
+
+    tiempos = []
+    limite = time.perf_counter() + maximo_segundos
+    try:
+        for i in range(repeticiones):
+            inicio = time.perf_counter()
+            caso.funcion(i)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            if time.perf_counter() > limite:
+                break
+    except Exception as e:
+        return {'error': str(e), 'muestras': len(tiempos)}
+
+    tiempos.sort()
+    return {
+        'muestras': len(tiempos),
+        'p50_ms': round(percentil(tiempos, 0.50), 3),
+        'p95_ms': round(percentil(tiempos, 0.95), 3),
+        'media_ms': round(sum(tiempos) / len(tiempos), 3),
+        'min_ms': round(tiempos[0], 3),
+        'max_ms': round(tiempos[-1], 3),
+    }
+
+
+def comparar(actual, base, umbral, minimo_ms):
+    """
+    Compara los resultados con la línea base
+
+    Args:
+        actual (dict): Resultados de esta ejecución por caso
+        base (dict): Resultados de la línea base por caso
+        umbral (float): Empeoramiento relativo tolerado (0.25 = 25 %)
+        minimo_ms (float): Diferencia absoluta mínima para considerar regresión
+
+    Returns:
+        list: Tuplas (caso, métrica, base_ms, actual_ms) que empeoraron
+    """
+    regresiones = []
+    for nombre, resultado in actual.items():
+        anterior = base.get(nombre)
+        if not anterior or 'error' in resultado or 'error' in anterior:
+            continue
+        for metrica in ('p50_ms', 'p95_ms'):
+            antes, ahora = anterior[metrica], resultado[metrica]
+            if ahora > antes * (1 + umbral) and ahora - antes > minimo_ms:
+                regresiones.append((nombre, metrica, antes, ahora))
+    return regresiones
+
+
+def preparar_base(escala, directorio_bases):
+    """
+    Crea (o reutiliza, si se indicó un directorio de bases) la base SQLite
+    de la escala, con las migraciones aplicadas
+
+    Returns:
+        tuple: (ruta del archivo, True si hay que borrarlo al terminar)
+    """
+    parametros = ESCALAS[escala]
+    if directorio_bases:
+        os.makedirs(directorio_bases, exist_ok=True)
+        ruta = os.path.join(directorio_bases, f'suite_{escala}.db')
+        if os.path.exists(ruta):
+            print(f"Reutilizando {ruta}")
+            db.configure(f"sqlite:///{ruta}")
+            migraciones.migrar()
+            return ruta, False
+    else:
+        ruta = None
+
+    print(f"Generando base '{escala}': {parametros['libros']} libros, {parametros['usuarios']} usuarios, "
+          f"{parametros['prestamos']} préstamos...")
+    inicio = time.perf_counter()
+    ruta = crear_base_sqlite(ruta, **parametros)
+    migraciones.migrar()
+    print(f"  lista en {time.perf_counter() - inicio:.1f} s")
+    return ruta, directorio_bases is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suite de rendimiento de controladores y rutas')
+    parser.add_argument('--escala', default='pequena',
+                        help=f"Escalas separadas por coma ({', '.join(ESCALAS)})")
+    parser.add_argument('--repeticiones', type=int, default=20, help='Ejecuciones por caso')
+    parser.add_argument('--maximo-segundos', type=float, default=15.0,
+                        help='Tiempo máximo por caso (se hace al menos una ejecución)')
+    parser.add_argument('--casos', help='Solo los casos que contengan este texto')
+    parser.add_argument('--bases', help='Directorio donde guardar y reutilizar las bases generadas')
+    parser.add_argument('--salida', help='Archivo JSON de resultados (default: benchmarks/resultados/)')
+    parser.add_argument('--linea-base', help='Archivo de línea base (default: benchmarks/linea_base/<escala>.json)')
+    parser.add_argument('--guardar-base', action='store_true', help='Guardar los resultados como línea base')
+    parser.add_argument('--exigir-base', action='store_true',
+                        help='Terminar con error si no existe la línea base de la escala')
+    parser.add_argument('--umbral', type=float, default=0.25, help='Regresión tolerada de p50/p95 (0.25 = 25%%)')
+    parser.add_argument('--minimo-ms', type=float, default=2.0,
+                        help='Diferencia mínima en ms para contar una regresión (evita ruido)')
+    args = parser.parse_args()
+
+    hubo_regresion = falta_base = False
+    for escala in args.escala.split(','):
+        if escala not in ESCALAS:
+            parser.error(f"Escala desconocida: {escala}")
+
+        ruta, borrar = preparar_base(escala, args.bases)
+        try:
+            casos = casos_controladores() + casos_rutas()
+            verificar_cobertura(casos)
+            if args.casos:
+                casos = [caso for caso in casos if args.casos in caso.nombre]
+
+            resultados = {}
+            print(f"\n{'Caso':55s} {'n':>4s} {'p50 (ms)':>10s} {'p95 (ms)':>10s}")
+            for caso in casos:
+                resultado = medir(caso, args.repeticiones, args.maximo_segundos)
+                resultados[caso.nombre] = resultado
+                if 'error' in resultado:
+                    print(f"{caso.nombre:55s} ERROR: {resultado['error']}")
+                else:
+                    print(f"{caso.nombre:55s} {resultado['muestras']:4d} "
+                          f"{resultado['p50_ms']:10.2f} {resultado['p95_ms']:10.2f}")
+        finally:
+            db.engine.dispose()
+            if borrar:
+                os.remove(ruta)
+
+        documento = {
+            'escala': escala,
+            'parametros': ESCALAS[escala],
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'repeticiones': args.repeticiones,
+            'casos': resultados,
+        }
+
+        salida = args.salida or os.path.join(
+            DIRECTORIO_RESULTADOS, f"{escala}-{datetime.now():%Y%m%d-%H%M%S}.json")
+        os.makedirs(os.path.dirname(salida) or '.', exist_ok=True)
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            json.dump(documento, archivo, ensure_ascii=False, indent=2)
+        print(f"\nResultados: {salida}")
+
+        ruta_base = args.linea_base or os.path.join(DIRECTORIO_LINEA_BASE, f'{escala}.json')
+        if args.guardar_base:
+            os.makedirs(os.path.dirname(ruta_base), exist_ok=True)
+            with open(ruta_base, 'w', encoding='utf-8') as archivo:
+                json.dump(documento, archivo, ensure_ascii=False, indent=2)
+            print(f"Línea base guardada: {ruta_base}")
+        elif os.path.exists(ruta_base):
+            with open(ruta_base, encoding='utf-8') as archivo:
+                base = json.load(archivo)['casos']
+            regresiones = comparar(resultados, base, args.umbral, args.minimo_ms)
+            if regresiones:
+                hubo_regresion = True
+                print(f"\n[REGRESIÓN] {len(regresiones)} métrica(s) empeoraron más de {args.umbral:.0%}:")
+                for nombre, metrica, antes, ahora in regresiones:
+                    print(f"  {nombre:55s} {metrica}: {antes:.2f} -> {ahora:.2f} ms ({ahora / antes - 1:+.0%})")
+            else:
+                print(f"Sin regresiones respecto a {ruta_base}")
+        elif args.exigir_base:
+            falta_base = True
+            print(f"\n[ERROR] No hay línea base en {ruta_base} (use --guardar-base para crearla)")
+        else:
+            print(f"No hay línea base en {ruta_base} (use --guardar-base para crearla)")
+
+    if hubo_regresion or falta_base:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
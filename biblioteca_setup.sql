@@ -108,6 +108,26 @@ BEGIN
 END
 GO
 
+-- =============================================
+-- TABLA: ResumenUsuarios
+-- Resumen de préstamos por usuario, mantenido por la aplicación
+-- (ver resumen_usuarios.py; "python resumen_usuarios.py" lo reconstruye)
+-- =============================================
+IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[ResumenUsuarios]') AND type in (N'U'))
+BEGIN
+    CREATE TABLE [dbo].[ResumenUsuarios](
+        [UsuarioID] [int] NOT NULL,
+        [PrestamosActivos] [int] NOT NULL DEFAULT 0,
+        [PrestamosVencidos] [int] NOT NULL DEFAULT 0,
+        [MultasPendientes] [decimal](10,2) NOT NULL DEFAULT 0,
+        [ProximoVencimiento] [date] NULL,
+        [UltimaActividad] [datetime] NULL,
+        CONSTRAINT [PK_ResumenUsuarios] PRIMARY KEY CLUSTERED ([UsuarioID] ASC),
+        CONSTRAINT [FK_ResumenUsuarios_Usuarios] FOREIGN KEY ([UsuarioID]) REFERENCES [dbo].[Usuarios]([UsuarioID])
+    )
+END
+GO
+
 -- =============================================
 -- DATOS DE PRUEBA
 -- =============================================
@@ -164,6 +184,19 @@ INSERT INTO [dbo].[Prestamos] (PrestamoID, LibroID, UsuarioID, FechaPrestamo, Fe
 SET IDENTITY_INSERT [dbo].[Prestamos] OFF
 GO
 
+-- Resumen inicial de préstamos por usuario
+INSERT INTO [dbo].[ResumenUsuarios] (UsuarioID, PrestamosActivos, PrestamosVencidos, MultasPendientes, ProximoVencimiento, UltimaActividad)
+SELECT u.UsuarioID,
+       COUNT(CASE WHEN p.Estado = 'Prestado' THEN 1 END),
+       COUNT(CASE WHEN p.Estado = 'Prestado' AND p.FechaDevolucionEsperada < CAST(GETDATE() AS date) THEN 1 END),
+       COALESCE(SUM(CASE WHEN p.Estado = 'Prestado' THEN p.Multa END), 0),
+       MIN(CASE WHEN p.Estado = 'Prestado' THEN p.FechaDevolucionEsperada END),
+       MAX(COALESCE(p.FechaDevolucionReal, p.FechaPrestamo))
+FROM [dbo].[Usuarios] u
+LEFT JOIN [dbo].[Prestamos] p ON p.UsuarioID = u.UsuarioID
+GROUP BY u.UsuarioID
+GO
+
 -- =============================================
 -- ÍNDICES PARA OPTIMIZACIÓN
 -- =============================================
@@ -179,5 +212,9 @@ GO
 CREATE NONCLUSTERED INDEX [IX_Usuarios_Estado] ON [dbo].[Usuarios] ([Estado])
 GO
 
+-- Los índices compuestos para las consultas frecuentes (vencidos,
+-- elegibilidad, historial por libro, disponibles) se crean con el
+-- ejecutor de migraciones: python -m migraciones
+
 PRINT 'Base de datos BibliotecaDB creada exitosamente con datos de prueba'
 GO
@@ -0,0 +1,123 @@
+# cache.py
+# Caché en memoria del proceso para datos de referencia (autores, categorías)
+
+import threading
+import time
+from config import config
+
+
+class CacheReferencia:
+    """
+    Caché de lectura (read-through) con expiración por TTL y versiones.
+
+    Las claves se agrupan en espacios ("autores", "categorias"). Cada espacio
+    tiene un número de versión que se incrementa al invalidarlo; un valor
+    cargado con una versión anterior nunca se guarda, de modo que una carga
+    que compite con una escritura no deja datos viejos en la caché.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = config.CACHE_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._cargas = {}        # clave -> Lock para que solo un hilo cargue cada clave
+        self._entradas = {}      # (espacio, nombre) -> (version, expira, valor)
+        self._versiones = {}     # espacio -> versión actual
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, espacio, nombre, cargar):
+        """
+        Retorna el valor en caché o lo carga con `cargar()` si no está vigente
+
+        Args:
+            espacio (str): Espacio de la clave (por ejemplo, 'autores')
+            nombre (str): Nombre de la clave dentro del espacio
+            cargar (callable): Función sin argumentos que obtiene el valor
+
+        Returns:
+            object: Valor de la caché o recién cargado
+        """
+        clave = (espacio, nombre)
+        valor = self._vigente(clave)
+        if valor is not None:
+            return valor
+
+        with self._lock:
+            lock_carga = self._cargas.setdefault(clave, threading.Lock())
+
+        with lock_carga:
+            # Otro hilo pudo haberlo cargado mientras se esperaba
+            valor = self._vigente(clave, contar=False)
+            if valor is not None:
+                with self._lock:
+                    self.aciertos += 1
+                return valor
+
+            with self._lock:
+                self.fallos += 1
+                version = self._versiones.get(espacio, 0)
+
+            valor = cargar()
+
+            with self._lock:
+                if self._versiones.get(espacio, 0) == version:
+                    self._entradas[clave] = (version, time.monotonic() + self.ttl, valor)
+            return valor
+
+    def _vigente(self, clave, contar=True):
+        """Retorna el valor si existe, no expiró y es de la versión actual"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                version, expira, valor = entrada
+                if version == self._versiones.get(clave[0], 0) and time.monotonic() < expira:
+                    if contar:
+                        self.aciertos += 1
+                    return valor
+                del self._entradas[clave]
+            return None
+
+    def invalidar(self, *espacios):
+        """
+        Invalida todas las claves de los espacios indicados
+
+        Args:
+            *espacios (str): Espacios a invalidar
+        """
+        with self._lock:
+            for espacio in espacios:
+                self._versiones[espacio] = self._versiones.get(espacio, 0) + 1
+                for clave in [c for c in self._entradas if c[0] == espacio]:
+                    del self._entradas[clave]
+                self.invalidaciones += 1
+
+    def limpiar(self):
+        """Elimina todas las entradas (los contadores se conservan)"""
+        with self._lock:
+            for espacio in list(self._versiones):
+                self._versiones[espacio] += 1
+            self._entradas.clear()
+
+    def estadisticas(self):
+        """
+        Retorna los contadores de la caché
+
+        Returns:
+            dict: Aciertos, fallos, tasa de aciertos, invalidaciones, entradas y versiones
+        """
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+                'invalidaciones': self.invalidaciones,
+                'entradas': sorted(f"{espacio}.{nombre}" for espacio, nombre in self._entradas),
+                'versiones': dict(self._versiones),
+                'ttl': self.ttl
+            }
+
+
+# Instancia global de la caché de referencia
+cache_referencia = CacheReferencia()
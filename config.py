@@ -23,6 +23,42 @@ class Config:
     CHARSET = 'utf8'
     TDS_VERSION = '7.4'
 
+    # Segundos que los datos de referencia (autores, categorías) permanecen en caché
+    CACHE_TTL = 300
+
+    # Pool de conexiones
+    # POOL_SIZE conexiones permanentes + hasta MAX_OVERFLOW temporales; una
+    # petición que no obtiene conexión en POOL_TIMEOUT segundos falla.
+    # POOL_LIFO reutiliza primero la conexión más reciente (deja expirar las ociosas)
+    POOL_SIZE = 5
+    MAX_OVERFLOW = 10
+    POOL_TIMEOUT = 30
+    POOL_RECYCLE = 3600
+    POOL_LIFO = False
+
+    # Instrumentación SQL: agrega cabeceras X-SQL-* a cada respuesta con el
+    # número de consultas de la petición. Una SELECT idéntica repetida
+    # UMBRAL_N_MAS_1 veces o más se reporta como posible N+1.
+    INSTRUMENTACION_SQL = False
+    UMBRAL_N_MAS_1 = 5
+
+    # Métricas de latencia y errores expuestas en /metrics (formato Prometheus)
+    METRICAS = True
+
+    # Consultas lentas: las que tardan UMBRAL_CONSULTA_LENTA_MS o más se
+    # escriben en ARCHIVO_CONSULTAS_LENTAS (JSONL con rotación), con el plan
+    # estimado si CAPTURAR_PLAN está activo
+    UMBRAL_CONSULTA_LENTA_MS = 500
+    CAPTURAR_PLAN = True
+    ARCHIVO_CONSULTAS_LENTAS = os.path.join('logs', 'consultas_lentas.jsonl')
+    TAMANO_ARCHIVO_CONSULTAS_LENTAS = 5 * 1024 * 1024
+
+    # Importación de libros desde CSV: archivos subidos, puntos de control y rechazos
+    DIRECTORIO_IMPORTACIONES = os.path.join('logs', 'importaciones')
+
+    # Cubo de circulación de analitica.py (mes × categoría × nacionalidad), guardado con NumPy
+    ARCHIVO_CUBO_CIRCULACION = os.path.join('logs', 'cubo_circulacion.npz')
+
     @staticmethod
     def get_connection_string(use_windows_auth=True):
         """
@@ -119,6 +155,7 @@ class DevelopmentConfig(Config):
     """Configuración para entorno de desarrollo"""
     DEBUG = True
     TESTING = False
+    INSTRUMENTACION_SQL = True
 
 
 # Configuración para producción
@@ -135,10 +172,26 @@ class ProductionConfig(Config):
     PASSWORD = os.environ.get('DB_PASSWORD', 'Pass123!')
     CHARSET = os.environ.get('DB_CHARSET', 'utf8')
     TDS_VERSION = os.environ.get('DB_TDS_VERSION', '7.4')
-
-
-# Configuración por defecto
-config = DevelopmentConfig()
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', '300'))
+
+    POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+    MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+    POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '30'))
+    POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '3600'))
+    POOL_LIFO = os.environ.get('DB_POOL_LIFO', 'false').lower() in ('1', 'true', 'si', 'yes')
+
+    INSTRUMENTACION_SQL = os.environ.get('INSTRUMENTACION_SQL', 'false').lower() in ('1', 'true', 'si', 'yes')
+    UMBRAL_N_MAS_1 = int(os.environ.get('UMBRAL_N_MAS_1', '5'))
+    METRICAS = os.environ.get('METRICAS', 'true').lower() in ('1', 'true', 'si', 'yes')
+    UMBRAL_CONSULTA_LENTA_MS = float(os.environ.get('UMBRAL_CONSULTA_LENTA_MS', '500'))
+    CAPTURAR_PLAN = os.environ.get('CAPTURAR_PLAN', 'true').lower() in ('1', 'true', 'si', 'yes')
+    ARCHIVO_CONSULTAS_LENTAS = os.environ.get('ARCHIVO_CONSULTAS_LENTAS', os.path.join('logs', 'consultas_lentas.jsonl'))
+    DIRECTORIO_IMPORTACIONES = os.environ.get('DIRECTORIO_IMPORTACIONES', os.path.join('logs', 'importaciones'))
+    ARCHIVO_CUBO_CIRCULACION = os.environ.get('ARCHIVO_CUBO_CIRCULACION', os.path.join('logs', 'cubo_circulacion.npz'))
+
+
+# Configuración activa: APP_ENV=production selecciona ProductionConfig
+config = ProductionConfig() if os.environ.get('APP_ENV') == 'production' else DevelopmentConfig()
 
 
 if __name__ == "__main__":
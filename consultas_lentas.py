@@ -0,0 +1,251 @@
+# consultas_lentas.py
+# Registro de consultas lentas con su plan de ejecución estimado
+#
+# Cada sentencia que supera config.UMBRAL_CONSULTA_LENTA_MS se escribe como
+# una línea JSON en config.ARCHIVO_CONSULTAS_LENTAS (con rotación). El plan
+# se obtiene en un hilo aparte, con otra conexión, para no retrasar la
+# petición que ejecutó la consulta.
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, date
+from decimal import Decimal
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+from config import config
+
+# Método del controlador que se está ejecutando (lo fija @medir_controlador)
+metodo_en_curso = contextvars.ContextVar('metodo_en_curso', default=None)
+
+# Entradas pendientes de capturar plan y escribir; si se llena se descartan
+MAXIMO_PENDIENTES = 1000
+
+
+def redactar_parametros(parametros):
+    """
+    Reemplaza los valores de texto por su tipo y longitud; se conservan
+    números, fechas y nulos, que ayudan a reproducir la consulta sin
+    exponer datos personales (nombres, correos, teléfonos)
+
+    Args:
+        parametros (tuple|list|dict): Parámetros enviados al driver
+
+    Returns:
+        list|dict: Parámetros serializables en JSON
+    """
+    def _valor(valor):
+        if valor is None or isinstance(valor, (bool, int, float)):
+            return valor
+        if isinstance(valor, Decimal):
+            return float(valor)
+        if isinstance(valor, (datetime, date)):
+            return valor.isoformat()
+        if isinstance(valor, (str, bytes)):
+            return f"<{type(valor).__name__}:{len(valor)}>"
+        return f"<{type(valor).__name__}>"
+
+    if isinstance(parametros, dict):
+        return {clave: _valor(valor) for clave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        # executemany: lista de tuplas/diccionarios
+        if parametros and isinstance(parametros[0], (list, tuple, dict)):
+            return [redactar_parametros(p) for p in parametros[:5]] + (
+                [f"... {len(parametros) - 5} más"] if len(parametros) > 5 else []
+            )
+        return [_valor(valor) for valor in parametros]
+    return _valor(parametros)
+
+
+class RegistroConsultasLentas:
+    """Detecta sentencias lentas en un engine y las escribe en un archivo JSONL"""
+
+    def __init__(self, umbral_ms=None, archivo=None, capturar_plan=None):
+        self.umbral_ms = config.UMBRAL_CONSULTA_LENTA_MS if umbral_ms is None else umbral_ms
+        self.archivo = archivo or config.ARCHIVO_CONSULTAS_LENTAS
+        self.capturar_plan = config.CAPTURAR_PLAN if capturar_plan is None else capturar_plan
+        self.descartadas = 0
+        self._pendientes = queue.Queue(MAXIMO_PENDIENTES)
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._logger = None
+
+    # ---------- Eventos del engine ----------
+
+    def instalar(self, engine):
+        """
+        Registra los eventos en un engine (Database.configure lo hace con
+        cada engine nuevo)
+
+        Args:
+            engine (Engine): Engine de SQLAlchemy
+        """
+        if not event.contains(engine, 'before_cursor_execute', self._antes):
+            event.listen(engine, 'before_cursor_execute', self._antes)
+            event.listen(engine, 'after_cursor_execute', self._despues)
+            event.listen(engine, 'handle_error', self._error)
+
+    def _antes(self, conn, cursor, sentencia, parametros, contexto, executemany):
+        conn.info.setdefault('inicio_consulta_lenta', []).append(time.perf_counter())
+
+    def _despues(self, conn, cursor, sentencia, parametros, contexto, executemany):
+        inicios = conn.info.get('inicio_consulta_lenta')
+        if not inicios:
+            return
+        milisegundos = (time.perf_counter() - inicios.pop()) * 1000
+        if milisegundos < self.umbral_ms or getattr(self._local, 'capturando', False):
+            return
+
+        entrada = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'duracion_ms': round(milisegundos, 3),
+            'sentencia': sentencia,
+            'parametros': redactar_parametros(parametros),
+            # Filas afectadas; en una SELECT aún no se leyeron (el driver reporta -1)
+            'filas': None if cursor.description is not None else cursor.rowcount,
+            'origen': metodo_en_curso.get(),
+            'motor': conn.dialect.name,
+        }
+        # Los parámetros originales solo viajan a la captura del plan, no al archivo
+        self._encolar((conn.engine, entrada, parametros if self.capturar_plan and not executemany else None))
+
+    def _error(self, contexto_excepcion):
+        # La sentencia falló: after_cursor_execute no se ejecuta y el inicio
+        # quedaría en la conexión del pool
+        conexion = contexto_excepcion.connection
+        if conexion is not None:
+            inicios = conexion.info.get('inicio_consulta_lenta')
+            if inicios:
+                inicios.pop()
+
+    # ---------- Escritura en segundo plano ----------
+
+    def _encolar(self, elemento):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._procesar, name='consultas-lentas', daemon=True)
+                self._hilo.start()
+        try:
+            self._pendientes.put_nowait(elemento)
+        except queue.Full:
+            self.descartadas += 1
+
+    def _procesar(self):
+        while True:
+            engine, entrada, parametros = self._pendientes.get()
+            try:
+                if parametros is not None:
+                    entrada['plan'] = self._plan(engine, entrada['sentencia'], parametros)
+                self._escribir(entrada)
+            except Exception as e:
+                print(f"Error al registrar consulta lenta: {e}")
+            finally:
+                self._pendientes.task_done()
+
+    def esperar(self):
+        """Espera a que se escriban las entradas pendientes"""
+        self._pendientes.join()
+
+    def _plan(self, engine, sentencia, parametros):
+        """
+        Obtiene el plan estimado con otra conexión: EXPLAIN QUERY PLAN en
+        SQLite, SHOWPLAN_XML en SQL Server (la sentencia no se ejecuta)
+        """
+        dialecto = engine.dialect.name
+        if dialecto not in ('sqlite', 'mssql'):
+            return None
+        self._local.capturando = True
+        try:
+            with engine.connect() as conn:
+                if dialecto == 'sqlite':
+                    filas = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sentencia, parametros).all()
+                    return [fila[-1] for fila in filas]
+
+                conn.exec_driver_sql("SET SHOWPLAN_XML ON")
+                try:
+                    return conn.exec_driver_sql(sentencia, parametros).scalar()
+                finally:
+                    conn.exec_driver_sql("SET SHOWPLAN_XML OFF")
+        except Exception as e:
+            return f"No se pudo obtener el plan: {e}"
+        finally:
+            self._local.capturando = False
+
+    def _escribir(self, entrada):
+        if self._logger is None:
+            directorio = os.path.dirname(self.archivo)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            manejador = RotatingFileHandler(self.archivo, maxBytes=config.TAMANO_ARCHIVO_CONSULTAS_LENTAS,
+                                            backupCount=5, encoding='utf-8')
+            manejador.setFormatter(logging.Formatter('%(message)s'))
+            logger = logging.getLogger(f'biblioteca.consultas_lentas.{id(self)}')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(manejador)
+            self._logger = logger
+        self._logger.info(json.dumps(entrada, ensure_ascii=False, default=str))
+
+    # ---------- Resumen ----------
+
+    def leer(self):
+        """
+        Lee las entradas del archivo actual y de los rotados
+
+        Returns:
+            list: Entradas (diccionarios), de la más antigua a la más reciente
+        """
+        archivos = [f"{self.archivo}.{i}" for i in range(5, 0, -1)] + [self.archivo]
+        entradas = []
+        for ruta in archivos:
+            if not os.path.exists(ruta):
+                continue
+            with open(ruta, encoding='utf-8') as archivo:
+                for linea in archivo:
+                    try:
+                        entradas.append(json.loads(linea))
+                    except ValueError:
+                        continue
+        return entradas
+
+    def peores(self, limite=20):
+        """
+        Agrupa las entradas por sentencia y retorna las de mayor tiempo total
+
+        Args:
+            limite (int): Número de sentencias a retornar
+
+        Returns:
+            list: Diccionarios con sentencia, ejecuciones, total/promedio/máximo
+                en ms, orígenes, última fecha y el plan más reciente
+        """
+        grupos = {}
+        for entrada in self.leer():
+            grupo = grupos.setdefault(entrada['sentencia'], {
+                'sentencia': entrada['sentencia'], 'ejecuciones': 0, 'total_ms': 0.0,
+                'maximo_ms': 0.0, 'origenes': set(), 'ultima': None, 'plan': None
+            })
+            grupo['ejecuciones'] += 1
+            grupo['total_ms'] += entrada['duracion_ms']
+            grupo['maximo_ms'] = max(grupo['maximo_ms'], entrada['duracion_ms'])
+            if entrada.get('origen'):
+                grupo['origenes'].add(entrada['origen'])
+            grupo['ultima'] = entrada['fecha']
+            if entrada.get('plan'):
+                grupo['plan'] = entrada['plan']
+
+        resultado = sorted(grupos.values(), key=lambda g: g['total_ms'], reverse=True)[:limite]
+        for grupo in resultado:
+            grupo['total_ms'] = round(grupo['total_ms'], 3)
+            grupo['promedio_ms'] = round(grupo['total_ms'] / grupo['ejecuciones'], 3)
+            grupo['origenes'] = sorted(grupo['origenes'])
+        return resultado
+
+
+# Instancia global del registro
+consultas_lentas = RegistroConsultasLentas()
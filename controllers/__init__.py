@@ -6,5 +6,8 @@ from .usuario_controller import UsuarioController
 from .prestamo_controller import PrestamoController
 from .categoria_controller import CategoriaController
 from .autor_controller import AutorController
+from .estadistica_controller import EstadisticaController
+from .reporte_controller import ReporteController
 
-__all__ = ['LibroController', 'UsuarioController', 'PrestamoController', 'CategoriaController', 'AutorController']
+__all__ = ['LibroController', 'UsuarioController', 'PrestamoController', 'CategoriaController', 'AutorController',
+           'EstadisticaController', 'ReporteController']
@@ -1,11 +1,18 @@
 # controllers/autor_controller.py
 # Controlador para operaciones de autores
 
-from models import Autor
+from models import Autor, Libro
 from database import db
-from sqlalchemy import or_
+from metricas import medir_controlador
+from sqlalchemy import or_, select, func
 from sqlalchemy.orm import joinedload
+from paginacion import paginar, Pagina
+from indice_busqueda import indice_libros
+from autocompletado import autocompletado
+from cache import cache_referencia
+from proyecciones import consulta_autores, construir_autores
 
+@medir_controlador
 class AutorController:
     """Controlador para operaciones de autores"""
 
@@ -14,7 +21,9 @@ class AutorController:
 
     def obtener_todos(self):
         """
-        Obtiene todos los autores
+        Obtiene todos los autores con sus libros. No pasa por la caché de
+        referencia: los libros (y sus copias disponibles) cambian con cada
+        préstamo y devolución.
 
         Returns:
             list: Lista de objetos Autor
@@ -34,6 +43,85 @@ class AutorController:
         finally:
             session.close()
 
+    def obtener_opciones(self):
+        """
+        Obtiene los autores ordenados por nombre, sin sus libros, para las
+        listas de selección de los formularios (desde la caché de referencia)
+
+        Returns:
+            list: Lista de objetos Autor
+        """
+        try:
+            return cache_referencia.obtener('autores', 'opciones', self._cargar_opciones)
+        except Exception as e:
+            print(f"Error al obtener autores: {e}")
+            return []
+
+    def _cargar_opciones(self):
+        # Sesión propia: los objetos se guardan en la caché y sobreviven a la petición
+        session = db.get_session()
+        try:
+            autores = session.query(Autor).order_by(Autor.Nombre, Autor.Apellido).all()
+            for autor in autores:
+                session.expunge(autor)
+            return autores
+        finally:
+            session.close()
+
+    def obtener_pagina(self, after=None, before=None, limite=None):
+        """
+        Obtiene una página de autores ordenados por apellido y nombre
+        (paginación keyset)
+
+        Args:
+            after (str): Cursor de la página siguiente
+            before (str): Cursor de la página anterior
+            limite (int): Número máximo de autores
+
+        Returns:
+            Pagina: Página de AutorLista (con total_libros en lugar de la colección de libros)
+        """
+        session = db.obtener_sesion()
+        try:
+            pagina = paginar(consulta_autores(session), [Autor.Apellido, Autor.Nombre, Autor.AutorID],
+                             after, before, limite)
+            pagina.elementos = construir_autores(pagina.elementos)
+            return pagina
+        except Exception as e:
+            print(f"Error al obtener autores: {e}")
+            return Pagina([])
+        finally:
+            db.liberar_sesion(session)
+
+    def cargar_autocompletado(self):
+        """
+        Carga los autores en el índice de autocompletado ("Nombre Apellido"
+        y "Apellido Nombre"), usando su número de libros como peso
+
+        Returns:
+            bool: True si el índice se cargó correctamente
+        """
+        libros = select(
+            Libro.AutorID, func.count(Libro.LibroID).label('total')
+        ).group_by(Libro.AutorID).subquery()
+
+        consulta = select(
+            Autor.AutorID, Autor.Nombre, Autor.Apellido, libros.c.total
+        ).outerjoin(libros, libros.c.AutorID == Autor.AutorID)
+
+        session = db.obtener_sesion()
+        try:
+            autocompletado.autores.construir(
+                (fila.AutorID, f"{fila.Nombre} {fila.Apellido}", fila.total, (f"{fila.Apellido} {fila.Nombre}",))
+                for fila in session.execute(consulta)
+            )
+            return True
+        except Exception as e:
+            print(f"Error al cargar el autocompletado de autores: {e}")
+            return False
+        finally:
+            db.liberar_sesion(session)
+
     def obtener_por_id(self, autor_id):
         """
         Obtiene un autor por su ID
@@ -44,7 +132,7 @@ class AutorController:
         Returns:
             Autor: Objeto Autor o None
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             autor = session.query(Autor).options(
                 joinedload(Autor.libros)
@@ -56,7 +144,7 @@ class AutorController:
             print(f"Error al obtener autor: {e}")
             return None
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def buscar(self, termino_busqueda):
         """
@@ -66,26 +154,22 @@ class AutorController:
             termino_busqueda (str): Término de búsqueda
 
         Returns:
-            list: Lista de autores encontrados
+            list: Lista de AutorLista encontrados
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
-            autores = session.query(Autor).filter(
+            return construir_autores(consulta_autores(session).filter(
                 or_(
                     Autor.Nombre.like(f'%{termino_busqueda}%'),
                     Autor.Apellido.like(f'%{termino_busqueda}%'),
                     Autor.Nacionalidad.like(f'%{termino_busqueda}%')
                 )
-            ).order_by(Autor.Apellido, Autor.Nombre).all()
-
-            for autor in autores:
-                session.expunge(autor)
-            return autores
+            ).order_by(Autor.Apellido, Autor.Nombre))
         except Exception as e:
             print(f"Error en la búsqueda: {e}")
             return []
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def crear(self, datos_autor):
         """
@@ -97,7 +181,7 @@ class AutorController:
         Returns:
             tuple: (éxito: bool, mensaje: str, autor_id: int)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             # Crear el nuevo autor
             nuevo_autor = Autor(
@@ -112,6 +196,9 @@ class AutorController:
             session.commit()
 
             autor_id = nuevo_autor.AutorID
+            cache_referencia.invalidar('autores')
+            autocompletado.autores.agregar(autor_id, nuevo_autor.nombre_completo,
+                                           alias=(f"{nuevo_autor.Apellido} {nuevo_autor.Nombre}",))
 
             return (True, f"Autor '{nuevo_autor.nombre_completo}' creado exitosamente", autor_id)
 
@@ -119,7 +206,7 @@ class AutorController:
             session.rollback()
             return (False, f"Error al crear autor: {e}", None)
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def actualizar(self, autor_id, datos_actualizados):
         """
@@ -132,7 +219,7 @@ class AutorController:
         Returns:
             tuple: (éxito: bool, mensaje: str)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             autor = session.query(Autor).filter(Autor.AutorID == autor_id).first()
 
@@ -146,13 +233,23 @@ class AutorController:
 
             session.commit()
 
+            cache_referencia.invalidar('autores')
+            autocompletado.autores.agregar(autor.AutorID, autor.nombre_completo,
+                                           alias=(f"{autor.Apellido} {autor.Nombre}",))
+
+            # El nombre del autor forma parte del índice de búsqueda de sus libros
+            if indice_libros.construido and ('Nombre' in datos_actualizados or 'Apellido' in datos_actualizados):
+                for libro in autor.libros:
+                    indice_libros.indexar(libro.LibroID, libro.Titulo, autor.nombre_completo,
+                                          libro.ISBN, libro.Descripcion)
+
             return (True, f"Autor '{autor.nombre_completo}' actualizado exitosamente")
 
         except Exception as e:
             session.rollback()
             return (False, f"Error al actualizar autor: {e}")
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def eliminar(self, autor_id):
         """
@@ -164,7 +261,7 @@ class AutorController:
         Returns:
             tuple: (éxito: bool, mensaje: str)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             autor = session.query(Autor).filter(Autor.AutorID == autor_id).first()
 
@@ -179,13 +276,16 @@ class AutorController:
             session.delete(autor)
             session.commit()
 
+            cache_referencia.invalidar('autores')
+            autocompletado.autores.eliminar(autor_id)
+
             return (True, f"Autor '{nombre}' eliminado exitosamente")
 
         except Exception as e:
             session.rollback()
             return (False, f"Error al eliminar autor: {e}")
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def contar_libros(self, autor_id):
         """
@@ -197,7 +297,7 @@ class AutorController:
         Returns:
             int: Número de libros
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             autor = session.query(Autor).filter(
                 Autor.AutorID == autor_id
@@ -211,4 +311,4 @@ class AutorController:
             print(f"Error al contar libros: {e}")
             return 0
         finally:
-            session.close()
+            db.liberar_sesion(session)
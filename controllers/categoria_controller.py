@@ -1,10 +1,17 @@
 # controllers/categoria_controller.py
 # Controlador para operaciones de categorías
 
-from models import Categoria
+from models import Categoria, Libro
 from database import db
+from metricas import medir_controlador
+from sqlalchemy import select, func
 from sqlalchemy.orm import joinedload
+from paginacion import paginar, Pagina
+from autocompletado import autocompletado
+from cache import cache_referencia
+from proyecciones import consulta_categorias, construir_categorias
 
+@medir_controlador
 class CategoriaController:
     """Controlador para operaciones de categorías"""
 
@@ -13,7 +20,9 @@ class CategoriaController:
 
     def obtener_todos(self):
         """
-        Obtiene todas las categorías
+        Obtiene todas las categorías con sus libros. No pasa por la caché de
+        referencia: los libros (y sus copias disponibles) cambian con cada
+        préstamo y devolución.
 
         Returns:
             list: Lista de objetos Categoria
@@ -33,6 +42,83 @@ class CategoriaController:
         finally:
             session.close()
 
+    def obtener_opciones(self):
+        """
+        Obtiene las categorías, sin sus libros, para las listas de selección
+        de los formularios (desde la caché de referencia)
+
+        Returns:
+            list: Lista de objetos Categoria
+        """
+        try:
+            return cache_referencia.obtener('categorias', 'opciones', self._cargar_opciones)
+        except Exception as e:
+            print(f"Error al obtener categorías: {e}")
+            return []
+
+    def _cargar_opciones(self):
+        # Sesión propia: los objetos se guardan en la caché y sobreviven a la petición
+        session = db.get_session()
+        try:
+            categorias = session.query(Categoria).order_by(Categoria.NombreCategoria).all()
+            for categoria in categorias:
+                session.expunge(categoria)
+            return categorias
+        finally:
+            session.close()
+
+    def obtener_pagina(self, after=None, before=None, limite=None):
+        """
+        Obtiene una página de categorías ordenadas por nombre (paginación keyset)
+
+        Args:
+            after (str): Cursor de la página siguiente
+            before (str): Cursor de la página anterior
+            limite (int): Número máximo de categorías
+
+        Returns:
+            Pagina: Página de CategoriaLista (con total_libros en lugar de la colección de libros)
+        """
+        session = db.obtener_sesion()
+        try:
+            pagina = paginar(consulta_categorias(session), [Categoria.NombreCategoria, Categoria.CategoriaID],
+                             after, before, limite)
+            pagina.elementos = construir_categorias(pagina.elementos)
+            return pagina
+        except Exception as e:
+            print(f"Error al obtener categorías: {e}")
+            return Pagina([])
+        finally:
+            db.liberar_sesion(session)
+
+    def cargar_autocompletado(self):
+        """
+        Carga las categorías en el índice de autocompletado, usando su
+        número de libros como peso
+
+        Returns:
+            bool: True si el índice se cargó correctamente
+        """
+        libros = select(
+            Libro.CategoriaID, func.count(Libro.LibroID).label('total')
+        ).group_by(Libro.CategoriaID).subquery()
+
+        consulta = select(
+            Categoria.CategoriaID, Categoria.NombreCategoria, libros.c.total
+        ).outerjoin(libros, libros.c.CategoriaID == Categoria.CategoriaID)
+
+        session = db.obtener_sesion()
+        try:
+            autocompletado.categorias.construir(
+                (fila.CategoriaID, fila.NombreCategoria, fila.total, ()) for fila in session.execute(consulta)
+            )
+            return True
+        except Exception as e:
+            print(f"Error al cargar el autocompletado de categorías: {e}")
+            return False
+        finally:
+            db.liberar_sesion(session)
+
     def obtener_por_id(self, categoria_id):
         """
         Obtiene una categoría por su ID
@@ -43,7 +129,7 @@ class CategoriaController:
         Returns:
             Categoria: Objeto Categoria o None
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             categoria = session.query(Categoria).options(
                 joinedload(Categoria.libros)
@@ -55,7 +141,7 @@ class CategoriaController:
             print(f"Error al obtener categoría: {e}")
             return None
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def buscar(self, termino_busqueda):
         """
@@ -65,22 +151,18 @@ class CategoriaController:
             termino_busqueda (str): Término de búsqueda
 
         Returns:
-            list: Lista de categorías encontradas
+            list: Lista de CategoriaLista encontradas
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
-            categorias = session.query(Categoria).filter(
+            return construir_categorias(consulta_categorias(session).filter(
                 Categoria.NombreCategoria.like(f'%{termino_busqueda}%')
-            ).order_by(Categoria.NombreCategoria).all()
-
-            for categoria in categorias:
-                session.expunge(categoria)
-            return categorias
+            ).order_by(Categoria.NombreCategoria))
         except Exception as e:
             print(f"Error en la búsqueda: {e}")
             return []
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def crear(self, datos_categoria):
         """
@@ -92,7 +174,7 @@ class CategoriaController:
         Returns:
             tuple: (éxito: bool, mensaje: str, categoria_id: int)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             # Verificar si ya existe una categoría con ese nombre
             categoria_existente = session.query(Categoria).filter(
@@ -112,6 +194,8 @@ class CategoriaController:
             session.commit()
 
             categoria_id = nueva_categoria.CategoriaID
+            cache_referencia.invalidar('categorias')
+            autocompletado.categorias.agregar(categoria_id, nueva_categoria.NombreCategoria)
 
             return (True, f"Categoría '{nueva_categoria.NombreCategoria}' creada exitosamente", categoria_id)
 
@@ -119,7 +203,7 @@ class CategoriaController:
             session.rollback()
             return (False, f"Error al crear categoría: {e}", None)
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def actualizar(self, categoria_id, datos_actualizados):
         """
@@ -132,7 +216,7 @@ class CategoriaController:
         Returns:
             tuple: (éxito: bool, mensaje: str)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             categoria = session.query(Categoria).filter(
                 Categoria.CategoriaID == categoria_id
@@ -158,13 +242,16 @@ class CategoriaController:
 
             session.commit()
 
+            cache_referencia.invalidar('categorias')
+            autocompletado.categorias.agregar(categoria.CategoriaID, categoria.NombreCategoria)
+
             return (True, f"Categoría '{categoria.NombreCategoria}' actualizada exitosamente")
 
         except Exception as e:
             session.rollback()
             return (False, f"Error al actualizar categoría: {e}")
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def eliminar(self, categoria_id):
         """
@@ -176,7 +263,7 @@ class CategoriaController:
         Returns:
             tuple: (éxito: bool, mensaje: str)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             categoria = session.query(Categoria).filter(
                 Categoria.CategoriaID == categoria_id
@@ -193,13 +280,16 @@ class CategoriaController:
             session.delete(categoria)
             session.commit()
 
+            cache_referencia.invalidar('categorias')
+            autocompletado.categorias.eliminar(categoria_id)
+
             return (True, f"Categoría '{nombre}' eliminada exitosamente")
 
         except Exception as e:
             session.rollback()
             return (False, f"Error al eliminar categoría: {e}")
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def contar_libros(self, categoria_id):
         """
@@ -211,7 +301,7 @@ class CategoriaController:
         Returns:
             int: Número de libros
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             categoria = session.query(Categoria).filter(
                 Categoria.CategoriaID == categoria_id
@@ -225,4 +315,4 @@ class CategoriaController:
             print(f"Error al contar libros: {e}")
             return 0
         finally:
-            session.close()
+            db.liberar_sesion(session)
@@ -0,0 +1,73 @@
+# controllers/estadistica_controller.py
+# Controlador para estadísticas agregadas del sistema
+
+from models import Libro, Usuario, Prestamo
+from database import db
+from metricas import medir_controlador
+from datetime import datetime
+from sqlalchemy import select, func, case, true
+
+@medir_controlador
+class EstadisticaController:
+    """Controlador para estadísticas agregadas (dashboard y reportes)"""
+
+    def __init__(self):
+        pass  # No mantener sesión persistente
+
+    def obtener_resumen(self):
+        """
+        Obtiene los contadores del dashboard en una sola consulta.
+
+        Cada tabla se recorre una sola vez dentro de una tabla derivada con
+        COUNT/SUM y las tres se combinan en un único SELECT, de modo que el
+        servidor hace la agregación y no se materializa ningún objeto ORM.
+
+        Returns:
+            dict: Contadores (total_libros, libros_disponibles, total_copias,
+                copias_disponibles, total_usuarios, prestamos_activos,
+                prestamos_vencidos, multas_pendientes) o un diccionario
+                vacío si hay error
+        """
+        hoy = datetime.now().date()
+
+        libros = select(
+            func.count(Libro.LibroID).label('total_libros'),
+            func.sum(case((Libro.CopiasDisponibles > 0, 1), else_=0)).label('libros_disponibles'),
+            func.sum(Libro.CopiasTotal).label('total_copias'),
+            func.sum(Libro.CopiasDisponibles).label('copias_disponibles')
+        ).subquery('libros')
+
+        usuarios = select(
+            func.count(Usuario.UsuarioID).label('total_usuarios')
+        ).where(Usuario.Estado == 'Activo').subquery('usuarios')
+
+        prestamos = select(
+            func.count(Prestamo.PrestamoID).label('prestamos_activos'),
+            func.sum(case((Prestamo.FechaDevolucionEsperada < hoy, 1), else_=0)).label('prestamos_vencidos'),
+            # Multas acumuladas por el proceso nocturno sobre préstamos aún abiertos
+            func.sum(Prestamo.Multa).label('multas_pendientes')
+        ).where(Prestamo.Estado == 'Prestado').subquery('prestamos')
+
+        consulta = select(
+            libros.c.total_libros,
+            libros.c.libros_disponibles,
+            libros.c.total_copias,
+            libros.c.copias_disponibles,
+            usuarios.c.total_usuarios,
+            prestamos.c.prestamos_activos,
+            prestamos.c.prestamos_vencidos,
+            prestamos.c.multas_pendientes
+        ).select_from(
+            libros.join(usuarios, true()).join(prestamos, true())
+        )
+
+        session = db.obtener_sesion()
+        try:
+            fila = session.execute(consulta).mappings().one()
+            # SUM sobre una tabla vacía devuelve NULL
+            return {clave: int(valor or 0) for clave, valor in fila.items()}
+        except Exception as e:
+            print(f"Error al obtener estadísticas: {e}")
+            return {}
+        finally:
+            db.liberar_sesion(session)
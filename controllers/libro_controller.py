@@ -1,11 +1,17 @@
 # controllers/libro_controller.py
 # Controlador para operaciones de libros
 
-from models import Libro, Autor, Categoria
+from models import Libro, Autor, Categoria, Prestamo
 from database import db
-from sqlalchemy import or_
+from metricas import medir_controlador
+from sqlalchemy import or_, select, func
 from sqlalchemy.orm import joinedload
+from paginacion import paginar, Pagina, ResultadosLimitados
+from indice_busqueda import indice_libros, es_fragmento_isbn
+from autocompletado import autocompletado
+from proyecciones import consulta_libros, construir_libros
 
+@medir_controlador
 class LibroController:
     """Controlador para operaciones de libros"""
 
@@ -17,22 +23,71 @@ class LibroController:
         Obtiene todos los libros
 
         Returns:
-            list: Lista de objetos Libro
+            list: Lista de LibroLista (solo las columnas de la lista, ver proyecciones.py)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
-            libros = session.query(Libro).options(
-                joinedload(Libro.autor),
-                joinedload(Libro.categoria),
-                joinedload(Libro.prestamos)
-            ).all()
-            # Expunge objetos para usarlos fuera de la sesión
-            for libro in libros:
-                session.expunge(libro)
-            return libros
+            return construir_libros(consulta_libros(session).order_by(Libro.LibroID))
         except Exception as e:
             print(f"Error al obtener libros: {e}")
             return []
+        finally:
+            db.liberar_sesion(session)
+
+    def obtener_pagina(self, after=None, before=None, limite=None):
+        """
+        Obtiene una página de libros ordenados por ID (paginación keyset)
+
+        Args:
+            after (str): Cursor de la página siguiente
+            before (str): Cursor de la página anterior
+            limite (int): Número máximo de libros
+
+        Returns:
+            Pagina: Página de LibroLista
+        """
+        session = db.obtener_sesion()
+        try:
+            pagina = paginar(consulta_libros(session), [Libro.LibroID], after, before, limite)
+            pagina.elementos = construir_libros(pagina.elementos)
+            return pagina
+        except Exception as e:
+            print(f"Error al obtener libros: {e}")
+            return Pagina([])
+        finally:
+            db.liberar_sesion(session)
+
+    def exportar(self, tamano_lote=1000):
+        """
+        Itera todos los libros como diccionarios para exportación masiva.
+        Usa un SELECT de Core con yield_per, por lo que las filas se leen del
+        servidor en lotes y nunca se materializa la tabla completa.
+
+        Args:
+            tamano_lote (int): Filas leídas por cada viaje al servidor
+
+        Yields:
+            dict: Datos del libro (mismo formato que /api/libros)
+        """
+        consulta = select(
+            Libro.LibroID, Libro.Titulo, Libro.ISBN, Autor.Nombre, Autor.Apellido,
+            Categoria.NombreCategoria, Libro.CopiasDisponibles, Libro.CopiasTotal
+        ).join(Autor, Libro.AutorID == Autor.AutorID).join(
+            Categoria, Libro.CategoriaID == Categoria.CategoriaID
+        ).order_by(Libro.LibroID).execution_options(yield_per=tamano_lote)
+
+        session = db.get_session()
+        try:
+            for fila in session.execute(consulta):
+                yield {
+                    'id': fila.LibroID,
+                    'titulo': fila.Titulo,
+                    'isbn': fila.ISBN,
+                    'autor': f"{fila.Nombre} {fila.Apellido}",
+                    'categoria': fila.NombreCategoria,
+                    'disponibles': fila.CopiasDisponibles,
+                    'total': fila.CopiasTotal
+                }
         finally:
             session.close()
 
@@ -46,7 +101,7 @@ class LibroController:
         Returns:
             Libro: Objeto Libro o None
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             libro = session.query(Libro).options(
                 joinedload(Libro.autor),
@@ -59,40 +114,138 @@ class LibroController:
             print(f"Error al obtener libro: {e}")
             return None
         finally:
-            session.close()
+            db.liberar_sesion(session)
+
+    def construir_indice(self, tamano_lote=5000):
+        """
+        Construye el índice invertido de búsqueda leyendo todos los libros
+        en lotes (yield_per)
+
+        Args:
+            tamano_lote (int): Filas leídas por cada viaje al servidor
+
+        Returns:
+            bool: True si el índice se construyó correctamente
+        """
+        consulta = select(
+            Libro.LibroID, Libro.Titulo, Autor.Nombre, Autor.Apellido, Libro.ISBN, Libro.Descripcion
+        ).join(Autor, Libro.AutorID == Autor.AutorID).execution_options(yield_per=tamano_lote)
+
+        session = db.obtener_sesion()
+        try:
+            indice_libros.construir(
+                (fila.LibroID, fila.Titulo, f"{fila.Nombre} {fila.Apellido}", fila.ISBN, fila.Descripcion)
+                for fila in session.execute(consulta)
+            )
+            return True
+        except Exception as e:
+            print(f"Error al construir el índice de búsqueda: {e}")
+            return False
+        finally:
+            db.liberar_sesion(session)
+
+    def cargar_autocompletado(self):
+        """
+        Carga los títulos en el índice de autocompletado, usando el número
+        de préstamos de cada libro como peso
+
+        Returns:
+            bool: True si el índice se cargó correctamente
+        """
+        prestamos = select(
+            Prestamo.LibroID, func.count(Prestamo.PrestamoID).label('total')
+        ).group_by(Prestamo.LibroID).subquery()
+
+        consulta = select(
+            Libro.LibroID, Libro.Titulo, prestamos.c.total
+        ).outerjoin(prestamos, prestamos.c.LibroID == Libro.LibroID).execution_options(yield_per=5000)
 
-    def buscar(self, termino_busqueda):
+        session = db.obtener_sesion()
+        try:
+            autocompletado.libros.construir(
+                (fila.LibroID, fila.Titulo, fila.total, ()) for fila in session.execute(consulta)
+            )
+            return True
+        except Exception as e:
+            print(f"Error al cargar el autocompletado de libros: {e}")
+            return False
+        finally:
+            db.liberar_sesion(session)
+
+    def buscar(self, termino_busqueda, limite=100):
         """
-        Busca libros por título, autor o ISBN
+        Busca libros por título, descripción, autor o ISBN usando el índice
+        invertido. Todos los términos deben aparecer (AND), el último también
+        como prefijo, y los resultados se ordenan por relevancia BM25. Los
+        fragmentos de ISBN se buscan con LIKE.
 
         Args:
             termino_busqueda (str): Término de búsqueda
+            limite (int): Número máximo de resultados (None para todos)
 
         Returns:
-            list: Lista de libros encontrados
+            ResultadosLimitados: LibroLista encontrados, del más al menos
+                relevante; `recortada` indica si había más de `limite`
         """
-        session = db.get_session()
+        if es_fragmento_isbn(termino_busqueda) or (
+                not indice_libros.construido and not self.construir_indice()):
+            return self._buscar_like(termino_busqueda, limite)
+
+        # Se pide uno más para saber si la lista quedó recortada
+        resultados = indice_libros.buscar(termino_busqueda, None if limite is None else limite + 1)
+        recortada = limite is not None and len(resultados) > limite
+        if not resultados:
+            return ResultadosLimitados(limite=limite)
+
+        ids = [libro_id for libro_id, _ in resultados[:limite]]
+        session = db.obtener_sesion()
         try:
-            libros = session.query(Libro).join(Autor).options(
-                joinedload(Libro.autor),
-                joinedload(Libro.categoria)
-            ).filter(
+            filas = []
+            # Lotes de 1000 para no superar el límite de parámetros de SQL Server
+            for i in range(0, len(ids), 1000):
+                filas.extend(consulta_libros(session).filter(Libro.LibroID.in_(ids[i:i + 1000])).all())
+
+            libros = construir_libros(filas)
+            posicion = {libro_id: i for i, libro_id in enumerate(ids)}
+            libros.sort(key=lambda libro: posicion[libro.LibroID])
+            return ResultadosLimitados(libros, limite, recortada)
+        except Exception as e:
+            print(f"Error en la búsqueda: {e}")
+            return ResultadosLimitados(limite=limite)
+        finally:
+            db.liberar_sesion(session)
+
+    def _buscar_like(self, termino_busqueda, limite=None):
+        """
+        Búsqueda por LIKE '%termino%' sobre título, ISBN y autor. Se usa
+        para fragmentos de ISBN y si el índice invertido no está disponible.
+
+        Args:
+            termino_busqueda (str): Término de búsqueda
+            limite (int): Número máximo de resultados (None para todos)
+
+        Returns:
+            ResultadosLimitados: LibroLista encontrados, por título
+        """
+        session = db.obtener_sesion()
+        try:
+            consulta = consulta_libros(session).filter(
                 or_(
                     Libro.Titulo.like(f'%{termino_busqueda}%'),
                     Libro.ISBN.like(f'%{termino_busqueda}%'),
                     Autor.Nombre.like(f'%{termino_busqueda}%'),
                     Autor.Apellido.like(f'%{termino_busqueda}%')
                 )
-            ).all()
-
-            for libro in libros:
-                session.expunge(libro)
-            return libros
+            ).order_by(Libro.Titulo, Libro.LibroID)
+            if limite is None:
+                return ResultadosLimitados(construir_libros(consulta))
+            filas = consulta.limit(limite + 1).all()
+            return ResultadosLimitados(construir_libros(filas[:limite]), limite, len(filas) > limite)
         except Exception as e:
             print(f"Error en la búsqueda: {e}")
-            return []
+            return ResultadosLimitados(limite=limite)
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def crear(self, datos_libro):
         """
@@ -104,7 +257,7 @@ class LibroController:
         Returns:
             tuple: (éxito: bool, mensaje: str, libro_id: int)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             # Verificar que el autor existe
             autor = session.query(Autor).filter(
@@ -140,13 +293,18 @@ class LibroController:
 
             libro_id = nuevo_libro.LibroID
 
+            if indice_libros.construido:
+                indice_libros.indexar(libro_id, datos_libro['titulo'], autor.nombre_completo,
+                                      datos_libro['isbn'], datos_libro.get('descripcion'))
+            autocompletado.libros.agregar(libro_id, datos_libro['titulo'])
+
             return (True, f"Libro '{nuevo_libro.Titulo}' creado exitosamente", libro_id)
 
         except Exception as e:
             session.rollback()
             return (False, f"Error al crear libro: {e}", None)
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def actualizar(self, libro_id, datos_actualizados):
         """
@@ -159,7 +317,7 @@ class LibroController:
         Returns:
             tuple: (éxito: bool, mensaje: str)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             libro = session.query(Libro).filter(Libro.LibroID == libro_id).first()
 
@@ -173,13 +331,18 @@ class LibroController:
 
             session.commit()
 
+            if indice_libros.construido:
+                indice_libros.indexar(libro.LibroID, libro.Titulo, libro.autor.nombre_completo,
+                                      libro.ISBN, libro.Descripcion)
+            autocompletado.libros.agregar(libro.LibroID, libro.Titulo)
+
             return (True, f"Libro '{libro.Titulo}' actualizado exitosamente")
 
         except Exception as e:
             session.rollback()
             return (False, f"Error al actualizar libro: {e}")
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def eliminar(self, libro_id):
         """
@@ -191,7 +354,7 @@ class LibroController:
         Returns:
             tuple: (éxito: bool, mensaje: str)
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
             libro = session.query(Libro).filter(Libro.LibroID == libro_id).first()
 
@@ -208,33 +371,31 @@ class LibroController:
             session.delete(libro)
             session.commit()
 
+            indice_libros.eliminar(libro_id)
+            autocompletado.libros.eliminar(libro_id)
+
             return (True, f"Libro '{titulo}' eliminado exitosamente")
 
         except Exception as e:
             session.rollback()
             return (False, f"Error al eliminar libro: {e}")
         finally:
-            session.close()
+            db.liberar_sesion(session)
 
     def obtener_disponibles(self):
         """
         Obtiene todos los libros con copias disponibles
 
         Returns:
-            list: Lista de libros disponibles
+            list: Lista de LibroLista con copias disponibles
         """
-        session = db.get_session()
+        session = db.obtener_sesion()
         try:
-            libros = session.query(Libro).options(
-                joinedload(Libro.autor),
-                joinedload(Libro.categoria)
-            ).filter(Libro.CopiasDisponibles > 0).all()
-
-            for libro in libros:
-                session.expunge(libro)
-            return libros
+            return construir_libros(
+                consulta_libros(session).filter(Libro.CopiasDisponibles > 0).order_by(Libro.LibroID)
+            )
         except Exception as e:
             print(f"Error al obtener libros disponibles: {e}")
             return []
         finally:
-            session.close()
+            db.liberar_sesion(session)
@@ -1,28 +1,75 @@
 # controllers/prestamo_controller.py
 # Controlador para operaciones de préstamos
 
-from models import Prestamo, Libro, Usuario
+from models import Prestamo, Libro, Usuario, ResumenUsuario
 from database import db
+from metricas import medir_controlador
+import time
 from datetime import datetime, timedelta
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, update, insert, case, literal, func, or_
+from paginacion import paginar, Pagina
+from proyecciones import consulta_prestamos, construir_prestamos
+from funciones_sql import dias_entre
+from indice_busqueda import normalizar_isbn
+import resumen_usuarios
 
+# SQL Server admite 2100 parámetros por sentencia: las listas IN de las
+# devoluciones en lote se parten en lotes de 1000 IDs, y el UPDATE de copias
+# en lotes de 300 libros (cinco parámetros por libro: uno del IN y dos de
+# cada una de las dos apariciones del CASE)
+TAMANO_LOTE_IDS = 1000
+TAMANO_LOTE_COPIAS = 300
+
+
+def _lotes(valores, tamano=TAMANO_LOTE_IDS):
+    """Parte `valores` en listas de a lo más `tamano` elementos"""
+    valores = list(valores)
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+@medir_controlador
 class PrestamoController:
     """Controlador para operaciones de préstamos"""
 
     def __init__(self):
-        self.session = None
         self.DIAS_PRESTAMO_DEFAULT = 14
         self.MULTA_POR_DIA = 10.00  # Multa en pesos por día de retraso
 
-    def _get_session(self):
-        if not self.session:
-            self.session = db.get_session()
-        return self.session
+    def _expresion_multa(self, hoy):
+        """
+        Expresión SQL de la multa de un préstamo a la fecha `hoy`: días de
+        retraso por MULTA_POR_DIA, o 0 si aún no vence. Es un valor absoluto,
+        por lo que recalcularlo el mismo día no cambia el resultado.
+        """
+        retraso = dias_entre(Prestamo.FechaDevolucionEsperada, literal(hoy))
+        return case(
+            (Prestamo.FechaDevolucionEsperada < hoy, retraso * self.MULTA_POR_DIA),
+            else_=0
+        )
 
-    def _close_session(self):
-        if self.session:
-            self.session.close()
-            self.session = None
+    def _contar_vencidos(self, session, usuario_id):
+        """
+        Retorna cuántos préstamos vencidos tiene el usuario leyendo su fila de
+        ResumenUsuarios; solo si no tiene resumen se cuentan sus préstamos
+        """
+        hoy = datetime.now().date()
+        resumen = session.execute(
+            select(ResumenUsuario.ProximoVencimiento, ResumenUsuario.PrestamosVencidos)
+            .where(ResumenUsuario.UsuarioID == usuario_id)
+        ).first()
+
+        if resumen is not None:
+            if resumen.ProximoVencimiento is None or resumen.ProximoVencimiento >= hoy:
+                return 0
+            # El conteo puede ir un día atrasado respecto al proceso nocturno
+            return max(resumen.PrestamosVencidos, 1)
+
+        return session.query(Prestamo).filter(
+            Prestamo.UsuarioID == usuario_id,
+            Prestamo.Estado == 'Prestado',
+            Prestamo.FechaDevolucionEsperada < hoy
+        ).count()
 
     def crear_prestamo(self, libro_id, usuario_id, dias_prestamo=None):
         """
@@ -36,7 +83,7 @@ class PrestamoController:
         Returns:
             tuple: (éxito: bool, mensaje: str, prestamo_id: int)
         """
-        session = self._get_session()
+        session = db.obtener_sesion()
 
         try:
             # Verificar que el libro existe y está disponible
@@ -46,6 +93,7 @@ class PrestamoController:
 
             if libro.CopiasDisponibles <= 0:
                 return (False, f"No hay copias disponibles de '{libro.Titulo}'", None)
+            titulo = libro.Titulo
 
             # Verificar que el usuario existe y está activo
             usuario = session.query(Usuario).filter(Usuario.UsuarioID == usuario_id).first()
@@ -56,11 +104,7 @@ class PrestamoController:
                 return (False, f"El usuario '{usuario.nombre_completo}' no está activo", None)
 
             # Verificar si el usuario tiene préstamos vencidos
-            prestamos_vencidos = session.query(Prestamo).filter(
-                Prestamo.UsuarioID == usuario_id,
-                Prestamo.Estado == 'Prestado',
-                Prestamo.FechaDevolucionEsperada < datetime.now().date()
-            ).count()
+            prestamos_vencidos = self._contar_vencidos(session, usuario_id)
 
             if prestamos_vencidos > 0:
                 return (False, f"El usuario tiene {prestamos_vencidos} préstamo(s) vencido(s)", None)
@@ -78,10 +122,23 @@ class PrestamoController:
                 Multa=0
             )
 
-            # Actualizar copias disponibles
-            libro.CopiasDisponibles -= 1
+            # Reservar una copia con un decremento condicional: la comprobación y
+            # la resta ocurren en la misma sentencia, así dos préstamos
+            # simultáneos no pueden tomar la última copia sin bloquear el libro
+            resultado = session.execute(
+                update(Libro)
+                .where(Libro.LibroID == libro_id, Libro.CopiasDisponibles > 0)
+                .values(CopiasDisponibles=Libro.CopiasDisponibles - 1)
+                .execution_options(synchronize_session=False)
+            )
+            if resultado.rowcount == 0:
+                session.rollback()
+                return (False, f"No hay copias disponibles de '{titulo}'", None)
 
             session.add(nuevo_prestamo)
+            session.flush()
+            resumen_usuarios.registrar_prestamos(session, usuario_id, 1, fecha_devolucion,
+                                                 nuevo_prestamo.FechaPrestamo)
             session.commit()
 
             prestamo_id = nuevo_prestamo.PrestamoID
@@ -92,7 +149,118 @@ class PrestamoController:
             session.rollback()
             return (False, f"Error al crear préstamo: {e}", None)
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
+
+    def crear_prestamos_lote(self, usuario_id, libro_ids, dias_prestamo=None):
+        """
+        Crea varios préstamos para un mismo usuario en una sola transacción.
+        El usuario se valida una vez, las copias se reservan con un UPDATE
+        condicional sobre todos los libros y los préstamos se insertan con un
+        INSERT masivo; los libros sin copias se informan sin afectar a los demás.
+
+        Args:
+            usuario_id (int): ID del usuario
+            libro_ids (list): IDs de los libros
+            dias_prestamo (int): Días de duración (default: 14)
+
+        Returns:
+            tuple: (éxito: bool, mensaje: str, resultados: list) donde cada
+                resultado es un dict con libro_id, titulo, exito, mensaje y prestamo_id
+        """
+        # Quitar duplicados conservando el orden
+        libro_ids = list(dict.fromkeys(int(libro_id) for libro_id in libro_ids))
+        if not libro_ids:
+            return (False, "No se indicaron libros", [])
+
+        session = db.obtener_sesion()
+
+        try:
+            # Verificar una sola vez que el usuario existe, está activo y no tiene vencidos
+            usuario = session.query(Usuario).filter(Usuario.UsuarioID == usuario_id).first()
+            if not usuario:
+                return (False, f"No se encontró el usuario con ID {usuario_id}", [])
+
+            if usuario.Estado != 'Activo':
+                return (False, f"El usuario '{usuario.nombre_completo}' no está activo", [])
+
+            prestamos_vencidos = self._contar_vencidos(session, usuario_id)
+
+            if prestamos_vencidos > 0:
+                return (False, f"El usuario tiene {prestamos_vencidos} préstamo(s) vencido(s)", [])
+
+            titulos = dict(session.execute(
+                select(Libro.LibroID, Libro.Titulo).where(Libro.LibroID.in_(libro_ids))
+            ).all())
+
+            # Reservar una copia de cada libro con stock en una sola sentencia
+            reservar = (
+                update(Libro)
+                .where(Libro.LibroID.in_(titulos), Libro.CopiasDisponibles > 0)
+                .values(CopiasDisponibles=Libro.CopiasDisponibles - 1)
+                .execution_options(synchronize_session=False)
+            )
+            if session.get_bind().dialect.update_returning:
+                reservados = set(session.execute(reservar.returning(Libro.LibroID)).scalars())
+            else:
+                # Sin UPDATE ... RETURNING: un decremento condicional por libro
+                reservados = set()
+                for libro_id in titulos:
+                    resultado = session.execute(reservar.where(Libro.LibroID == libro_id))
+                    if resultado.rowcount:
+                        reservados.add(libro_id)
+
+            dias = dias_prestamo or self.DIAS_PRESTAMO_DEFAULT
+            fecha_prestamo = datetime.now()
+            fecha_devolucion = (fecha_prestamo + timedelta(days=dias)).date()
+
+            a_insertar = [libro_id for libro_id in libro_ids if libro_id in reservados]
+            prestamo_ids = {}
+            if a_insertar:
+                filas = session.execute(
+                    insert(Prestamo).returning(Prestamo.LibroID, Prestamo.PrestamoID,
+                                               sort_by_parameter_order=True),
+                    [{
+                        'LibroID': libro_id,
+                        'UsuarioID': usuario_id,
+                        'FechaPrestamo': fecha_prestamo,
+                        'FechaDevolucionEsperada': fecha_devolucion,
+                        'Estado': 'Prestado',
+                        'Multa': 0
+                    } for libro_id in a_insertar]
+                )
+                prestamo_ids = dict(filas.all())
+                resumen_usuarios.registrar_prestamos(session, usuario_id, len(prestamo_ids),
+                                                     fecha_devolucion, fecha_prestamo)
+
+            session.commit()
+
+            resultados = []
+            for libro_id in libro_ids:
+                titulo = titulos.get(libro_id)
+                if titulo is None:
+                    resultados.append({'libro_id': libro_id, 'titulo': None, 'exito': False,
+                                       'mensaje': f"No se encontró el libro con ID {libro_id}",
+                                       'prestamo_id': None})
+                elif libro_id in prestamo_ids:
+                    resultados.append({'libro_id': libro_id, 'titulo': titulo, 'exito': True,
+                                       'mensaje': "Préstamo creado", 'prestamo_id': prestamo_ids[libro_id]})
+                else:
+                    resultados.append({'libro_id': libro_id, 'titulo': titulo, 'exito': False,
+                                       'mensaje': f"No hay copias disponibles de '{titulo}'",
+                                       'prestamo_id': None})
+
+            creados = len(prestamo_ids)
+            if creados == 0:
+                return (False, "No se pudo prestar ninguno de los libros", resultados)
+
+            return (True, f"{creados} de {len(libro_ids)} préstamo(s) creado(s). "
+                          f"Devolver antes del {fecha_devolucion}", resultados)
+
+        except Exception as e:
+            session.rollback()
+            return (False, f"Error al crear préstamos: {e}", [])
+        finally:
+            db.liberar_sesion(session)
 
     def devolver_libro(self, prestamo_id):
         """
@@ -104,7 +272,7 @@ class PrestamoController:
         Returns:
             tuple: (éxito: bool, mensaje: str, multa: float)
         """
-        session = self._get_session()
+        session = db.obtener_sesion()
 
         try:
             prestamo = session.query(Prestamo).filter(
@@ -117,22 +285,35 @@ class PrestamoController:
             if prestamo.Estado == 'Devuelto':
                 return (False, "Este préstamo ya fue devuelto", 0)
 
-            # Calcular multa si hay retraso
             fecha_actual = datetime.now()
-            multa = 0
 
-            if fecha_actual.date() > prestamo.FechaDevolucionEsperada:
-                dias_retraso = (fecha_actual.date() - prestamo.FechaDevolucionEsperada).days
-                multa = dias_retraso * self.MULTA_POR_DIA
+            # Marcar el préstamo como devuelto solo si sigue prestado, para que
+            # dos devoluciones simultáneas no sumen la copia dos veces. La multa
+            # acumulada por el proceso nocturno se cierra con el valor a la fecha
+            resultado = session.execute(
+                update(Prestamo)
+                .where(Prestamo.PrestamoID == prestamo_id, Prestamo.Estado != 'Devuelto')
+                .values(FechaDevolucionReal=fecha_actual, Estado='Devuelto',
+                        Multa=self._expresion_multa(fecha_actual.date()))
+                .execution_options(synchronize_session=False)
+            )
+            if resultado.rowcount == 0:
+                session.rollback()
+                return (False, "Este préstamo ya fue devuelto", 0)
+
+            multa = float(session.scalar(
+                select(Prestamo.Multa).where(Prestamo.PrestamoID == prestamo_id)
+            ) or 0)
 
-            # Actualizar préstamo
-            prestamo.FechaDevolucionReal = fecha_actual
-            prestamo.Estado = 'Devuelto'
-            prestamo.Multa = multa
+            # Incremento simétrico al decremento de crear_prestamo
+            session.execute(
+                update(Libro)
+                .where(Libro.LibroID == prestamo.LibroID, Libro.CopiasDisponibles < Libro.CopiasTotal)
+                .values(CopiasDisponibles=Libro.CopiasDisponibles + 1)
+                .execution_options(synchronize_session=False)
+            )
 
-            # Actualizar copias disponibles del libro
-            libro = session.query(Libro).filter(Libro.LibroID == prestamo.LibroID).first()
-            libro.CopiasDisponibles += 1
+            resumen_usuarios.refrescar(session, [prestamo.UsuarioID], fecha_actual)
 
             session.commit()
 
@@ -146,59 +327,381 @@ class PrestamoController:
             session.rollback()
             return (False, f"Error al devolver libro: {e}", 0)
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
+
+    def devolver_lote(self, prestamo_ids=None, isbns=None):
+        """
+        Procesa la devolución de varios préstamos en una sola transacción.
+        Fecha de devolución y multa se calculan con un UPDATE por lote de
+        préstamos y las copias se reponen con un UPDATE agregado por libro
+        (los lotes respetan el límite de parámetros de SQL Server).
+
+        Los ISBN se resuelven al préstamo activo más antiguo de ese libro (un
+        ISBN repetido devuelve tantos préstamos como veces aparezca).
+
+        Args:
+            prestamo_ids (list): IDs de los préstamos a devolver
+            isbns (list): ISBN de los libros devueltos
+
+        Returns:
+            tuple: (éxito: bool, mensaje: str, resultados: list) donde cada
+                resultado es un dict con prestamo_id, isbn, titulo, exito, mensaje y multa
+        """
+        prestamo_ids = list(dict.fromkeys(int(prestamo_id) for prestamo_id in (prestamo_ids or [])))
+        isbns = [isbn.strip() for isbn in (isbns or []) if isbn and isbn.strip()]
+        if not prestamo_ids and not isbns:
+            return (False, "No se indicaron préstamos", [])
+
+        session = db.obtener_sesion()
+
+        try:
+            resultados = []
+            objetivos = {}  # PrestamoID -> ISBN con el que se identificó (o None)
+
+            for prestamo_id in prestamo_ids:
+                objetivos[prestamo_id] = None
+
+            if isbns:
+                # Préstamos activos de los libros escaneados, del más antiguo al más reciente
+                consulta = select(Libro.ISBN, Prestamo.PrestamoID).join(
+                    Libro, Prestamo.LibroID == Libro.LibroID
+                ).where(
+                    Prestamo.Estado == 'Prestado'
+                ).order_by(Prestamo.FechaDevolucionEsperada, Prestamo.PrestamoID)
+
+                # Primero por coincidencia exacta (usa el índice único de ISBN) y,
+                # para los que falten, comparando el ISBN sin guiones ni espacios.
+                # Cada ISBN queda en un solo lote, así que sus préstamos siguen ordenados
+                pendientes = {}
+                for lote in _lotes(set(isbns)):
+                    for isbn, prestamo_id in session.execute(consulta.where(Libro.ISBN.in_(lote))):
+                        pendientes.setdefault(normalizar_isbn(isbn), []).append(prestamo_id)
+                faltantes = {normalizar_isbn(isbn) for isbn in isbns} - set(pendientes)
+                if faltantes:
+                    compacto = func.lower(func.replace(func.replace(Libro.ISBN, '-', ''), ' ', ''))
+                    for lote in _lotes(faltantes):
+                        for isbn, prestamo_id in session.execute(consulta.where(compacto.in_(lote))):
+                            pendientes.setdefault(normalizar_isbn(isbn), []).append(prestamo_id)
+
+                for isbn in isbns:
+                    disponibles = [p for p in pendientes.get(normalizar_isbn(isbn), []) if p not in objetivos]
+                    if disponibles:
+                        objetivos[disponibles[0]] = isbn
+                    else:
+                        resultados.append({'prestamo_id': None, 'isbn': isbn, 'titulo': None, 'exito': False,
+                                           'mensaje': f"No hay préstamos activos del ISBN {isbn}", 'multa': 0})
+
+            # Datos para el resumen y para distinguir inexistentes de ya devueltos
+            datos = {}
+            for lote in _lotes(objetivos):
+                for fila in session.execute(
+                    select(Prestamo.PrestamoID, Prestamo.LibroID, Prestamo.UsuarioID, Prestamo.Estado, Libro.Titulo)
+                    .join(Libro, Prestamo.LibroID == Libro.LibroID)
+                    .where(Prestamo.PrestamoID.in_(lote))
+                ):
+                    datos[fila.PrestamoID] = fila
+
+            fecha_actual = datetime.now()
+            multa = self._expresion_multa(fecha_actual.date())
+            con_returning = session.get_bind().dialect.update_returning
+
+            # Devolución y multa con un UPDATE por lote de préstamos
+            devueltos = {}
+            for lote in _lotes(objetivos):
+                devolver = (
+                    update(Prestamo)
+                    .where(Prestamo.PrestamoID.in_(lote), Prestamo.Estado != 'Devuelto')
+                    .values(FechaDevolucionReal=fecha_actual, Estado='Devuelto', Multa=multa)
+                    .execution_options(synchronize_session=False)
+                )
+                if con_returning:
+                    for fila in session.execute(devolver.returning(
+                            Prestamo.PrestamoID, Prestamo.LibroID, Prestamo.Multa)):
+                        devueltos[fila.PrestamoID] = (fila.LibroID, fila.Multa)
+                else:
+                    session.execute(devolver)
+
+            if not con_returning:
+                # Sin UPDATE ... RETURNING: los devueltos son los que seguían prestados
+                for lote in _lotes(p for p, d in datos.items() if d.Estado != 'Devuelto'):
+                    for fila in session.execute(
+                        select(Prestamo.PrestamoID, Prestamo.LibroID, Prestamo.Multa).where(
+                            Prestamo.PrestamoID.in_(lote)
+                        )
+                    ):
+                        devueltos[fila.PrestamoID] = (fila.LibroID, fila.Multa)
+
+            # Reponer copias: un UPDATE por lote de libros con el número de devoluciones de cada uno
+            copias_por_libro = {}
+            for libro_id, _ in devueltos.values():
+                copias_por_libro[libro_id] = copias_por_libro.get(libro_id, 0) + 1
+
+            for lote in _lotes(copias_por_libro, TAMANO_LOTE_COPIAS):
+                nuevas = Libro.CopiasDisponibles + case(
+                    {libro_id: copias_por_libro[libro_id] for libro_id in lote}, value=Libro.LibroID, else_=0
+                )
+                session.execute(
+                    update(Libro)
+                    .where(Libro.LibroID.in_(lote))
+                    .values(CopiasDisponibles=case(
+                        (nuevas > Libro.CopiasTotal, Libro.CopiasTotal), else_=nuevas
+                    ))
+                    .execution_options(synchronize_session=False)
+                )
+
+            usuarios = {datos[prestamo_id].UsuarioID for prestamo_id in devueltos}
+            for lote in _lotes(usuarios):
+                resumen_usuarios.refrescar(session, lote, fecha_actual)
+
+            session.commit()
+
+            multa_total = 0
+            for prestamo_id, isbn in objetivos.items():
+                fila = datos.get(prestamo_id)
+                if fila is None:
+                    resultados.append({'prestamo_id': prestamo_id, 'isbn': isbn, 'titulo': None, 'exito': False,
+                                       'mensaje': f"No se encontró el préstamo con ID {prestamo_id}", 'multa': 0})
+                elif prestamo_id not in devueltos:
+                    resultados.append({'prestamo_id': prestamo_id, 'isbn': isbn, 'titulo': fila.Titulo,
+                                       'exito': False, 'mensaje': "Este préstamo ya fue devuelto", 'multa': 0})
+                else:
+                    multa = float(devueltos[prestamo_id][1] or 0)
+                    multa_total += multa
+                    mensaje = "Libro devuelto exitosamente"
+                    if multa > 0:
+                        mensaje += f". Multa por retraso: ${multa:.2f}"
+                    resultados.append({'prestamo_id': prestamo_id, 'isbn': isbn, 'titulo': fila.Titulo,
+                                       'exito': True, 'mensaje': mensaje, 'multa': multa})
+
+            if not devueltos:
+                return (False, "No se devolvió ningún préstamo", resultados)
+
+            mensaje = f"{len(devueltos)} libro(s) devuelto(s)"
+            if multa_total > 0:
+                mensaje += f". Multas por retraso: ${multa_total:.2f}"
+            return (True, mensaje, resultados)
+
+        except Exception as e:
+            session.rollback()
+            return (False, f"Error al devolver libros: {e}", [])
+        finally:
+            db.liberar_sesion(session)
+
+    def acumular_multas(self, fecha=None, tamano_lote=5000):
+        """
+        Acumula la multa de todos los préstamos vencidos que siguen prestados
+        (proceso nocturno). Cada lote de PrestamoID se actualiza con un solo
+        UPDATE y se confirma por separado, para no bloquear Prestamos durante
+        todo el proceso. La multa se fija en su valor absoluto a la fecha, así
+        que ejecutarlo varias veces el mismo día no cambia nada.
+
+        Args:
+            fecha (date): Fecha de cálculo (default: hoy)
+            tamano_lote (int): Préstamos por lote
+
+        Returns:
+            dict: Fecha, filas actualizadas, lotes, segundos transcurridos y
+                error (None si terminó correctamente)
+        """
+        hoy = fecha or datetime.now().date()
+        multa = self._expresion_multa(hoy)
+        vencidos = (Prestamo.Estado == 'Prestado', Prestamo.FechaDevolucionEsperada < hoy)
+        inicio = time.perf_counter()
+        filas = lotes = 0
+        ultimo = 0
+
+        session = db.obtener_sesion()
+        try:
+            while True:
+                # Límite superior del lote: el PrestamoID número `tamano_lote` desde el último
+                limite = session.scalar(
+                    select(Prestamo.PrestamoID)
+                    .where(*vencidos, Prestamo.PrestamoID > ultimo)
+                    .order_by(Prestamo.PrestamoID)
+                    .offset(tamano_lote - 1).limit(1)
+                )
+
+                rango = [Prestamo.PrestamoID > ultimo]
+                if limite is not None:
+                    rango.append(Prestamo.PrestamoID <= limite)
+
+                resultado = session.execute(
+                    update(Prestamo)
+                    .where(*vencidos, *rango, or_(Prestamo.Multa.is_(None), Prestamo.Multa != multa))
+                    .values(Multa=multa)
+                    .execution_options(synchronize_session=False)
+                )
+                # Mismo lote: recalcular vencidos y multas de sus usuarios
+                resumen_usuarios.refrescar(
+                    session, select(Prestamo.UsuarioID).where(*vencidos, *rango), hoy=hoy
+                )
+                session.commit()
+
+                filas += max(resultado.rowcount, 0)
+                lotes += 1
+                if limite is None:
+                    break
+                ultimo = limite
+
+            error = None
+        except Exception as e:
+            # Los lotes ya confirmados se conservan; volver a ejecutar completa el resto
+            session.rollback()
+            print(f"Error al acumular multas: {e}")
+            error = str(e)
+        finally:
+            db.liberar_sesion(session)
+
+        return {
+            'fecha': hoy.isoformat(),
+            'filas': filas,
+            'lotes': lotes,
+            'segundos': round(time.perf_counter() - inicio, 3),
+            'error': error
+        }
 
     def obtener_prestamos_activos(self):
-        """Obtiene todos los préstamos activos"""
+        """Obtiene todos los préstamos activos (PrestamoLista, ver proyecciones.py)"""
+        session = db.obtener_sesion()
         try:
-            session = self._get_session()
-            prestamos = session.query(Prestamo).options(
-                joinedload(Prestamo.usuario),
-                joinedload(Prestamo.libro).joinedload(Libro.autor),
-                joinedload(Prestamo.libro).joinedload(Libro.categoria)
-            ).filter(
+            return construir_prestamos(consulta_prestamos(session).filter(
                 Prestamo.Estado == 'Prestado'
-            ).all()
+            ).order_by(Prestamo.PrestamoID))
+        except Exception as e:
+            print(f"Error al obtener préstamos activos: {e}")
+            return []
+        finally:
+            db.liberar_sesion(session)
 
-            # Detach from session
-            for prestamo in prestamos:
-                session.expunge(prestamo)
+    def obtener_pagina_activos(self, after=None, before=None, limite=None):
+        """Obtiene una página de préstamos activos ordenados por ID (paginación keyset)"""
+        session = db.obtener_sesion()
+        try:
+            query = consulta_prestamos(session).filter(
+                Prestamo.Estado == 'Prestado'
+            )
 
-            return prestamos
+            pagina = paginar(query, [Prestamo.PrestamoID], after, before, limite)
+            pagina.elementos = construir_prestamos(pagina.elementos)
+            return pagina
         except Exception as e:
             print(f"Error al obtener préstamos activos: {e}")
-            return []
+            return Pagina([])
+        finally:
+            db.liberar_sesion(session)
+
+    def exportar_activos(self, tamano_lote=1000):
+        """
+        Itera los préstamos activos como diccionarios para exportación masiva,
+        leyendo del servidor en lotes (yield_per) con un SELECT de Core.
+
+        Args:
+            tamano_lote (int): Filas leídas por cada viaje al servidor
+
+        Yields:
+            dict: Datos del préstamo (mismo formato que /api/prestamos)
+        """
+        consulta = select(
+            Prestamo.PrestamoID, Libro.Titulo, Usuario.Nombre, Usuario.Apellido,
+            Prestamo.FechaPrestamo, Prestamo.FechaDevolucionEsperada, Prestamo.Estado
+        ).join(Libro, Prestamo.LibroID == Libro.LibroID).join(
+            Usuario, Prestamo.UsuarioID == Usuario.UsuarioID
+        ).where(
+            Prestamo.Estado == 'Prestado'
+        ).order_by(Prestamo.PrestamoID).execution_options(yield_per=tamano_lote)
+
+        hoy = datetime.now().date()
+
+        # Sesión propia: el generador se consume después de que la petición
+        # termina, por lo que no puede usar la sesión de la unidad de trabajo
+        session = db.get_session()
+        try:
+            for fila in session.execute(consulta):
+                yield {
+                    'id': fila.PrestamoID,
+                    'libro': fila.Titulo,
+                    'usuario': f"{fila.Nombre} {fila.Apellido}",
+                    'fecha_prestamo': fila.FechaPrestamo.strftime('%Y-%m-%d'),
+                    'fecha_devolucion': fila.FechaDevolucionEsperada.strftime('%Y-%m-%d'),
+                    'dias_restantes': (fila.FechaDevolucionEsperada - hoy).days,
+                    'estado': fila.Estado
+                }
+        finally:
+            session.close()
+
+    # Columnas del historial exportado (mismo orden que las tuplas de exportar_historial)
+    COLUMNAS_HISTORIAL = [
+        'PrestamoID', 'FechaPrestamo', 'FechaDevolucionEsperada', 'FechaDevolucionReal', 'Estado', 'Multa',
+        'LibroID', 'ISBN', 'Titulo', 'UsuarioID', 'NumeroCarnet', 'Usuario'
+    ]
+
+    def exportar_historial(self, desde=None, hasta=None, estados=None, tamano_lote=5000):
+        """
+        Itera el historial de préstamos para auditoría como tuplas, con el
+        título del libro y el nombre del usuario obtenidos en el mismo SELECT
+        de Core. Las filas se leen del servidor en lotes (yield_per), así que
+        la memoria no depende del número de préstamos exportados.
+
+        Args:
+            desde (date): Primera fecha de préstamo incluida
+            hasta (date): Última fecha de préstamo incluida
+            estados (list): Estados a incluir ('Prestado', 'Devuelto' o
+                'Vencido' para los prestados fuera de plazo); todos si se omite
+            tamano_lote (int): Filas leídas por cada viaje al servidor
+
+        Yields:
+            tuple: Valores en el orden de COLUMNAS_HISTORIAL
+        """
+        consulta = select(
+            Prestamo.PrestamoID, Prestamo.FechaPrestamo, Prestamo.FechaDevolucionEsperada,
+            Prestamo.FechaDevolucionReal, Prestamo.Estado, Prestamo.Multa, Libro.LibroID, Libro.ISBN,
+            Libro.Titulo, Usuario.UsuarioID, Usuario.NumeroCarnet,
+            (Usuario.Nombre + ' ' + Usuario.Apellido).label('Usuario')
+        ).join(Libro, Prestamo.LibroID == Libro.LibroID).join(
+            Usuario, Prestamo.UsuarioID == Usuario.UsuarioID
+        )
+
+        if desde is not None:
+            consulta = consulta.where(Prestamo.FechaPrestamo >= datetime.combine(desde, datetime.min.time()))
+        if hasta is not None:
+            consulta = consulta.where(
+                Prestamo.FechaPrestamo < datetime.combine(hasta + timedelta(days=1), datetime.min.time())
+            )
+        if estados:
+            condiciones = [Prestamo.Estado == estado for estado in estados if estado != 'Vencido']
+            if 'Vencido' in estados:
+                condiciones.append((Prestamo.Estado == 'Prestado')
+                                   & (Prestamo.FechaDevolucionEsperada < datetime.now().date()))
+            consulta = consulta.where(or_(*condiciones))
+
+        consulta = consulta.order_by(Prestamo.PrestamoID).execution_options(yield_per=tamano_lote)
+
+        # Sesión propia: la respuesta en streaming se consume al terminar la petición
+        session = db.get_session()
+        try:
+            # Las filas ya vienen en el orden de COLUMNAS_HISTORIAL
+            yield from session.execute(consulta).tuples()
         finally:
-            self._close_session()
+            session.close()
 
     def obtener_prestamos_vencidos(self):
-        """Obtiene todos los préstamos vencidos"""
+        """Obtiene todos los préstamos vencidos (PrestamoLista)"""
+        session = db.obtener_sesion()
         try:
-            session = self._get_session()
-            prestamos = session.query(Prestamo).options(
-                joinedload(Prestamo.usuario),
-                joinedload(Prestamo.libro).joinedload(Libro.autor),
-                joinedload(Prestamo.libro).joinedload(Libro.categoria)
-            ).filter(
+            return construir_prestamos(consulta_prestamos(session).filter(
                 Prestamo.Estado == 'Prestado',
                 Prestamo.FechaDevolucionEsperada < datetime.now().date()
-            ).all()
-
-            # Detach from session
-            for prestamo in prestamos:
-                session.expunge(prestamo)
-
-            return prestamos
+            ).order_by(Prestamo.FechaDevolucionEsperada, Prestamo.PrestamoID))
         except Exception as e:
             print(f"Error al obtener préstamos vencidos: {e}")
             return []
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
 
     def obtener_por_id(self, prestamo_id):
         """Obtiene un préstamo por su ID"""
+        session = db.obtener_sesion()
         try:
-            session = self._get_session()
             prestamo = session.query(Prestamo).filter(
                 Prestamo.PrestamoID == prestamo_id
             ).first()
@@ -207,26 +710,17 @@ class PrestamoController:
             print(f"Error al obtener préstamo: {e}")
             return None
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
 
     def obtener_por_libro(self, libro_id):
-        """Obtiene todos los préstamos de un libro específico"""
+        """Obtiene todos los préstamos de un libro específico (PrestamoLista)"""
+        session = db.obtener_sesion()
         try:
-            session = self._get_session()
-            prestamos = session.query(Prestamo).options(
-                joinedload(Prestamo.usuario),
-                joinedload(Prestamo.libro)
-            ).filter(
+            return construir_prestamos(consulta_prestamos(session).filter(
                 Prestamo.LibroID == libro_id
-            ).order_by(Prestamo.FechaPrestamo.desc()).all()
-
-            # Detach from session
-            for prestamo in prestamos:
-                session.expunge(prestamo)
-
-            return prestamos
+            ).order_by(Prestamo.FechaPrestamo.desc()))
         except Exception as e:
             print(f"Error al obtener préstamos del libro: {e}")
             return []
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
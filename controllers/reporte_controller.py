@@ -0,0 +1,237 @@
+# controllers/reporte_controller.py
+# Controlador para reportes de circulación (rankings y resumen por período)
+
+from models import Libro, Usuario, Prestamo, Autor, Categoria
+from database import db
+from metricas import medir_controlador
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, case, distinct
+
+@medir_controlador
+class ReporteController:
+    """
+    Reportes de circulación calculados en el servidor con GROUP BY y TOP-N.
+
+    Los rankings agrupan primero los préstamos del período por su clave
+    (LibroID, UsuarioID) y limitan el resultado; los nombres se obtienen
+    uniendo solo esas N filas. Con el índice IX_Prestamos_FechaPrestamo el
+    costo depende de los préstamos del período y del tamaño del reporte,
+    no del historial completo.
+    """
+
+    def __init__(self):
+        pass  # No mantener sesión persistente
+
+    @staticmethod
+    def _periodo(desde, hasta):
+        """Condiciones sobre FechaPrestamo para un período de fechas inclusivo"""
+        condiciones = []
+        if desde is not None:
+            condiciones.append(Prestamo.FechaPrestamo >= datetime.combine(desde, datetime.min.time()))
+        if hasta is not None:
+            condiciones.append(
+                Prestamo.FechaPrestamo < datetime.combine(hasta + timedelta(days=1), datetime.min.time())
+            )
+        return condiciones
+
+    @staticmethod
+    def _por_clave(columna, periodo, limite=None):
+        """Subconsulta (clave, prestamos) del período, opcionalmente limitada a las N mayores"""
+        total = func.count(Prestamo.PrestamoID)
+        consulta = select(columna.label('clave'), total.label('prestamos')).where(*periodo).group_by(columna)
+        if limite is not None:
+            consulta = consulta.order_by(total.desc(), columna).limit(limite)
+        return consulta.subquery()
+
+    # ---------- Consultas (reciben la sesión) ----------
+
+    def _libros(self, session, periodo, limite):
+        top = self._por_clave(Prestamo.LibroID, periodo, limite)
+        consulta = select(
+            top.c.clave, Libro.Titulo, Libro.ISBN, Autor.Nombre, Autor.Apellido, top.c.prestamos
+        ).join(Libro, Libro.LibroID == top.c.clave).join(
+            Autor, Libro.AutorID == Autor.AutorID
+        ).order_by(top.c.prestamos.desc(), top.c.clave)
+        return [
+            {'libro_id': fila.clave, 'titulo': fila.Titulo, 'isbn': fila.ISBN,
+             'autor': f"{fila.Nombre} {fila.Apellido}", 'prestamos': fila.prestamos}
+            for fila in session.execute(consulta)
+        ]
+
+    def _usuarios(self, session, periodo, limite):
+        top = self._por_clave(Prestamo.UsuarioID, periodo, limite)
+        consulta = select(
+            top.c.clave, Usuario.NumeroCarnet, Usuario.Nombre, Usuario.Apellido, top.c.prestamos
+        ).join(Usuario, Usuario.UsuarioID == top.c.clave).order_by(top.c.prestamos.desc(), top.c.clave)
+        return [
+            {'usuario_id': fila.clave, 'carnet': fila.NumeroCarnet,
+             'nombre': f"{fila.Nombre} {fila.Apellido}", 'prestamos': fila.prestamos}
+            for fila in session.execute(consulta)
+        ]
+
+    def _agrupado_por_libro(self, session, periodo, limite, columna_id, columnas_nombre, join):
+        """
+        Ranking de una clave del libro (categoría o autor): se agrupa por
+        libro y luego se une Libros con los libros distintos del período
+        """
+        por_libro = self._por_clave(Prestamo.LibroID, periodo)
+        total = func.sum(por_libro.c.prestamos)
+        consulta = select(
+            columna_id, *columnas_nombre, total.label('prestamos'),
+            func.count(por_libro.c.clave).label('libros')
+        ).select_from(por_libro).join(Libro, Libro.LibroID == por_libro.c.clave).join(*join).group_by(
+            columna_id, *columnas_nombre
+        ).order_by(total.desc(), columna_id).limit(limite)
+        return session.execute(consulta).all()
+
+    def _categorias(self, session, periodo, limite):
+        filas = self._agrupado_por_libro(
+            session, periodo, limite, Categoria.CategoriaID, [Categoria.NombreCategoria],
+            (Categoria, Libro.CategoriaID == Categoria.CategoriaID)
+        )
+        return [
+            {'categoria_id': fila.CategoriaID, 'nombre': fila.NombreCategoria,
+             'prestamos': int(fila.prestamos), 'libros': fila.libros}
+            for fila in filas
+        ]
+
+    def _autores(self, session, periodo, limite):
+        filas = self._agrupado_por_libro(
+            session, periodo, limite, Autor.AutorID, [Autor.Nombre, Autor.Apellido],
+            (Autor, Libro.AutorID == Autor.AutorID)
+        )
+        return [
+            {'autor_id': fila.AutorID, 'nombre': f"{fila.Nombre} {fila.Apellido}",
+             'prestamos': int(fila.prestamos), 'libros': fila.libros}
+            for fila in filas
+        ]
+
+    def _circulacion(self, session, periodo):
+        hoy = datetime.now().date()
+        consulta = select(
+            func.count(Prestamo.PrestamoID).label('prestamos'),
+            func.sum(case((Prestamo.Estado == 'Devuelto', 1), else_=0)).label('devueltos'),
+            func.sum(case((Prestamo.Estado == 'Prestado', 1), else_=0)).label('activos'),
+            func.sum(case(((Prestamo.Estado == 'Prestado') & (Prestamo.FechaDevolucionEsperada < hoy), 1),
+                          else_=0)).label('vencidos'),
+            func.sum(Prestamo.Multa).label('multas'),
+            func.count(distinct(Prestamo.UsuarioID)).label('usuarios'),
+            func.count(distinct(Prestamo.LibroID)).label('libros')
+        ).where(*periodo)
+        fila = session.execute(consulta).mappings().one()
+        # SUM sobre un período sin préstamos devuelve NULL
+        resumen = {clave: int(valor or 0) for clave, valor in fila.items() if clave != 'multas'}
+        resumen['multas'] = float(fila['multas'] or 0)
+        return resumen
+
+    def _ejecutar(self, consulta, desde, hasta, *argumentos, vacio=None):
+        session = db.obtener_sesion()
+        try:
+            return consulta(session, self._periodo(desde, hasta), *argumentos)
+        except Exception as e:
+            print(f"Error al generar reporte: {e}")
+            return [] if vacio is None else vacio
+        finally:
+            db.liberar_sesion(session)
+
+    # ---------- Reportes ----------
+
+    def libros_mas_prestados(self, desde=None, hasta=None, limite=10):
+        """
+        Obtiene los libros con más préstamos en el período
+
+        Args:
+            desde (date): Primera fecha de préstamo incluida (None: sin límite)
+            hasta (date): Última fecha de préstamo incluida (None: sin límite)
+            limite (int): Número de libros
+
+        Returns:
+            list: Diccionarios con libro_id, titulo, isbn, autor y prestamos
+        """
+        return self._ejecutar(self._libros, desde, hasta, limite)
+
+    def usuarios_mas_activos(self, desde=None, hasta=None, limite=10):
+        """
+        Obtiene los usuarios con más préstamos en el período
+
+        Args:
+            desde (date): Primera fecha de préstamo incluida
+            hasta (date): Última fecha de préstamo incluida
+            limite (int): Número de usuarios
+
+        Returns:
+            list: Diccionarios con usuario_id, carnet, nombre y prestamos
+        """
+        return self._ejecutar(self._usuarios, desde, hasta, limite)
+
+    def categorias_mas_prestadas(self, desde=None, hasta=None, limite=10):
+        """
+        Obtiene las categorías con más préstamos en el período
+
+        Args:
+            desde (date): Primera fecha de préstamo incluida
+            hasta (date): Última fecha de préstamo incluida
+            limite (int): Número de categorías
+
+        Returns:
+            list: Diccionarios con categoria_id, nombre, prestamos y libros
+                (libros distintos prestados)
+        """
+        return self._ejecutar(self._categorias, desde, hasta, limite)
+
+    def autores_mas_prestados(self, desde=None, hasta=None, limite=10):
+        """
+        Obtiene los autores con más préstamos en el período
+
+        Args:
+            desde (date): Primera fecha de préstamo incluida
+            hasta (date): Última fecha de préstamo incluida
+            limite (int): Número de autores
+
+        Returns:
+            list: Diccionarios con autor_id, nombre, prestamos y libros
+        """
+        return self._ejecutar(self._autores, desde, hasta, limite)
+
+    def resumen_circulacion(self, desde=None, hasta=None):
+        """
+        Obtiene los totales de circulación de los préstamos del período
+
+        Args:
+            desde (date): Primera fecha de préstamo incluida
+            hasta (date): Última fecha de préstamo incluida
+
+        Returns:
+            dict: prestamos, devueltos, activos, vencidos, multas, usuarios y
+                libros distintos, o un diccionario vacío si hay error
+        """
+        return self._ejecutar(self._circulacion, desde, hasta, vacio={})
+
+    def obtener_reporte(self, desde=None, hasta=None, limite=10):
+        """
+        Obtiene el resumen y los cuatro rankings del período con una sola sesión
+
+        Args:
+            desde (date): Primera fecha de préstamo incluida
+            hasta (date): Última fecha de préstamo incluida
+            limite (int): Filas de cada ranking
+
+        Returns:
+            dict: circulacion, libros, usuarios, categorias y autores (vacíos
+                si hay error)
+        """
+        session = db.obtener_sesion()
+        periodo = self._periodo(desde, hasta)
+        try:
+            return {
+                'circulacion': self._circulacion(session, periodo),
+                'libros': self._libros(session, periodo, limite),
+                'usuarios': self._usuarios(session, periodo, limite),
+                'categorias': self._categorias(session, periodo, limite),
+                'autores': self._autores(session, periodo, limite),
+            }
+        except Exception as e:
+            print(f"Error al generar reporte: {e}")
+            return {'circulacion': {}, 'libros': [], 'usuarios': [], 'categorias': [], 'autores': []}
+        finally:
+            db.liberar_sesion(session)
@@ -1,28 +1,18 @@
 # controllers/usuario_controller.py
 # Controlador para operaciones de usuarios
 
-from models import Usuario, Prestamo
+from models import Usuario, Prestamo, ResumenUsuario
 from database import db
+from metricas import medir_controlador
+from sqlalchemy import select
 from sqlalchemy.orm import joinedload
+from paginacion import paginar, Pagina
+from proyecciones import consulta_usuarios, construir_usuarios
 
+@medir_controlador
 class UsuarioController:
     """Controlador para operaciones de usuarios"""
 
-    def __init__(self):
-        self.session = None
-
-    def _get_session(self):
-        """Obtiene una sesión de base de datos"""
-        if not self.session:
-            self.session = db.get_session()
-        return self.session
-
-    def _close_session(self):
-        """Cierra la sesión actual"""
-        if self.session:
-            self.session.close()
-            self.session = None
-
     def obtener_todos(self, solo_activos=True):
         """
         Obtiene todos los usuarios
@@ -31,36 +21,94 @@ class UsuarioController:
             solo_activos (bool): Si es True, solo retorna usuarios activos
 
         Returns:
-            list: Lista de usuarios
+            list: Lista de UsuarioLista (ver proyecciones.py)
         """
+        session = db.obtener_sesion()
         try:
-            session = self._get_session()
-            query = session.query(Usuario).options(
-                joinedload(Usuario.prestamos)
-            )
+            # El resumen trae los contadores sin cargar todos los préstamos
+            query = consulta_usuarios(session)
 
             if solo_activos:
                 query = query.filter(Usuario.Estado == 'Activo')
 
-            usuarios = query.all()
+            return construir_usuarios(query.order_by(Usuario.UsuarioID))
+        except Exception as e:
+            print(f"Error al obtener usuarios: {e}")
+            return []
+        finally:
+            db.liberar_sesion(session)
+
+    def obtener_pagina(self, after=None, before=None, limite=None, solo_activos=True):
+        """
+        Obtiene una página de usuarios ordenados por ID (paginación keyset)
 
-            # Detach from session
-            for usuario in usuarios:
-                session.expunge(usuario)
+        Args:
+            after (str): Cursor de la página siguiente
+            before (str): Cursor de la página anterior
+            limite (int): Número máximo de usuarios
+            solo_activos (bool): Si es True, solo retorna usuarios activos
+
+        Returns:
+            Pagina: Página de UsuarioLista
+        """
+        session = db.obtener_sesion()
+        try:
+            query = consulta_usuarios(session)
+
+            if solo_activos:
+                query = query.filter(Usuario.Estado == 'Activo')
 
-            return usuarios
+            pagina = paginar(query, [Usuario.UsuarioID], after, before, limite)
+            pagina.elementos = construir_usuarios(pagina.elementos)
+            return pagina
         except Exception as e:
             print(f"Error al obtener usuarios: {e}")
-            return []
+            return Pagina([])
+        finally:
+            db.liberar_sesion(session)
+
+    def exportar(self, solo_activos=True, tamano_lote=1000):
+        """
+        Itera los usuarios como diccionarios para exportación masiva,
+        leyendo del servidor en lotes (yield_per) sin cargar objetos ORM.
+
+        Args:
+            solo_activos (bool): Si es True, solo exporta usuarios activos
+            tamano_lote (int): Filas leídas por cada viaje al servidor
+
+        Yields:
+            dict: Datos del usuario (mismo formato que /api/usuarios)
+        """
+        consulta = select(
+            Usuario.UsuarioID, Usuario.NumeroCarnet, Usuario.Nombre, Usuario.Apellido,
+            Usuario.Email, Usuario.Estado
+        ).order_by(Usuario.UsuarioID).execution_options(yield_per=tamano_lote)
+
+        if solo_activos:
+            consulta = consulta.where(Usuario.Estado == 'Activo')
+
+        # Sesión propia: el generador se consume después de que la petición
+        # termina, por lo que no puede usar la sesión de la unidad de trabajo
+        session = db.get_session()
+        try:
+            for fila in session.execute(consulta):
+                yield {
+                    'id': fila.UsuarioID,
+                    'carnet': fila.NumeroCarnet,
+                    'nombre': f"{fila.Nombre} {fila.Apellido}",
+                    'email': fila.Email,
+                    'estado': fila.Estado
+                }
         finally:
-            self._close_session()
+            session.close()
 
     def obtener_por_id(self, usuario_id):
         """Obtiene un usuario por su ID"""
+        session = db.obtener_sesion()
         try:
-            session = self._get_session()
             usuario = session.query(Usuario).options(
-                joinedload(Usuario.prestamos)
+                joinedload(Usuario.prestamos),
+                joinedload(Usuario.resumen)
             ).filter(Usuario.UsuarioID == usuario_id).first()
 
             if usuario:
@@ -71,12 +119,12 @@ class UsuarioController:
             print(f"Error al obtener usuario: {e}")
             return None
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
 
     def obtener_por_carnet(self, numero_carnet):
         """Obtiene un usuario por su número de carnet"""
+        session = db.obtener_sesion()
         try:
-            session = self._get_session()
             usuario = session.query(Usuario).filter(
                 Usuario.NumeroCarnet == numero_carnet
             ).first()
@@ -85,7 +133,7 @@ class UsuarioController:
             print(f"Error al obtener usuario: {e}")
             return None
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
 
     def crear(self, datos_usuario):
         """
@@ -97,7 +145,7 @@ class UsuarioController:
         Returns:
             tuple: (éxito: bool, mensaje: str, usuario_id: int)
         """
-        session = self._get_session()
+        session = db.obtener_sesion()
 
         try:
             nuevo_usuario = Usuario(
@@ -109,6 +157,7 @@ class UsuarioController:
                 Direccion=datos_usuario.get('direccion'),
                 Estado='Activo'
             )
+            nuevo_usuario.resumen = ResumenUsuario(PrestamosActivos=0, PrestamosVencidos=0, MultasPendientes=0)
 
             session.add(nuevo_usuario)
             session.commit()
@@ -121,11 +170,11 @@ class UsuarioController:
             session.rollback()
             return (False, f"Error al crear usuario: {e}", None)
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
 
     def actualizar(self, usuario_id, datos_actualizados):
         """Actualiza un usuario existente"""
-        session = self._get_session()
+        session = db.obtener_sesion()
 
         try:
             usuario = session.query(Usuario).filter(Usuario.UsuarioID == usuario_id).first()
@@ -145,7 +194,7 @@ class UsuarioController:
             session.rollback()
             return (False, f"Error al actualizar usuario: {e}")
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
 
     def desactivar(self, usuario_id):
         """Desactiva un usuario (no lo elimina)"""
@@ -157,9 +206,8 @@ class UsuarioController:
 
     def obtener_prestamos_activos(self, usuario_id):
         """Obtiene los préstamos activos de un usuario"""
+        session = db.obtener_sesion()
         try:
-            session = self._get_session()
-
             prestamos = session.query(Prestamo).filter(
                 Prestamo.UsuarioID == usuario_id,
                 Prestamo.Estado == 'Prestado'
@@ -170,4 +218,4 @@ class UsuarioController:
             print(f"Error al obtener préstamos: {e}")
             return []
         finally:
-            self._close_session()
+            db.liberar_sesion(session)
@@ -8,6 +8,7 @@ let
       flask
       werkzeug
       sqlalchemy
+      numpy
       pymssql;
   };
 
@@ -0,0 +1,103 @@
+# exportacion.py
+# Serialización en streaming para las exportaciones masivas
+
+import csv
+import json
+
+LINEAS_POR_BLOQUE = 500
+
+
+def generar_ndjson(filas, lineas_por_bloque=LINEAS_POR_BLOQUE):
+    """
+    Convierte un iterable de diccionarios en bloques de texto NDJSON
+    (un objeto JSON por línea). Las líneas se agrupan en bloques para no
+    emitir un fragmento HTTP por fila; la memoria usada depende solo del
+    tamaño del bloque, no del total de filas.
+
+    Si la fuente falla a mitad de la exportación se emite una última línea
+    {"error": ...} para que el consumidor detecte que la salida está incompleta.
+
+    Args:
+        filas (iterable): Diccionarios serializables a JSON
+        lineas_por_bloque (int): Líneas acumuladas antes de emitir un bloque
+
+    Yields:
+        str: Bloque de líneas NDJSON
+    """
+    bloque = []
+    try:
+        for fila in filas:
+            bloque.append(json.dumps(fila, ensure_ascii=False, default=str))
+            if len(bloque) >= lineas_por_bloque:
+                yield '\n'.join(bloque) + '\n'
+                bloque = []
+    except Exception as e:
+        print(f"Error durante la exportación: {e}")
+        bloque.append(json.dumps({'error': str(e)}, ensure_ascii=False))
+
+    if bloque:
+        yield '\n'.join(bloque) + '\n'
+
+
+class _Buffer:
+    """Destino de csv.writer que acumula el texto escrito en una lista"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, texto):
+        self.partes.append(texto)
+
+    def vaciar(self):
+        texto = ''.join(self.partes)
+        self.partes = []
+        return texto
+
+
+# Caracteres con los que Excel interpreta una celda como fórmula
+_INICIO_FORMULA = frozenset('=+-@\t\r')
+
+
+def generar_csv(filas, encabezado, lineas_por_bloque=LINEAS_POR_BLOQUE, separador=',', bom=True):
+    """
+    Convierte un iterable de filas (tuplas en el orden del encabezado) en
+    bloques de texto CSV. Igual que generar_ndjson, la memoria depende solo
+    del tamaño del bloque.
+
+    La salida está pensada para abrirse en Excel: BOM UTF-8 al inicio (para
+    que reconozca los acentos), fin de línea CRLF y separador configurable
+    (Excel en español espera ';'). Si la fuente falla a mitad de la
+    exportación se emite una última fila "ERROR: ..." para que la salida
+    incompleta no pase desapercibida. Los textos que empiezan como una
+    fórmula (=, +, -, @) llevan un apóstrofo delante para que Excel no los
+    ejecute al abrir el archivo.
+
+    Args:
+        filas (iterable): Tuplas o listas de valores
+        encabezado (list): Nombres de las columnas
+        lineas_por_bloque (int): Filas acumuladas antes de emitir un bloque
+        separador (str): Separador de campos
+        bom (bool): Emitir la marca de orden de bytes UTF-8
+
+    Yields:
+        str: Bloque de líneas CSV
+    """
+    buffer = _Buffer()
+    escritor = csv.writer(buffer, delimiter=separador)
+    escritor.writerow(encabezado)
+    pendientes = 0
+    try:
+        for fila in filas:
+            escritor.writerow([("'" + valor) if valor.__class__ is str and valor[:1] in _INICIO_FORMULA else valor
+                               for valor in fila])
+            pendientes += 1
+            if pendientes >= lineas_por_bloque:
+                texto = buffer.vaciar()
+                yield ('\ufeff' + texto) if bom else texto
+                bom, pendientes = False, 0
+    except Exception as e:
+        print(f"Error durante la exportación: {e}")
+        escritor.writerow([f"ERROR: {e}"])
+
+    texto = buffer.vaciar()
+    yield ('\ufeff' + texto) if bom else texto
@@ -0,0 +1,59 @@
+# exportar_historial.py
+# Exporta el historial de préstamos a CSV para auditoría
+#
+# Ejecutar: python exportar_historial.py historial.csv [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD]
+#           [--estado Devuelto --estado Vencido] [--separador ';']
+# Con "-" como archivo la salida va a la consola (por ejemplo, para comprimirla con gzip).
+
+import argparse
+import sys
+import time
+from datetime import date
+from controllers import PrestamoController
+from exportacion import generar_csv
+from instrumentacion import perfilar
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta el historial de préstamos a CSV')
+    parser.add_argument('archivo', help='Archivo de salida ("-" para la salida estándar)')
+    parser.add_argument('--desde', type=date.fromisoformat, help='Primera fecha de préstamo (AAAA-MM-DD)')
+    parser.add_argument('--hasta', type=date.fromisoformat, help='Última fecha de préstamo (AAAA-MM-DD)')
+    parser.add_argument('--estado', action='append', choices=['Prestado', 'Devuelto', 'Vencido'],
+                        help='Estado a incluir (se puede repetir; por defecto todos)')
+    parser.add_argument('--separador', default=',', choices=[',', ';'],
+                        help="Separador de campos (';' para Excel en español)")
+    parser.add_argument('--lote', type=int, default=5000, help='Filas leídas por cada viaje al servidor')
+    parser.add_argument('--sin-bom', action='store_true', help='No escribir la marca BOM UTF-8')
+    args = parser.parse_args()
+
+    controller = PrestamoController()
+    exportadas = 0
+
+    def _contar(filas):
+        nonlocal exportadas
+        for fila in filas:
+            exportadas += 1
+            yield fila
+
+    filas = _contar(controller.exportar_historial(desde=args.desde, hasta=args.hasta, estados=args.estado,
+                                                  tamano_lote=args.lote))
+    inicio = time.perf_counter()
+    salida = sys.stdout if args.archivo == '-' else open(args.archivo, 'w', encoding='utf-8', newline='')
+    try:
+        with perfilar('exportar_historial') as perfil:
+            for bloque in generar_csv(filas, controller.COLUMNAS_HISTORIAL, separador=args.separador,
+                                      bom=not args.sin_bom and salida is not sys.stdout):
+                salida.write(bloque)
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+
+    segundos = time.perf_counter() - inicio
+    print(f"{exportadas} préstamo(s) exportado(s) en {segundos:.2f} s "
+          f"({exportadas / segundos if segundos else 0:.0f} filas/s, {perfil.consultas} consultas)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
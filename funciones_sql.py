@@ -0,0 +1,37 @@
+# funciones_sql.py
+# Funciones SQL que se compilan distinto según el motor (SQL Server / SQLite)
+
+from sqlalchemy import Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class dias_entre(FunctionElement):
+    """
+    Días enteros desde `inicio` hasta `fin` (negativo si fin es anterior)
+
+    Ejemplo:
+        dias_entre(Prestamo.FechaDevolucionEsperada, hoy)
+    """
+    type = Integer()
+    name = 'dias_entre'
+    inherit_cache = True
+
+
+@compiles(dias_entre)
+def _dias_entre_generico(elemento, compilador, **kw):
+    inicio, fin = list(elemento.clauses)
+    return f"CAST(({compilador.process(fin, **kw)}) - ({compilador.process(inicio, **kw)}) AS INTEGER)"
+
+
+@compiles(dias_entre, 'mssql')
+def _dias_entre_mssql(elemento, compilador, **kw):
+    inicio, fin = list(elemento.clauses)
+    return f"DATEDIFF(day, {compilador.process(inicio, **kw)}, {compilador.process(fin, **kw)})"
+
+
+@compiles(dias_entre, 'sqlite')
+def _dias_entre_sqlite(elemento, compilador, **kw):
+    inicio, fin = list(elemento.clauses)
+    return (f"CAST(julianday(date({compilador.process(fin, **kw)})) - "
+            f"julianday(date({compilador.process(inicio, **kw)})) AS INTEGER)")
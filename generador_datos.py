@@ -0,0 +1,485 @@
+# generador_datos.py
+# Generador de datos sintéticos a gran escala para pruebas de carga
+#
+# Crea Autores, Categorias, Libros (ISBN-13 válidos), Usuarios y Prestamos con
+# distribuciones realistas: popularidad de libros tipo Zipf, fechas de préstamo
+# con estacionalidad (curso escolar, vacaciones, fines de semana) y una
+# proporción configurable de préstamos vencidos. Los datos se escriben con
+# INSERT masivos de SQLAlchemy Core por lotes y pueden generarse en varios
+# procesos.
+#
+# Ejecutar:
+#   python generador_datos.py --url sqlite:///carga.db --libros 1000000 --usuarios 100000 --prestamos 5000000
+#   python generador_datos.py --limpiar --procesos 4        (base configurada en config.py / DATABASE_URL)
+
+import argparse
+import itertools
+import math
+import multiprocessing
+import random
+import sys
+import time
+from bisect import bisect
+from datetime import datetime, date, timedelta
+from sqlalchemy import create_engine, insert, select, update, delete, func
+from sqlalchemy.pool import NullPool
+
+TAMANO_LOTE = 10000
+MULTA_POR_DIA = 10.00
+DIAS_PRESTAMO = 14
+
+PALABRAS = (
+    'amor', 'guerra', 'tiempo', 'soledad', 'historia', 'ciencia', 'noche', 'mar', 'ciudad',
+    'viaje', 'sombra', 'memoria', 'jardín', 'fuego', 'silencio', 'río', 'montaña', 'secreto',
+    'destino', 'reino', 'camino', 'luz', 'invierno', 'verano', 'isla', 'sueño', 'palabra',
+    'código', 'algoritmo', 'universo', 'estrella', 'familia', 'revolución', 'imperio', 'música',
+    'viento', 'libertad', 'muerte', 'vida', 'ventana', 'puerta', 'espejo', 'laberinto',
+    'biblioteca', 'máquina', 'frontera', 'desierto', 'bosque', 'océano', 'caribe'
+)
+NOMBRES = ('Gabriel', 'Miguel', 'Isabel', 'Julia', 'Pedro', 'Ana', 'Juan', 'Rosa', 'Carlos',
+           'Lucía', 'Jorge', 'Elena', 'Mario', 'Laura', 'Pablo', 'Clara', 'Andrés', 'Sofía')
+APELLIDOS = ('García', 'Martínez', 'Rodríguez', 'López', 'Pérez', 'Gómez', 'Díaz', 'Herrera',
+             'Castillo', 'Vargas', 'Reyes', 'Morales', 'Ortiz', 'Núñez', 'Jiménez', 'Rojas',
+             'Medina', 'Guzmán', 'Peña', 'Santana', 'Marte', 'Cabrera', 'Almonte', 'Tavárez')
+NACIONALIDADES = ('Dominicana', 'Española', 'Colombiana', 'Mexicana', 'Argentina', 'Británica',
+                  'Estadounidense', 'Francesa', 'Cubana', 'Chilena')
+CATEGORIAS = ('Ficción', 'Ciencia', 'Historia', 'Tecnología', 'Literatura Clásica', 'Poesía',
+              'Biografías', 'Infantil', 'Juvenil', 'Filosofía', 'Arte', 'Economía', 'Derecho',
+              'Medicina', 'Matemáticas', 'Viajes', 'Cocina', 'Autoayuda', 'Religión', 'Deportes')
+EDITORIALES = ('Editorial Sintética', 'Alfaguara', 'Planeta', 'Anagrama', 'Santillana', 'Tusquets')
+
+# Demanda relativa de préstamos por mes (curso escolar alto, julio y diciembre bajos)
+FACTOR_MES = (1.0, 1.1, 1.15, 1.05, 1.0, 0.8, 0.6, 0.75, 1.2, 1.2, 1.1, 0.6)
+# Demanda relativa por día de la semana (lunes = 0)
+FACTOR_DIA_SEMANA = (1.0, 1.0, 1.0, 1.0, 0.95, 0.6, 0.25)
+
+# Parámetros calculados una vez por proceso (distribuciones acumuladas)
+_CACHE_PROCESO = {}
+_ENGINE_TRABAJADOR = None
+
+
+def isbn13(numero):
+    """
+    Retorna un ISBN-13 válido (prefijo 978) para un número de hasta 9 dígitos
+
+    Args:
+        numero (int): Número único del libro
+
+    Returns:
+        str: ISBN de 13 dígitos con su dígito de control
+    """
+    cuerpo = f"978{numero:09d}"
+    suma = sum(int(digito) * (3 if i % 2 else 1) for i, digito in enumerate(cuerpo))
+    return cuerpo + str((10 - suma % 10) % 10)
+
+
+def _frase(rnd, minimo, maximo):
+    """Genera una frase con palabras al azar del vocabulario"""
+    return ' '.join(rnd.choice(PALABRAS) for _ in range(rnd.randint(minimo, maximo))).capitalize()
+
+
+# ==================== DISTRIBUCIONES ====================
+
+class Zipf:
+    """
+    Muestreo de rangos 1..n con probabilidad proporcional a 1 / rango^s. El
+    rango se convierte en ID con una permutación fija, para que los
+    elementos populares no sean siempre los de ID más bajo.
+    """
+
+    def __init__(self, n, exponente):
+        self.n = n
+        self.acumulado = list(itertools.accumulate(rango ** -exponente for rango in range(1, n + 1)))
+        self.total = self.acumulado[-1]
+        self.paso = self._coprimo(n)
+
+    @staticmethod
+    def _coprimo(n):
+        paso = max(1, int(n * 0.618)) | 1
+        while math.gcd(paso, n) != 1:
+            paso += 2
+        return paso
+
+    def muestra(self, rnd):
+        rango = bisect(self.acumulado, rnd.random() * self.total)
+        return (min(rango, self.n - 1) * self.paso) % self.n + 1
+
+
+class Estacional:
+    """Fechas de los últimos `dias` días ponderadas por mes y día de la semana"""
+
+    def __init__(self, hoy, dias):
+        self.dias = [hoy - timedelta(days=i) for i in range(dias, 0, -1)]
+        self.acumulado = list(itertools.accumulate(
+            FACTOR_MES[d.month - 1] * FACTOR_DIA_SEMANA[d.weekday()] for d in self.dias
+        ))
+        self.total = self.acumulado[-1]
+
+    def muestra(self, rnd):
+        dia = self.dias[min(bisect(self.acumulado, rnd.random() * self.total), len(self.dias) - 1)]
+        return datetime(dia.year, dia.month, dia.day, rnd.randint(8, 19), rnd.randint(0, 59), rnd.randint(0, 59))
+
+    def fraccion_antes_de(self, limite):
+        """Proporción de préstamos con fecha anterior a `limite`"""
+        posicion = bisect(self.dias, limite)
+        return self.acumulado[posicion - 1] / self.total if posicion else 0.0
+
+
+def _distribuciones(p):
+    """Distribuciones del proceso actual (se construyen una sola vez)"""
+    clave = (p['libros'], p['usuarios'], p['autores'], p['exponente_zipf'], p['hoy'], p['dias_historial'])
+    if _CACHE_PROCESO.get('clave') != clave:
+        _CACHE_PROCESO.clear()
+        _CACHE_PROCESO.update({
+            'clave': clave,
+            'libros': Zipf(p['libros'], p['exponente_zipf']) if p['libros'] else None,
+            # Lectores frecuentes y ocasionales; autores prolíficos y de un solo libro
+            'usuarios': Zipf(p['usuarios'], 0.5) if p['usuarios'] else None,
+            'autores': Zipf(p['autores'], 1.0) if p['autores'] else None,
+            'fechas': Estacional(p['hoy'], p['dias_historial']),
+        })
+    return _CACHE_PROCESO
+
+
+# ==================== GENERACIÓN POR BLOQUES ====================
+
+def _generar_categorias(rnd, inicio, fin, p):
+    return [
+        {'CategoriaID': i,
+         'NombreCategoria': CATEGORIAS[i - 1] if i <= len(CATEGORIAS) else f'Categoría {i}',
+         'Descripcion': f'Libros de {CATEGORIAS[i - 1] if i <= len(CATEGORIAS) else f"la categoría {i}"}'}
+        for i in range(inicio, fin)
+    ]
+
+
+def _generar_autores(rnd, inicio, fin, p):
+    ahora = datetime.combine(p['hoy'], datetime.min.time())
+    return [
+        {'AutorID': i, 'Nombre': rnd.choice(NOMBRES),
+         'Apellido': f'{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}',
+         'Nacionalidad': rnd.choice(NACIONALIDADES),
+         'FechaNacimiento': date(rnd.randint(1900, 1995), rnd.randint(1, 12), rnd.randint(1, 28)),
+         'FechaRegistro': ahora}
+        for i in range(inicio, fin)
+    ]
+
+
+def _generar_libros(rnd, inicio, fin, p):
+    autores = _distribuciones(p)['autores']
+    ahora = datetime.combine(p['hoy'], datetime.min.time())
+    filas = []
+    for i in range(inicio, fin):
+        copias = rnd.choice((1, 1, 2, 2, 3, 3, 4, 5, 8, 10))
+        filas.append({
+            'LibroID': i, 'Titulo': _frase(rnd, 2, 6), 'ISBN': isbn13(i),
+            'AutorID': autores.muestra(rnd), 'CategoriaID': rnd.randint(1, p['categorias']),
+            'FechaPublicacion': date(rnd.randint(1950, p['hoy'].year), rnd.randint(1, 12), rnd.randint(1, 28)),
+            'Editorial': rnd.choice(EDITORIALES), 'NumeroPaginas': rnd.randint(80, 900),
+            'CopiasDisponibles': copias, 'CopiasTotal': copias,
+            'Descripcion': _frase(rnd, 6, 15), 'FechaRegistro': ahora
+        })
+    return filas
+
+
+def _generar_usuarios(rnd, inicio, fin, p):
+    fechas = _distribuciones(p)['fechas']
+    return [
+        {'UsuarioID': i, 'NumeroCarnet': f'USR{i:07d}', 'Nombre': rnd.choice(NOMBRES),
+         'Apellido': f'{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}',
+         'Email': f'usuario{i}@example.com', 'Telefono': f'809-{rnd.randint(200, 999)}-{rnd.randint(0, 9999):04d}',
+         'Estado': 'Activo' if rnd.random() < 0.9 else 'Inactivo', 'FechaRegistro': fechas.muestra(rnd)}
+        for i in range(inicio, fin)
+    ]
+
+
+def _generar_prestamos(rnd, inicio, fin, p):
+    dist = _distribuciones(p)
+    libros, usuarios, fechas = dist['libros'], dist['usuarios'], dist['fechas']
+    hoy = p['hoy']
+    ahora = datetime.combine(hoy, datetime.min.time())
+    probabilidad_vencido = p['probabilidad_vencido']
+
+    filas = []
+    for i in range(inicio, fin):
+        fecha = fechas.muestra(rnd)
+        esperada = (fecha + timedelta(days=DIAS_PRESTAMO)).date()
+        fila = {'PrestamoID': i, 'LibroID': libros.muestra(rnd), 'UsuarioID': usuarios.muestra(rnd),
+                'FechaPrestamo': fecha, 'FechaDevolucionEsperada': esperada,
+                'FechaDevolucionReal': None, 'Estado': 'Prestado', 'Multa': 0.0}
+
+        if esperada >= hoy:
+            # Préstamo reciente: la mayoría sigue en manos del lector
+            if rnd.random() < 0.15:
+                fila['FechaDevolucionReal'] = min(fecha + timedelta(days=rnd.randint(1, DIAS_PRESTAMO)), ahora)
+                fila['Estado'] = 'Devuelto'
+        elif rnd.random() < probabilidad_vencido:
+            # Vencido y sin devolver: multa acumulada como la del proceso nocturno
+            fila['Multa'] = (hoy - esperada).days * MULTA_POR_DIA
+        else:
+            # Devuelto: casi siempre a tiempo, a veces con retraso y multa
+            retraso = rnd.randint(1, 30) if rnd.random() < 0.12 else -rnd.randint(0, DIAS_PRESTAMO - 1)
+            real = min(fecha + timedelta(days=DIAS_PRESTAMO + retraso), ahora)
+            fila['FechaDevolucionReal'] = real
+            fila['Estado'] = 'Devuelto'
+            fila['Multa'] = max((real.date() - esperada).days, 0) * MULTA_POR_DIA
+        filas.append(fila)
+    return filas
+
+
+GENERADORES = {
+    'Categorias': _generar_categorias,
+    'Autores': _generar_autores,
+    'Libros': _generar_libros,
+    'Usuarios': _generar_usuarios,
+    'Prestamos': _generar_prestamos,
+}
+
+
+def generar_bloque(tabla, inicio, fin, p):
+    """
+    Genera las filas [inicio, fin) de una tabla. La semilla depende solo de
+    la tabla y del bloque, así que el resultado es el mismo con cualquier
+    número de procesos.
+
+    Returns:
+        list: Filas (diccionarios) listas para insert() de Core
+    """
+    rnd = random.Random(f"{p['semilla']}-{tabla}-{inicio}")
+    return GENERADORES[tabla](rnd, inicio, fin, p)
+
+
+# ==================== ESCRITURA ====================
+
+def _tabla(nombre):
+    import models
+    return {
+        'Categorias': models.Categoria, 'Autores': models.Autor, 'Libros': models.Libro,
+        'Usuarios': models.Usuario, 'Prestamos': models.Prestamo,
+    }[nombre].__table__
+
+
+def insertar(conn, tabla, filas, identidad=True):
+    """
+    Inserta un bloque con INSERT masivo de Core. En SQL Server se usan
+    sentencias de varias filas (VALUES (...), (...)) respetando el límite
+    de 2100 parámetros y, si las filas traen el ID, se permite escribir las
+    columnas IDENTITY.
+
+    Args:
+        conn (Connection): Conexión dentro de una transacción
+        tabla (Table): Tabla destino
+        filas (list): Filas (diccionarios) con las mismas columnas
+        identidad (bool): Las filas incluyen la columna IDENTITY
+    """
+    if not filas:
+        return
+    if conn.dialect.name != 'mssql':
+        conn.execute(insert(tabla), filas)
+        return
+
+    por_sentencia = max(1, min(1000, 2000 // len(filas[0])))
+    if identidad:
+        conn.exec_driver_sql(f"SET IDENTITY_INSERT [dbo].[{tabla.name}] ON")
+    try:
+        for i in range(0, len(filas), por_sentencia):
+            conn.execute(insert(tabla).values(filas[i:i + por_sentencia]))
+    finally:
+        if identidad:
+            conn.exec_driver_sql(f"SET IDENTITY_INSERT [dbo].[{tabla.name}] OFF")
+
+
+def _iniciar_trabajador(url):
+    """Inicializador de los procesos que escriben directamente (SQL Server)"""
+    global _ENGINE_TRABAJADOR
+    if url is not None:
+        _ENGINE_TRABAJADOR = create_engine(url, poolclass=NullPool)
+
+
+def _tarea(argumentos):
+    """Genera un bloque; si el proceso tiene engine propio también lo escribe"""
+    tabla, inicio, fin, p = argumentos
+    filas = generar_bloque(tabla, inicio, fin, p)
+    if _ENGINE_TRABAJADOR is None:
+        return tabla, filas
+    with _ENGINE_TRABAJADOR.begin() as conn:
+        insertar(conn, _tabla(tabla), filas)
+    return tabla, len(filas)
+
+
+def _tareas(tabla, cantidad, tamano_lote, p):
+    for inicio in range(1, cantidad + 1, tamano_lote):
+        yield tabla, inicio, min(inicio + tamano_lote, cantidad + 1), p
+
+
+def _ajustar_copias(conn):
+    """
+    Los títulos populares acumulan más préstamos activos que copias; la
+    biblioteca habría comprado más ejemplares, así que CopiasTotal sube
+    hasta cubrirlos y CopiasDisponibles queda como total - activos.
+    """
+    from models import Libro, Prestamo
+    activos = select(func.count(Prestamo.PrestamoID)).where(
+        Prestamo.LibroID == Libro.LibroID, Prestamo.Estado == 'Prestado'
+    ).scalar_subquery()
+    conn.execute(update(Libro).where(activos > Libro.CopiasTotal).values(CopiasTotal=activos))
+    conn.execute(update(Libro).values(CopiasDisponibles=Libro.CopiasTotal - activos))
+
+
+def limpiar(engine):
+    """Elimina los datos de todas las tablas del sistema (en orden de dependencias)"""
+    from models import Autor, Categoria, Libro, Usuario, Prestamo, ResumenUsuario
+    with engine.begin() as conn:
+        for modelo in (ResumenUsuario, Prestamo, Libro, Usuario, Autor, Categoria):
+            conn.execute(delete(modelo))
+
+
+def generar(url=None, libros=100000, usuarios=10000, prestamos=500000, autores=None, categorias=20,
+            proporcion_vencidos=0.05, exponente_zipf=0.9, dias_historial=730, procesos=1,
+            tamano_lote=TAMANO_LOTE, semilla=42, indices=True, hoy=None, mostrar_progreso=False):
+    """
+    Genera el conjunto de datos completo en la base de `db` (o en `url`,
+    que pasa a ser la base de `db`). Las tablas deben estar vacías.
+
+    Args:
+        url (str): URL de SQLAlchemy destino (default: la configurada en `db`)
+        libros, usuarios, prestamos, autores, categorias (int): Filas por tabla
+            (autores: default libros / 20)
+        proporcion_vencidos (float): Fracción de los préstamos que quedan vencidos sin devolver
+        exponente_zipf (float): Sesgo de popularidad de los libros (0 = uniforme)
+        dias_historial (int): Días hacia atrás que abarcan los préstamos
+        procesos (int): Procesos generadores (en SQL Server también escriben en paralelo)
+        tamano_lote (int): Filas por bloque e INSERT
+        semilla (int): Semilla para reproducibilidad
+        indices (bool): Crear los índices de la migración 0002 antes de calcular el resumen
+        hoy (date): Fecha de referencia (default: hoy)
+        mostrar_progreso (bool): Imprimir el avance por tabla
+
+    Returns:
+        dict: Filas por tabla, total, segundos y filas por minuto
+    """
+    from database import db
+    from resumen_usuarios import reconciliar
+    from migraciones import m0002_indices_consultas
+
+    if url is not None:
+        db.configure(url)
+    db.create_tables()
+
+    engine = db.engine
+    hoy = hoy or date.today()
+    autores = autores if autores is not None else max(1, libros // 20)
+    categorias = max(1, categorias)
+    cantidades = {'Categorias': categorias, 'Autores': autores, 'Libros': libros,
+                  'Usuarios': usuarios, 'Prestamos': prestamos}
+
+    # Probabilidad de que un préstamo ya vencido siga sin devolverse, para
+    # que la proporción de vencidos sobre el total sea `proporcion_vencidos`
+    fechas = Estacional(hoy, dias_historial)
+    vencibles = fechas.fraccion_antes_de(hoy - timedelta(days=DIAS_PRESTAMO))
+    p = {
+        'libros': libros, 'usuarios': usuarios, 'autores': autores, 'categorias': categorias,
+        'exponente_zipf': exponente_zipf, 'dias_historial': dias_historial, 'hoy': hoy, 'semilla': semilla,
+        'probabilidad_vencido': min(1.0, proporcion_vencidos / vencibles) if vencibles else 0.0,
+    }
+
+    with engine.connect() as conn:
+        existentes = conn.execute(select(func.count()).select_from(_tabla('Libros'))).scalar()
+    if existentes:
+        raise ValueError(f"La tabla Libros ya tiene {existentes} filas; use limpiar() o --limpiar")
+
+    inicio = time.perf_counter()
+    escritas = dict.fromkeys(cantidades, 0)
+    sqlite = engine.dialect.name == 'sqlite'
+    # En SQLite escribe solo el proceso principal; en SQL Server cada proceso escribe sus bloques
+    escritura_paralela = procesos > 1 and not sqlite
+
+    def _registrar(tabla, cantidad):
+        escritas[tabla] += cantidad
+        if mostrar_progreso and (escritas[tabla] == cantidades[tabla] or escritas[tabla] % (tamano_lote * 20) == 0):
+            print(f"  {tabla}: {escritas[tabla]:,}/{cantidades[tabla]:,}")
+
+    def _escribir(tabla, filas):
+        with engine.begin() as conn:
+            if sqlite:
+                conn.exec_driver_sql("PRAGMA synchronous = OFF")
+            insertar(conn, _tabla(tabla), filas)
+        _registrar(tabla, len(filas))
+
+    # Cada tabla termina antes de empezar la siguiente (claves foráneas)
+    if procesos > 1:
+        url_trabajador = engine.url.render_as_string(hide_password=False) if escritura_paralela else None
+        with multiprocessing.Pool(procesos, _iniciar_trabajador, (url_trabajador,)) as pool:
+            for tabla, cantidad in cantidades.items():
+                for nombre, resultado in pool.imap(_tarea, _tareas(tabla, cantidad, tamano_lote, p)):
+                    if escritura_paralela:
+                        _registrar(nombre, resultado)
+                    else:
+                        _escribir(nombre, resultado)
+    else:
+        for tabla, cantidad in cantidades.items():
+            for _, desde, hasta, parametros in _tareas(tabla, cantidad, tamano_lote, p):
+                _escribir(tabla, generar_bloque(tabla, desde, hasta, parametros))
+
+    segundos_carga = time.perf_counter() - inicio
+
+    if indices:
+        with engine.begin() as conn:
+            m0002_indices_consultas.aplicar(conn)
+    with engine.begin() as conn:
+        _ajustar_copias(conn)
+    # Resumen de préstamos por usuario a partir de los préstamos generados
+    reconciliar()
+
+    total = sum(escritas.values())
+    segundos = time.perf_counter() - inicio
+    return {
+        'filas': escritas,
+        'total': total,
+        'segundos_carga': round(segundos_carga, 2),
+        'segundos': round(segundos, 2),
+        'filas_por_minuto': round(total / segundos_carga * 60) if segundos_carga else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos a gran escala')
+    parser.add_argument('--url', help='URL de SQLAlchemy destino (default: DATABASE_URL o config.py)')
+    parser.add_argument('--libros', type=int, default=100000)
+    parser.add_argument('--usuarios', type=int, default=10000)
+    parser.add_argument('--prestamos', type=int, default=500000)
+    parser.add_argument('--autores', type=int, default=None, help='Default: libros / 20')
+    parser.add_argument('--categorias', type=int, default=20)
+    parser.add_argument('--vencidos', type=float, default=0.05,
+                        help='Fracción de préstamos vencidos sin devolver (default 0.05)')
+    parser.add_argument('--zipf', type=float, default=0.9, help='Exponente de popularidad de los libros')
+    parser.add_argument('--dias', type=int, default=730, help='Días de historial de préstamos')
+    parser.add_argument('--procesos', type=int, default=1)
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por bloque')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--limpiar', action='store_true', help='Borrar los datos existentes antes de generar')
+    args = parser.parse_args()
+
+    if args.limpiar:
+        from database import db
+        if args.url:
+            db.configure(args.url)
+        db.create_tables()
+        limpiar(db.engine)
+
+    try:
+        resumen = generar(
+            url=args.url, libros=args.libros, usuarios=args.usuarios, prestamos=args.prestamos,
+            autores=args.autores, categorias=args.categorias, proporcion_vencidos=args.vencidos,
+            exponente_zipf=args.zipf, dias_historial=args.dias, procesos=args.procesos,
+            tamano_lote=args.lote, semilla=args.semilla, mostrar_progreso=True
+        )
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    print(f"\n{resumen['total']:,} filas en {resumen['segundos_carga']:.1f} s "
+          f"({resumen['filas_por_minuto']:,} filas/min); total con índices y resumen: {resumen['segundos']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
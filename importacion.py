@@ -0,0 +1,389 @@
+# importacion.py
+# Importación masiva del catálogo de libros desde CSV
+#
+# El archivo se lee en streaming y los libros se insertan en lotes con
+# INSERT masivo de Core. Autores y categorías se resuelven con mapas en
+# memoria (y se crean si no existen); los ISBN se comparan contra un
+# conjunto precargado, sin consultar la base por cada fila. Después de cada
+# lote se escriben sus rechazos y se guarda un punto de control para
+# reanudar la importación.
+
+import csv
+import json
+import os
+import time
+from datetime import date, datetime
+from sqlalchemy import insert, select
+from database import db
+from generador_datos import insertar
+from indice_busqueda import normalizar, normalizar_isbn
+from models import Autor, Categoria, Libro
+
+TAMANO_LOTE = 5000
+
+# Rechazos que se conservan en memoria para mostrarlos (el archivo los tiene todos)
+MUESTRA_RECHAZOS = 50
+
+# Nombres de columna aceptados (ya normalizados) -> campo
+ALIAS_COLUMNAS = {
+    'titulo': 'titulo', 'title': 'titulo',
+    'isbn': 'isbn',
+    'autor': 'autor', 'author': 'autor',
+    'autor_nombre': 'autor_nombre', 'nombre_autor': 'autor_nombre',
+    'autor_apellido': 'autor_apellido', 'apellido_autor': 'autor_apellido',
+    'nacionalidad': 'nacionalidad', 'nacionalidad_autor': 'nacionalidad',
+    'categoria': 'categoria', 'genero': 'categoria',
+    'editorial': 'editorial', 'publisher': 'editorial',
+    'fecha_publicacion': 'fecha_publicacion', 'anio': 'fecha_publicacion', 'ano': 'fecha_publicacion',
+    'numero_paginas': 'numero_paginas', 'paginas': 'numero_paginas',
+    'copias': 'copias', 'ejemplares': 'copias',
+    'descripcion': 'descripcion',
+}
+
+_LIBROS = Libro.__table__
+
+
+def _clave(texto):
+    """Clave de búsqueda: minúsculas, sin acentos y con espacios simples"""
+    return ' '.join(normalizar(texto).split())
+
+
+def _longitud(columna):
+    return columna.type.length
+
+
+def separar_autor(nombre_completo):
+    """
+    Separa un nombre de autor en (Nombre, Apellido). Acepta "Apellido,
+    Nombre"; si no hay coma la primera palabra es el nombre y el resto
+    los apellidos.
+
+    Args:
+        nombre_completo (str): Nombre tal como viene en el archivo
+
+    Returns:
+        tuple: (nombre, apellido)
+    """
+    if ',' in nombre_completo:
+        apellido, nombre = (parte.strip() for parte in nombre_completo.split(',', 1))
+        return nombre, apellido
+    partes = nombre_completo.split()
+    return partes[0], ' '.join(partes[1:])
+
+
+def _fecha(valor):
+    if len(valor) == 4 and valor.isdigit():
+        return date(int(valor), 1, 1)
+    return date.fromisoformat(valor)
+
+
+class ImportacionLibros:
+    """
+    Importa libros de un CSV con encabezado. Columnas reconocidas: titulo,
+    isbn, autor (o autor_nombre y autor_apellido), categoria y, opcionales,
+    nacionalidad, editorial, fecha_publicacion (AAAA-MM-DD o año),
+    numero_paginas, copias (1 por defecto) y descripcion.
+    """
+
+    def __init__(self, tamano_lote=TAMANO_LOTE, crear_referencias=True, archivo_control=None,
+                 archivo_rechazados=None, progreso=None):
+        """
+        Args:
+            tamano_lote (int): Filas insertadas por transacción
+            crear_referencias (bool): Crear autores y categorías inexistentes
+                (si es False la fila se rechaza)
+            archivo_control (str): Punto de control JSON para reanudar
+            archivo_rechazados (str): CSV con las filas rechazadas y el motivo
+            progreso (callable): Se llama con el resumen después de cada lote
+        """
+        self.tamano_lote = tamano_lote
+        self.crear_referencias = crear_referencias
+        self.archivo_control = archivo_control
+        self.archivo_rechazados = archivo_rechazados
+        self.progreso = progreso
+        self.autores = {}      # (nombre, apellido) normalizados -> AutorID
+        self.categorias = {}   # nombre normalizado -> CategoriaID
+        self.isbns = set()     # ISBN normalizados del catálogo y del archivo
+        self.resumen = None
+        self._rechazados = None
+        self._escritor = None
+        self._rechazos_lote = []   # [linea, motivo, *valores] pendientes de escribir
+
+    # ---------- Preparación ----------
+
+    def _cargar_referencias(self):
+        """Precarga autores, categorías e ISBN del catálogo"""
+        with db.engine.connect() as conn:
+            for autor_id, nombre, apellido in conn.execute(select(Autor.AutorID, Autor.Nombre, Autor.Apellido)):
+                self.autores.setdefault((_clave(nombre), _clave(apellido)), autor_id)
+            for categoria_id, nombre in conn.execute(select(Categoria.CategoriaID, Categoria.NombreCategoria)):
+                self.categorias[_clave(nombre)] = categoria_id
+            resultado = conn.execution_options(yield_per=50000).execute(select(Libro.ISBN))
+            self.isbns.update(normalizar_isbn(isbn) for (isbn,) in resultado)
+
+    def _leer_control(self, origen, tamano):
+        if not self.archivo_control or not os.path.exists(self.archivo_control):
+            return None
+        with open(self.archivo_control, encoding='utf-8') as archivo:
+            control = json.load(archivo)
+        # Un punto de control de otro archivo (o del mismo con otro contenido) no sirve
+        if control.get('origen') != origen or control.get('tamano') != tamano:
+            return None
+        return control
+
+    def _guardar_control(self):
+        if not self.archivo_control:
+            return
+        temporal = f"{self.archivo_control}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(self.resumen, archivo, ensure_ascii=False, default=str)
+        os.replace(temporal, self.archivo_control)
+
+    # ---------- Validación ----------
+
+    def _validar(self, fila):
+        """
+        Valida y convierte una fila del CSV
+
+        Returns:
+            tuple: (datos: dict, motivo: str) con datos None si se rechaza
+        """
+        titulo = fila.get('titulo', '').strip()
+        isbn = fila.get('isbn', '').strip()
+        categoria = fila.get('categoria', '').strip()
+        if fila.get('autor_nombre') or fila.get('autor_apellido'):
+            autor = (fila.get('autor_nombre', '').strip(), fila.get('autor_apellido', '').strip())
+        elif fila.get('autor', '').strip():
+            autor = separar_autor(fila['autor'].strip())
+        else:
+            autor = None
+
+        if not titulo:
+            return None, "Falta el título"
+        if len(titulo) > _longitud(_LIBROS.c.Titulo):
+            return None, "Título demasiado largo"
+        if not isbn:
+            return None, "Falta el ISBN"
+        isbn_normalizado = normalizar_isbn(isbn)
+        if len(isbn) > _longitud(_LIBROS.c.ISBN) or len(isbn_normalizado) not in (10, 13) \
+                or not isbn_normalizado[:-1].isdigit():
+            return None, f"ISBN inválido: {isbn}"
+        if isbn_normalizado in self.isbns:
+            return None, f"ISBN duplicado: {isbn}"
+        if not autor or not autor[0]:
+            return None, "Falta el autor"
+        if len(autor[0]) > _longitud(Autor.__table__.c.Nombre) or len(autor[1]) > _longitud(Autor.__table__.c.Apellido):
+            return None, "Nombre de autor demasiado largo"
+        if not categoria:
+            return None, "Falta la categoría"
+        if len(categoria) > _longitud(Categoria.__table__.c.NombreCategoria):
+            return None, "Nombre de categoría demasiado largo"
+
+        datos = {'titulo': titulo, 'isbn': isbn, 'isbn_normalizado': isbn_normalizado, 'autor': autor,
+                 'nacionalidad': fila.get('nacionalidad', '').strip() or None, 'categoria': categoria}
+        try:
+            datos['copias'] = int(fila['copias']) if fila.get('copias', '').strip() else 1
+            datos['numero_paginas'] = int(fila['numero_paginas']) if fila.get('numero_paginas', '').strip() else None
+            fecha = fila.get('fecha_publicacion', '').strip()
+            datos['fecha_publicacion'] = _fecha(fecha) if fecha else None
+        except ValueError as e:
+            return None, f"Valor inválido: {e}"
+        if datos['copias'] < 0 or (datos['numero_paginas'] is not None and datos['numero_paginas'] <= 0):
+            return None, "Copias o número de páginas fuera de rango"
+
+        for campo, columna in (('editorial', _LIBROS.c.Editorial), ('descripcion', _LIBROS.c.Descripcion)):
+            valor = fila.get(campo, '').strip() or None
+            if valor and len(valor) > _longitud(columna):
+                return None, f"Campo {campo} demasiado largo"
+            datos[campo] = valor
+
+        if not self.crear_referencias:
+            if (_clave(autor[0]), _clave(autor[1])) not in self.autores:
+                return None, f"El autor no existe: {' '.join(autor)}"
+            if _clave(categoria) not in self.categorias:
+                return None, f"La categoría no existe: {categoria}"
+        return datos, None
+
+    def _rechazar(self, linea, motivo, valores):
+        # Se escribe con su lote: si la importación se interrumpe antes del
+        # punto de control, al reanudar la fila se vuelve a leer y rechazar
+        self._rechazos_lote.append([linea, motivo] + valores)
+        if len(self.resumen['muestra_rechazos']) < MUESTRA_RECHAZOS:
+            self.resumen['muestra_rechazos'].append({'linea': linea, 'motivo': motivo})
+
+    def _escribir_rechazos(self, encabezado):
+        """Agrega al CSV de rechazados los del lote y los suma al resumen"""
+        self.resumen['rechazados'] += len(self._rechazos_lote)
+        if self.archivo_rechazados and self._rechazos_lote:
+            if self._escritor is None:
+                nuevo = not os.path.exists(self.archivo_rechazados) or os.path.getsize(self.archivo_rechazados) == 0
+                self._rechazados = open(self.archivo_rechazados, 'a', encoding='utf-8', newline='')
+                self._escritor = csv.writer(self._rechazados)
+                if nuevo:
+                    self._escritor.writerow(['linea', 'motivo'] + encabezado)
+            self._escritor.writerows(self._rechazos_lote)
+            self._rechazados.flush()
+        self._rechazos_lote = []
+
+    # ---------- Escritura ----------
+
+    def _crear_referencias(self, conn, lote):
+        """Inserta los autores y categorías del lote que aún no existen"""
+        autores_nuevos, categorias_nuevas = {}, {}
+        for datos in lote:
+            clave_autor = (_clave(datos['autor'][0]), _clave(datos['autor'][1]))
+            if clave_autor not in self.autores:
+                autores_nuevos.setdefault(clave_autor, {
+                    'Nombre': datos['autor'][0], 'Apellido': datos['autor'][1],
+                    'Nacionalidad': datos['nacionalidad'], 'FechaRegistro': datetime.now()
+                })
+            clave_categoria = _clave(datos['categoria'])
+            if clave_categoria not in self.categorias:
+                categorias_nuevas.setdefault(clave_categoria, {'NombreCategoria': datos['categoria']})
+
+        # RETURNING con los nombres: los IDs se asocian sin depender del orden de las filas
+        if autores_nuevos:
+            resultado = conn.execute(
+                insert(Autor.__table__).returning(Autor.AutorID, Autor.Nombre, Autor.Apellido),
+                list(autores_nuevos.values())
+            ).all()
+            for autor_id, nombre, apellido in resultado:
+                self.autores[(_clave(nombre), _clave(apellido))] = autor_id
+            self.resumen['autores_creados'] += len(resultado)
+        if categorias_nuevas:
+            resultado = conn.execute(
+                insert(Categoria.__table__).returning(Categoria.CategoriaID, Categoria.NombreCategoria),
+                list(categorias_nuevas.values())
+            ).all()
+            for categoria_id, nombre in resultado:
+                self.categorias[_clave(nombre)] = categoria_id
+            self.resumen['categorias_creadas'] += len(resultado)
+
+    def _insertar_lote(self, lote):
+        """Inserta un lote de libros validados en una sola transacción"""
+        ahora = datetime.now()
+        with db.engine.begin() as conn:
+            self._crear_referencias(conn, lote)
+            filas = [{
+                'Titulo': datos['titulo'], 'ISBN': datos['isbn'],
+                'AutorID': self.autores[(_clave(datos['autor'][0]), _clave(datos['autor'][1]))],
+                'CategoriaID': self.categorias[_clave(datos['categoria'])],
+                'FechaPublicacion': datos['fecha_publicacion'], 'Editorial': datos['editorial'],
+                'NumeroPaginas': datos['numero_paginas'], 'CopiasDisponibles': datos['copias'],
+                'CopiasTotal': datos['copias'], 'Descripcion': datos['descripcion'], 'FechaRegistro': ahora
+            } for datos in lote]
+            insertar(conn, _LIBROS, filas, identidad=False)
+        self.resumen['insertados'] += len(lote)
+
+    # ---------- Proceso ----------
+
+    def ejecutar(self, archivo, origen=None, tamano=None, reanudar=True):
+        """
+        Importa un CSV
+
+        Args:
+            archivo (str|file): Ruta del CSV o archivo de texto ya abierto
+            origen (str): Nombre del origen para el punto de control (por
+                defecto la ruta)
+            tamano (int): Tamaño en bytes del origen (por defecto el del archivo)
+            reanudar (bool): Continuar desde el punto de control si corresponde
+
+        Returns:
+            dict: Resumen con filas leídas, insertados, rechazados, autores y
+                categorías creados, lotes, segundos, filas por segundo, línea
+                desde la que se reanudó, muestra de rechazos y error (o None)
+        """
+        if isinstance(archivo, str):
+            origen = origen or os.path.abspath(archivo)
+            tamano = tamano if tamano is not None else os.path.getsize(archivo)
+            with open(archivo, encoding='utf-8-sig', newline='') as flujo:
+                return self.ejecutar(flujo, origen, tamano, reanudar)
+
+        inicio = time.perf_counter()
+        control = self._leer_control(origen, tamano) if reanudar else None
+        self.resumen = {
+            'origen': origen, 'tamano': tamano, 'filas': 0, 'linea': 1, 'insertados': 0, 'rechazados': 0,
+            'autores_creados': 0, 'categorias_creadas': 0, 'lotes': 0, 'reanudado_desde': None,
+            'muestra_rechazos': [], 'segundos': 0.0, 'filas_por_segundo': 0.0, 'error': None
+        }
+        if control is not None:
+            for clave in ('filas', 'linea', 'insertados', 'rechazados', 'autores_creados', 'categorias_creadas', 'lotes'):
+                self.resumen[clave] = control[clave]
+            self.resumen['reanudado_desde'] = control['linea']
+        elif self.archivo_rechazados and os.path.exists(self.archivo_rechazados):
+            # Importación nueva: los rechazos anteriores no aplican
+            os.remove(self.archivo_rechazados)
+
+        self._rechazos_lote = []
+        filas_previas = self.resumen['filas']
+        try:
+            self._cargar_referencias()
+            dialecto = csv.excel
+            if archivo.seekable():
+                # Excel en español suele exportar con punto y coma
+                muestra = archivo.read(4096)
+                archivo.seek(0)
+                try:
+                    dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t|')
+                except csv.Error:
+                    pass
+            lector = csv.reader(archivo, dialecto)
+            encabezado = next(lector, None)
+            if not encabezado:
+                raise ValueError("El archivo está vacío")
+            campos = [ALIAS_COLUMNAS.get(_clave(columna).replace(' ', '_')) for columna in encabezado]
+            faltantes = {'titulo', 'isbn', 'categoria'} - set(campos)
+            if faltantes or not ({'autor', 'autor_nombre'} & set(campos)):
+                raise ValueError(f"Faltan columnas obligatorias: {', '.join(sorted(faltantes)) or 'autor'}")
+
+            lote, leidas = [], 0
+            for valores in lector:
+                leidas += 1
+                if leidas <= filas_previas:
+                    continue  # ya procesadas antes del punto de control
+                if not any(valor.strip() for valor in valores):
+                    self.resumen['filas'] = leidas
+                    continue
+                fila = {campo: valor for campo, valor in zip(campos, valores) if campo}
+                datos, motivo = self._validar(fila)
+                if datos is None:
+                    self._rechazar(lector.line_num, motivo, valores)
+                else:
+                    self.isbns.add(datos['isbn_normalizado'])
+                    lote.append(datos)
+                self.resumen['filas'] = leidas
+                self.resumen['linea'] = lector.line_num
+
+                # Los rechazos pendientes también cierran el lote, para no acumularlos en memoria
+                if len(lote) + len(self._rechazos_lote) >= self.tamano_lote:
+                    self._terminar_lote(lote, encabezado, inicio, filas_previas)
+                    lote = []
+            self._terminar_lote(lote, encabezado, inicio, filas_previas)
+
+            # Importación completa: el punto de control ya no hace falta
+            if self.archivo_control and os.path.exists(self.archivo_control):
+                os.remove(self.archivo_control)
+        except Exception as e:
+            print(f"Error al importar libros: {e}")
+            self.resumen['error'] = str(e)
+        finally:
+            if self._rechazados is not None:
+                self._rechazados.close()
+                self._rechazados = self._escritor = None
+            self._actualizar_tiempos(inicio, filas_previas)
+        return self.resumen
+
+    def _terminar_lote(self, lote, encabezado, inicio, filas_previas):
+        if lote:
+            self._insertar_lote(lote)
+            self.resumen['lotes'] += 1
+        self._escribir_rechazos(encabezado)
+        self._actualizar_tiempos(inicio, filas_previas)
+        self._guardar_control()
+        if self.progreso is not None:
+            self.progreso(self.resumen)
+
+    def _actualizar_tiempos(self, inicio, filas_previas):
+        segundos = time.perf_counter() - inicio
+        self.resumen['segundos'] = round(segundos, 3)
+        self.resumen['filas_por_segundo'] = round((self.resumen['filas'] - filas_previas) / segundos, 1) if segundos else 0.0
@@ -0,0 +1,55 @@
+# importar_libros.py
+# Importa el catálogo de libros desde un archivo CSV
+#
+# Ejecutar: python importar_libros.py catalogo.csv [--lote 5000] [--sin-crear] [--desde-cero]
+# Si la importación se interrumpe, al ejecutarla de nuevo continúa desde el
+# último lote guardado (catalogo.csv.control.json). Las filas rechazadas se
+# escriben en catalogo.csv.rechazados.csv con la línea y el motivo.
+
+import argparse
+import sys
+from importacion import ImportacionLibros, TAMANO_LOTE
+from instrumentacion import perfilar
+
+
+def mostrar_progreso(resumen):
+    print(f"  línea {resumen['linea']}: {resumen['insertados']} insertado(s), "
+          f"{resumen['rechazados']} rechazado(s), {resumen['filas_por_segundo']:.0f} filas/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa libros desde un archivo CSV')
+    parser.add_argument('archivo', help='CSV con encabezado (titulo, isbn, autor, categoria, ...)')
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Libros insertados por transacción')
+    parser.add_argument('--sin-crear', action='store_true',
+                        help='Rechazar las filas con autores o categorías inexistentes en lugar de crearlos')
+    parser.add_argument('--desde-cero', action='store_true', help='Ignorar el punto de control anterior')
+    parser.add_argument('--rechazados', help='CSV de filas rechazadas (default: <archivo>.rechazados.csv)')
+    args = parser.parse_args()
+
+    importacion = ImportacionLibros(
+        tamano_lote=args.lote,
+        crear_referencias=not args.sin_crear,
+        archivo_control=f"{args.archivo}.control.json",
+        archivo_rechazados=args.rechazados or f"{args.archivo}.rechazados.csv",
+        progreso=mostrar_progreso
+    )
+    with perfilar('importar_libros') as perfil:
+        resumen = importacion.ejecutar(args.archivo, reanudar=not args.desde_cero)
+
+    if resumen['reanudado_desde']:
+        print(f"Reanudado desde la línea {resumen['reanudado_desde']}")
+    print(f"Importación de {args.archivo}: {resumen['insertados']} libro(s) insertado(s), "
+          f"{resumen['rechazados']} rechazado(s), {resumen['autores_creados']} autor(es) y "
+          f"{resumen['categorias_creadas']} categoría(s) nuevos, {resumen['lotes']} lote(s) "
+          f"en {resumen['segundos']:.2f} s ({resumen['filas_por_segundo']:.0f} filas/s, "
+          f"{perfil.consultas} consultas)")
+    if resumen['rechazados']:
+        print(f"Filas rechazadas: {importacion.archivo_rechazados}")
+    if resumen['error']:
+        print(f"[ERROR] {resumen['error']} (ejecute de nuevo para continuar desde el último lote)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
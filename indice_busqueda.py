@@ -0,0 +1,365 @@
+# indice_busqueda.py
+# Índice invertido en memoria con ranking BM25 para la búsqueda de libros
+
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from heapq import nlargest
+
+# Pesos por campo: una aparición en el título cuenta como 3 en la descripción
+PESO_TITULO = 3
+PESO_AUTOR = 2
+PESO_ISBN = 3
+PESO_DESCRIPCION = 1
+
+PALABRAS_VACIAS = frozenset({
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'se', 'su', 'un', 'una', 'y'
+})
+
+_PATRON_TOKEN = re.compile(r'[a-z0-9]+')
+_PATRON_NO_DIGITO = re.compile(r'[^0-9xX]')
+_PATRON_ISBN = re.compile(r'[0-9xX][0-9xX\- ]*')
+
+
+def normalizar(texto):
+    """
+    Normaliza un texto para indexación: minúsculas y sin acentos
+
+    Args:
+        texto (str): Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    if not texto:
+        return ''
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    # NFKD separa las tildes de la letra base; al codificar en ASCII se descartan
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+def tokenizar(texto):
+    """
+    Divide un texto en términos normalizados, descartando palabras vacías
+
+    Args:
+        texto (str): Texto a tokenizar
+
+    Returns:
+        list: Lista de términos
+    """
+    return [t for t in _PATRON_TOKEN.findall(normalizar(texto)) if t not in PALABRAS_VACIAS]
+
+
+def normalizar_isbn(isbn):
+    """Retorna el ISBN sin guiones ni espacios (solo dígitos y X)"""
+    return _PATRON_NO_DIGITO.sub('', isbn or '').lower()
+
+
+def _es_isbn(consulta):
+    """Indica si la consulta completa parece un ISBN-10 o ISBN-13"""
+    consulta = consulta.strip()
+    return bool(_PATRON_ISBN.fullmatch(consulta)) and len(normalizar_isbn(consulta)) in (10, 13)
+
+
+def es_fragmento_isbn(consulta):
+    """
+    Indica si la consulta es parte de un ISBN (solo dígitos, guiones y
+    espacios, sin llegar a un ISBN completo). El índice guarda el ISBN como
+    un solo término, así que estas consultas se resuelven con LIKE.
+    """
+    consulta = (consulta or '').strip()
+    return bool(_PATRON_ISBN.fullmatch(consulta)) and not _es_isbn(consulta)
+
+
+class IndiceInvertido:
+    """
+    Índice invertido de libros con ranking BM25 y consultas AND. El último
+    término de la consulta se toma como prefijo ("desti" encuentra
+    "destino" y "destinos"), como al ir escribiendo.
+
+    Cada término apunta a un array('I') con pares (documento interno,
+    frecuencia ponderada) en orden creciente de documento. Actualizar o
+    eliminar un libro marca su documento interno como muerto; cuando los
+    documentos muertos superan un umbral el índice se compacta.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._postings = {}
+        self._doc_libro = array('I')      # documento interno -> LibroID
+        self._doc_longitud = array('I')   # documento interno -> longitud ponderada
+        self._vivo = bytearray()          # documento interno -> 1 si está vigente
+        self._interno = {}                # LibroID -> documento interno vigente
+        self._longitud_total = 0
+        self._muertos = 0
+        self._terminos = None             # Términos ordenados para buscar prefijos (se crea al consultar)
+        self.construido = False
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _frecuencias(titulo, autor, isbn, descripcion):
+        """Calcula la frecuencia ponderada de cada término del libro"""
+        frecuencias = {}
+        for texto, peso in ((titulo, PESO_TITULO), (autor, PESO_AUTOR), (descripcion, PESO_DESCRIPCION)):
+            for termino in tokenizar(texto):
+                frecuencias[termino] = frecuencias.get(termino, 0) + peso
+        compacto = normalizar_isbn(isbn)
+        if compacto:
+            frecuencias[compacto] = frecuencias.get(compacto, 0) + PESO_ISBN
+        return frecuencias
+
+    def indexar(self, libro_id, titulo, autor, isbn, descripcion=None):
+        """
+        Agrega o reemplaza un libro en el índice
+
+        Args:
+            libro_id (int): ID del libro
+            titulo (str): Título
+            autor (str): Nombre completo del autor
+            isbn (str): ISBN
+            descripcion (str): Descripción del libro
+        """
+        frecuencias = self._frecuencias(titulo, autor, isbn, descripcion)
+        with self._lock:
+            self._eliminar_sin_lock(libro_id)
+            doc = len(self._doc_libro)
+            longitud = sum(frecuencias.values())
+            self._doc_libro.append(libro_id)
+            self._doc_longitud.append(longitud)
+            self._vivo.append(1)
+            self._interno[libro_id] = doc
+            self._longitud_total += longitud
+            for termino, frecuencia in frecuencias.items():
+                posting = self._postings.get(termino)
+                if posting is None:
+                    posting = self._postings[termino] = array('I')
+                    self._terminos = None
+                posting.append(doc)
+                posting.append(frecuencia)
+            self._compactar_si_necesario()
+
+    def eliminar(self, libro_id):
+        """
+        Elimina un libro del índice
+
+        Args:
+            libro_id (int): ID del libro
+        """
+        with self._lock:
+            self._eliminar_sin_lock(libro_id)
+            self._compactar_si_necesario()
+
+    def _eliminar_sin_lock(self, libro_id):
+        doc = self._interno.pop(libro_id, None)
+        if doc is not None:
+            self._vivo[doc] = 0
+            self._longitud_total -= self._doc_longitud[doc]
+            self._muertos += 1
+
+    def _compactar_si_necesario(self):
+        if self._muertos > 1000 and self._muertos > len(self._doc_libro) // 4:
+            self._compactar()
+
+    def _compactar(self):
+        """Renumera los documentos vigentes y descarta los postings muertos"""
+        nuevo_numero = array('I', bytes(4 * len(self._doc_libro)))
+        doc_libro = array('I')
+        doc_longitud = array('I')
+        for doc, vivo in enumerate(self._vivo):
+            if vivo:
+                nuevo_numero[doc] = len(doc_libro)
+                doc_libro.append(self._doc_libro[doc])
+                doc_longitud.append(self._doc_longitud[doc])
+
+        postings = {}
+        for termino, posting in self._postings.items():
+            nuevo = array('I')
+            for i in range(0, len(posting), 2):
+                doc = posting[i]
+                if self._vivo[doc]:
+                    nuevo.append(nuevo_numero[doc])
+                    nuevo.append(posting[i + 1])
+            if nuevo:
+                postings[termino] = nuevo
+
+        self._postings = postings
+        self._doc_libro = doc_libro
+        self._doc_longitud = doc_longitud
+        self._vivo = bytearray(b'\x01' * len(doc_libro))
+        self._interno = {libro_id: doc for doc, libro_id in enumerate(doc_libro)}
+        self._muertos = 0
+        self._terminos = None
+
+    def construir(self, filas):
+        """
+        Reconstruye el índice completo a partir de filas de libros
+
+        Args:
+            filas (iterable): Tuplas (libro_id, titulo, autor, isbn, descripcion)
+        """
+        with self._lock:
+            self._reiniciar()
+            for libro_id, titulo, autor, isbn, descripcion in filas:
+                self.indexar(libro_id, titulo, autor, isbn, descripcion)
+            self.construido = True
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _buscar_en_posting(posting, doc):
+        """Retorna la frecuencia de `doc` en el posting o 0 si no aparece"""
+        # Los documentos ocupan las posiciones pares del array
+        inicio, fin = 0, len(posting) // 2
+        while inicio < fin:
+            medio = (inicio + fin) // 2
+            if posting[2 * medio] < doc:
+                inicio = medio + 1
+            else:
+                fin = medio
+        if inicio < len(posting) // 2 and posting[2 * inicio] == doc:
+            return posting[2 * inicio + 1]
+        return 0
+
+    def _expandir_prefijo(self, prefijo):
+        """Retorna los postings de todos los términos que empiezan con `prefijo`"""
+        if self._terminos is None:
+            self._terminos = sorted(self._postings)
+        terminos = self._terminos
+        postings = []
+        i = bisect_left(terminos, prefijo)
+        while i < len(terminos) and terminos[i].startswith(prefijo):
+            postings.append(self._postings[terminos[i]])
+            i += 1
+        return postings
+
+    @staticmethod
+    def _unir(postings):
+        """Une varios postings en un dict {documento: frecuencia sumada}"""
+        mapa = {}
+        for posting in postings:
+            for doc, tf in zip(posting[0::2], posting[1::2]):
+                mapa[doc] = mapa.get(doc, 0) + tf
+        return mapa
+
+    def buscar(self, consulta, limite=100):
+        """
+        Busca libros que contengan TODOS los términos de la consulta,
+        ordenados por relevancia BM25. El último término coincide también
+        como prefijo; un ISBN completo se busca como un solo término.
+
+        Args:
+            consulta (str): Texto de búsqueda
+            limite (int): Número máximo de resultados (None para todos)
+
+        Returns:
+            list: Tuplas (libro_id, puntaje) en orden de relevancia
+        """
+        prefijo = not _es_isbn(consulta)
+        if prefijo:
+            terminos = list(dict.fromkeys(tokenizar(consulta)))
+        else:
+            terminos = [normalizar_isbn(consulta)]
+        if not terminos:
+            return []
+
+        with self._lock:
+            # Cada término es un posting (array) o, si se expandió como
+            # prefijo, un dict {documento: frecuencia}
+            postings = [self._postings.get(t) for t in terminos[:-1]]
+            if prefijo:
+                expandidos = self._expandir_prefijo(terminos[-1])
+                postings.append(expandidos[0] if len(expandidos) == 1 else self._unir(expandidos) or None)
+            else:
+                postings.append(self._postings.get(terminos[-1]))
+            if any(p is None for p in postings):
+                return []
+
+            vivos = len(self._interno)
+            if vivos == 0:
+                return []
+            longitud_media = self._longitud_total / vivos
+
+            def documentos(posting):
+                return len(posting) if isinstance(posting, dict) else len(posting) // 2
+
+            # La intersección parte del término más raro
+            postings.sort(key=documentos)
+            idf = [
+                math.log(1 + (vivos - documentos(p) + 0.5) / (documentos(p) + 0.5))
+                for p in postings
+            ]
+
+            base = postings[0]
+            candidatos = base if isinstance(base, dict) else dict(zip(base[0::2], base[1::2]))
+            frecuencias = [candidatos]
+            for posting in postings[1:]:
+                if isinstance(posting, dict):
+                    mapa = posting
+                elif len(posting) > 32 * 2 * len(candidatos):
+                    # Posting mucho más largo: búsqueda binaria por candidato
+                    mapa = {}
+                    for doc in candidatos:
+                        tf = self._buscar_en_posting(posting, doc)
+                        if tf:
+                            mapa[doc] = tf
+                else:
+                    mapa = dict(zip(posting[0::2], posting[1::2]))
+                candidatos = [doc for doc in candidatos if doc in mapa]
+                if not candidatos:
+                    return []
+                frecuencias.append(mapa)
+
+            k1, b = self.k1, self.b
+            vivo = self._vivo
+            doc_longitud = self._doc_longitud
+            doc_libro = self._doc_libro
+            terminos_idf = list(zip(frecuencias, idf))
+            resultados = []
+            for doc in candidatos:
+                if not vivo[doc]:
+                    continue
+                normalizacion = k1 * (1 - b + b * doc_longitud[doc] / longitud_media)
+                puntaje = 0.0
+                for mapa, peso_idf in terminos_idf:
+                    tf = mapa[doc]
+                    puntaje += peso_idf * tf * (k1 + 1) / (tf + normalizacion)
+                resultados.append((doc_libro[doc], puntaje))
+
+        if limite is None:
+            return sorted(resultados, key=lambda r: r[1], reverse=True)
+        return nlargest(limite, resultados, key=lambda r: r[1])
+
+    def estadisticas(self):
+        """
+        Retorna el tamaño actual del índice
+
+        Returns:
+            dict: Documentos vigentes, documentos muertos y términos
+        """
+        with self._lock:
+            return {
+                'documentos': len(self._interno),
+                'documentos_muertos': self._muertos,
+                'terminos': len(self._postings)
+            }
+
+
+# Instancia global del índice de libros
+indice_libros = IndiceInvertido()
@@ -0,0 +1,283 @@
+# instrumentacion.py
+# Conteo de consultas SQL por petición web o comando de consola
+#
+# Los eventos del engine registran cada sentencia en los perfiles activos del
+# contexto actual: número de consultas, tiempo total en la base de datos
+# (ejecución más lectura de las filas del cursor), filas leídas o afectadas
+# y sentencias repetidas. Una misma SELECT repetida muchas veces en una
+# petición suele ser un N+1 (una consulta por fila).
+
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from config import config
+
+logger = logging.getLogger('biblioteca.sql')
+
+# Perfiles activos en el contexto actual (se anidan: petición dentro de un test)
+_perfiles_activos = contextvars.ContextVar('perfiles_sql', default=())
+
+
+class PerfilConsultas:
+    """Consultas ejecutadas durante una petición o comando"""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.consultas = 0
+        self.segundos_bd = 0.0
+        self.filas = 0
+        self.sentencias = {}    # sentencia SQL -> veces ejecutada
+        self.inicio = time.perf_counter()
+        self.segundos = None
+
+    def registrar(self, sentencia, segundos, filas):
+        self.consultas += 1
+        self.segundos_bd += segundos
+        self.filas += filas
+        self.sentencias[sentencia] = self.sentencias.get(sentencia, 0) + 1
+
+    def sospechosos_n_mas_1(self, umbral=None):
+        """
+        Retorna las SELECT que se repitieron al menos `umbral` veces
+
+        Args:
+            umbral (int): Repeticiones mínimas (default: config.UMBRAL_N_MAS_1)
+
+        Returns:
+            list: Tuplas (veces, sentencia) de mayor a menor
+        """
+        umbral = config.UMBRAL_N_MAS_1 if umbral is None else umbral
+        return sorted(
+            ((veces, sentencia) for sentencia, veces in self.sentencias.items()
+             if veces >= umbral and sentencia.lstrip().upper().startswith('SELECT')),
+            reverse=True
+        )
+
+    def resumen(self):
+        """
+        Returns:
+            dict: Consultas, tiempo en BD (ms), filas, sentencias distintas y sospechas de N+1
+        """
+        return {
+            'nombre': self.nombre,
+            'consultas': self.consultas,
+            'tiempo_bd_ms': round(self.segundos_bd * 1000, 3),
+            'filas': self.filas,
+            'sentencias_distintas': len(self.sentencias),
+            'n_mas_1': [
+                {'veces': veces, 'sentencia': abreviar_sentencia(sentencia)}
+                for veces, sentencia in self.sospechosos_n_mas_1()
+            ]
+        }
+
+    def linea_log(self):
+        """Resumen en una línea para el log"""
+        texto = (f"{self.nombre}: {self.consultas} consulta(s), {self.segundos_bd * 1000:.1f} ms en BD, "
+                 f"{self.filas} fila(s)")
+        sospechosos = self.sospechosos_n_mas_1()
+        if sospechosos:
+            texto += "; posible N+1: " + "; ".join(
+                f"{veces}x {abreviar_sentencia(sentencia)}" for veces, sentencia in sospechosos
+            )
+        return texto
+
+
+def abreviar_sentencia(sentencia, largo=120):
+    """Sentencia SQL en una línea y recortada a `largo` caracteres"""
+    sentencia = ' '.join(sentencia.split())
+    return sentencia if len(sentencia) <= largo else sentencia[:largo - 3] + '...'
+
+
+def iniciar(nombre):
+    """
+    Activa un perfil nuevo en el contexto actual
+
+    Args:
+        nombre (str): Petición o comando perfilado (por ejemplo, 'GET /libros')
+
+    Returns:
+        tuple: (perfil, token) para pasar a terminar()
+    """
+    perfil = PerfilConsultas(nombre)
+    token = _perfiles_activos.set(_perfiles_activos.get() + (perfil,))
+    return perfil, token
+
+
+def terminar(perfil, token):
+    """
+    Desactiva el perfil y registra en el log su resumen; las sospechas de
+    N+1 se registran como advertencia
+
+    Args:
+        perfil (PerfilConsultas): Perfil retornado por iniciar()
+        token (Token): Token retornado por iniciar()
+    """
+    perfil.segundos = time.perf_counter() - perfil.inicio
+    try:
+        _perfiles_activos.reset(token)
+    except ValueError:
+        _perfiles_activos.set(tuple(p for p in _perfiles_activos.get() if p is not perfil))
+
+    if perfil.sospechosos_n_mas_1():
+        logger.warning(perfil.linea_log())
+    else:
+        logger.debug(perfil.linea_log())
+
+
+@contextmanager
+def perfilar(nombre):
+    """
+    Perfila las consultas de un bloque
+
+    Ejemplo:
+        with perfilar('reporte mensual') as perfil:
+            controller.obtener_todos()
+        print(perfil.consultas)
+    """
+    perfil, token = iniciar(nombre)
+    try:
+        yield perfil
+    finally:
+        terminar(perfil, token)
+
+
+class PresupuestoExcedido(AssertionError):
+    """Un bloque ejecutó más consultas de las permitidas"""
+
+
+@contextmanager
+def presupuesto_consultas(maximo, nombre='bloque'):
+    """
+    Falla si el bloque ejecuta más de `maximo` consultas. Pensado para
+    pruebas de rutas con el cliente de pruebas de Flask:
+
+        with presupuesto_consultas(3, '/categorias'):
+            cliente.get('/categorias')
+
+    Args:
+        maximo (int): Consultas permitidas
+        nombre (str): Descripción para el mensaje de error
+
+    Raises:
+        PresupuestoExcedido: Si se superó el presupuesto
+    """
+    with perfilar(nombre) as perfil:
+        yield perfil
+    if perfil.consultas > maximo:
+        raise PresupuestoExcedido(
+            f"{nombre}: {perfil.consultas} consultas (máximo {maximo})\n  " + perfil.linea_log()
+        )
+
+
+def verificar_ruta(cliente, url, maximo, metodo='get', **kwargs):
+    """
+    Hace una petición con el cliente de pruebas de Flask y verifica que la
+    ruta no supere su presupuesto de consultas. El cuerpo se lee dentro del
+    presupuesto, así que cuentan también las consultas de las respuestas
+    en streaming (exportaciones)
+
+    Args:
+        cliente (FlaskClient): app.test_client()
+        url (str): Ruta a solicitar
+        maximo (int): Consultas permitidas
+        metodo (str): Método HTTP del cliente ('get', 'post', ...)
+
+    Returns:
+        TestResponse: Respuesta de la petición
+    """
+    with presupuesto_consultas(maximo, f"{metodo.upper()} {url}"):
+        respuesta = getattr(cliente, metodo)(url, **kwargs)
+        respuesta.get_data()
+    return respuesta
+
+
+# ==================== EVENTOS DE SQLALCHEMY ====================
+
+def _antes_de_ejecutar(conn, cursor, sentencia, parametros, contexto, executemany):
+    if _perfiles_activos.get():
+        conn.info.setdefault('inicio_consultas', []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, sentencia, parametros, contexto, executemany):
+    perfiles = _perfiles_activos.get()
+    inicios = conn.info.get('inicio_consultas')
+    if not perfiles or not inicios:
+        return
+    segundos = time.perf_counter() - inicios.pop()
+    if cursor.description is not None:
+        # Las filas leídas se cuentan a medida que el resultado las trae del
+        # cursor (entidades, columnas sueltas, Core o joinedload por igual)
+        filas = 0
+        if contexto is not None:
+            contexto.cursor = _CursorContado(cursor, perfiles)
+    else:
+        # Filas afectadas por INSERT/UPDATE/DELETE
+        filas = max(cursor.rowcount, 0)
+    for perfil in perfiles:
+        perfil.registrar(sentencia, segundos, filas)
+
+
+def _error(contexto_excepcion):
+    conexion = contexto_excepcion.connection
+    if conexion is not None:
+        inicios = conexion.info.get('inicio_consultas')
+        if inicios:
+            inicios.pop()
+
+
+class _CursorContado:
+    """
+    Envuelve el cursor DBAPI de una SELECT y suma a los perfiles las filas
+    que el resultado trae con fetchone/fetchmany/fetchall y el tiempo que
+    tardan (con muchas filas, leerlas cuesta más que ejecutar la sentencia).
+    Los perfiles son los activos al ejecutar: las filas de un resultado que
+    se consume después (una exportación en streaming) se siguen atribuyendo
+    a su petición.
+    """
+
+    def __init__(self, cursor, perfiles):
+        self._cursor = cursor
+        self._perfiles = perfiles
+
+    def _contar(self, filas, inicio):
+        segundos = time.perf_counter() - inicio
+        for perfil in self._perfiles:
+            perfil.filas += filas
+            perfil.segundos_bd += segundos
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = self._cursor.fetchone()
+        self._contar(0 if fila is None else 1, inicio)
+        return fila
+
+    def fetchmany(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        filas = self._cursor.fetchmany(*args, **kwargs)
+        self._contar(len(filas), inicio)
+        return filas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = self._cursor.fetchall()
+        self._contar(len(filas), inicio)
+        return filas
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+def instrumentar(engine):
+    """
+    Registra los eventos de conteo en un engine (Database.configure lo hace
+    con cada engine nuevo)
+
+    Args:
+        engine (Engine): Engine de SQLAlchemy
+    """
+    if not event.contains(engine, 'before_cursor_execute', _antes_de_ejecutar):
+        event.listen(engine, 'before_cursor_execute', _antes_de_ejecutar)
+        event.listen(engine, 'after_cursor_execute', _despues_de_ejecutar)
+        event.listen(engine, 'handle_error', _error)
@@ -1,8 +1,10 @@
 # main.py
 # Aplicación principal del sistema de biblioteca usando patrón MVC
 
-from controllers import LibroController, UsuarioController, PrestamoController
+from controllers import LibroController, UsuarioController, PrestamoController, EstadisticaController, ReporteController
+from datetime import datetime, timedelta
 from views import ConsoleView
+from instrumentacion import perfilar
 
 class BibliotecaApp:
     """Aplicación principal del sistema de biblioteca"""
@@ -12,6 +14,8 @@ class BibliotecaApp:
         self.libro_controller = LibroController()
         self.usuario_controller = UsuarioController()
         self.prestamo_controller = PrestamoController()
+        self.estadistica_controller = EstadisticaController()
+        self.reporte_controller = ReporteController()
 
         # Inicializar vista
         self.view = ConsoleView()
@@ -25,14 +29,20 @@ class BibliotecaApp:
         while True:
             opcion = self.view.mostrar_menu_principal()
 
+            # Las consultas de cada menú se cuentan juntas; un posible N+1
+            # se advierte en el log 'biblioteca.sql' al salir del menú
             if opcion == '1':
-                self.menu_libros()
+                with perfilar('consola: libros'):
+                    self.menu_libros()
             elif opcion == '2':
-                self.menu_usuarios()
+                with perfilar('consola: usuarios'):
+                    self.menu_usuarios()
             elif opcion == '3':
-                self.menu_prestamos()
+                with perfilar('consola: préstamos'):
+                    self.menu_prestamos()
             elif opcion == '4':
-                self.menu_reportes()
+                with perfilar('consola: reportes'):
+                    self.menu_reportes()
             elif opcion == '5':
                 print("\n¡Hasta luego!")
                 break
@@ -333,28 +343,43 @@ class BibliotecaApp:
         print("REPORTES Y ESTADÍSTICAS")
         print("=" * 60)
 
-        # Obtener estadísticas usando los controllers
-        libros = self.libro_controller.obtener_todos()
-        usuarios = self.usuario_controller.obtener_todos()
-        prestamos = self.prestamo_controller.obtener_prestamos_activos()
-        prestamos_vencidos = self.prestamo_controller.obtener_prestamos_vencidos()
+        # Obtener estadísticas agregadas en una sola consulta
+        stats = self.estadistica_controller.obtener_resumen()
 
         print(f"\n[RESUMEN GENERAL]")
-        print(f"  Total de libros: {len(libros)}")
-        print(f"  Libros disponibles: {len(self.libro_controller.obtener_disponibles())}")
-        print(f"  Total de usuarios activos: {len(usuarios)}")
-        print(f"  Préstamos activos: {len(prestamos)}")
-        print(f"  Préstamos vencidos: {len(prestamos_vencidos)}")
-
-        # Libros con más préstamos (simplificado)
+        print(f"  Total de libros: {stats.get('total_libros', 0)}")
+        print(f"  Libros disponibles: {stats.get('libros_disponibles', 0)}")
+        print(f"  Total de usuarios activos: {stats.get('total_usuarios', 0)}")
+        print(f"  Préstamos activos: {stats.get('prestamos_activos', 0)}")
+        print(f"  Préstamos vencidos: {stats.get('prestamos_vencidos', 0)}")
+        print(f"  Multas pendientes: ${stats.get('multas_pendientes', 0):.2f}")
+
+        # Rankings agregados en la base de datos (GROUP BY + TOP-N)
         print(f"\n[LIBROS MÁS PRESTADOS]")
-        libros_con_prestamos = {}
-        for libro in libros:
-            if libro.prestamos:
-                libros_con_prestamos[libro.Titulo] = len(libro.prestamos)
-
-        for titulo, total in sorted(libros_con_prestamos.items(), key=lambda x: x[1], reverse=True)[:5]:
-            print(f"  {titulo}: {total} préstamo(s)")
+        for fila in self.reporte_controller.libros_mas_prestados(limite=5):
+            print(f"  {fila['titulo']}: {fila['prestamos']} préstamo(s)")
+
+        hasta = datetime.now().date()
+        desde = hasta - timedelta(days=29)
+        reporte = self.reporte_controller.obtener_reporte(desde, hasta, limite=5)
+        circulacion = reporte['circulacion']
+
+        print(f"\n[CIRCULACIÓN ÚLTIMOS 30 DÍAS] ({desde.strftime('%d/%m/%Y')} - {hasta.strftime('%d/%m/%Y')})")
+        print(f"  Préstamos: {circulacion.get('prestamos', 0)}  "
+              f"(devueltos: {circulacion.get('devueltos', 0)}, activos: {circulacion.get('activos', 0)}, "
+              f"vencidos: {circulacion.get('vencidos', 0)})")
+        print(f"  Usuarios distintos: {circulacion.get('usuarios', 0)}  "
+              f"Libros distintos: {circulacion.get('libros', 0)}")
+
+        print(f"\n  Usuarios más activos:")
+        for fila in reporte['usuarios']:
+            print(f"    {fila['nombre']} ({fila['carnet']}): {fila['prestamos']} préstamo(s)")
+        print(f"\n  Categorías más prestadas:")
+        for fila in reporte['categorias']:
+            print(f"    {fila['nombre']}: {fila['prestamos']} préstamo(s) de {fila['libros']} libro(s)")
+        print(f"\n  Autores más prestados:")
+        for fila in reporte['autores']:
+            print(f"    {fila['nombre']}: {fila['prestamos']} préstamo(s)")
 
         self.view.pausar()
 
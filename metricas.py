@@ -0,0 +1,316 @@
+# metricas.py
+# Registro de métricas de la aplicación en formato de texto de Prometheus
+#
+# Cada hilo escribe en su propio fragmento (contadores e histogramas en un
+# diccionario local), sin locks en el camino de la petición; al consultar
+# /metrics se suman los fragmentos de todos los hilos. Los fragmentos de los
+# hilos que ya terminaron se suman a un acumulado común y se descartan.
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from config import config
+from consultas_lentas import metodo_en_curso
+
+# Límites (segundos) de los histogramas de latencia
+LIMITES_LATENCIA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Fragmento:
+    """Valores escritos por un solo hilo"""
+
+    __slots__ = ('contadores', 'histogramas')
+
+    def __init__(self):
+        self.contadores = {}    # (nombre, etiquetas) -> valor
+        self.histogramas = {}   # (nombre, etiquetas) -> [conteos por intervalo..., suma]
+
+
+class RegistroMetricas:
+    """
+    Contadores, histogramas y medidores con etiquetas.
+
+    Los contadores e histogramas se escriben en el fragmento del hilo actual;
+    los medidores son funciones que se evalúan al exportar, por ejemplo el
+    estado del pool de conexiones (gauge) o los aciertos de la caché, que
+    lleva su propio contador (counter).
+    """
+
+    def __init__(self, limites=LIMITES_LATENCIA):
+        self.limites = tuple(limites)
+        self.activo = config.METRICAS
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._fragmentos = []      # [(hilo, fragmento)] de los hilos que han escrito
+        self._retirado = _Fragmento()   # Suma de los fragmentos de hilos terminados
+        self._descripciones = {}   # nombre -> (tipo, ayuda)
+        self._medidores = {}       # nombre -> (tipo, ayuda, función que retorna {etiquetas: valor})
+
+    def _fragmento(self):
+        fragmento = getattr(self._local, 'fragmento', None)
+        if fragmento is None:
+            fragmento = self._local.fragmento = _Fragmento()
+            # Solo la primera escritura de cada hilo toma el lock
+            with self._lock:
+                self._retirar_terminados()
+                self._fragmentos.append((threading.current_thread(), fragmento))
+        return fragmento
+
+    def _retirar_terminados(self):
+        """
+        Suma al acumulado común los fragmentos de los hilos que ya terminaron
+        y los quita de la lista (el servidor de desarrollo crea un hilo por
+        petición). Se llama con self._lock tomado.
+        """
+        vivos = []
+        for hilo, fragmento in self._fragmentos:
+            if hilo.is_alive():
+                vivos.append((hilo, fragmento))
+            else:
+                _sumar(self._retirado, fragmento)
+        self._fragmentos = vivos
+
+    def describir(self, nombre, tipo, ayuda):
+        """
+        Registra el tipo ('counter' o 'histogram') y la descripción de una métrica
+
+        Args:
+            nombre (str): Nombre de la métrica
+            tipo (str): Tipo de Prometheus
+            ayuda (str): Texto de # HELP
+        """
+        self._descripciones[nombre] = (tipo, ayuda)
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        """
+        Suma `valor` a un contador
+
+        Args:
+            nombre (str): Nombre del contador (terminado en _total)
+            valor (float): Cantidad a sumar
+            **etiquetas: Etiquetas de la serie
+        """
+        if not self.activo:
+            return
+        contadores = self._fragmento().contadores
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        contadores[clave] = contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        """
+        Registra una observación (por ejemplo, una latencia en segundos) en un histograma
+
+        Args:
+            nombre (str): Nombre del histograma
+            valor (float): Valor observado
+            **etiquetas: Etiquetas de la serie
+        """
+        if not self.activo:
+            return
+        histogramas = self._fragmento().histogramas
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        serie = histogramas.get(clave)
+        if serie is None:
+            serie = histogramas[clave] = [0] * (len(self.limites) + 2)
+        serie[bisect_left(self.limites, valor)] += 1
+        serie[-1] += valor
+
+    def medidor(self, nombre, ayuda, funcion, tipo='gauge'):
+        """
+        Registra un medidor que se calcula al exportar
+
+        Args:
+            nombre (str): Nombre del medidor (terminado en _total si es un contador)
+            ayuda (str): Texto de # HELP
+            funcion (callable): Retorna un número o un dict {tuple(etiquetas): valor}
+            tipo (str): 'gauge', o 'counter' si la función lee un valor que solo crece
+        """
+        self._medidores[nombre] = (tipo, ayuda, funcion)
+
+    def agregar(self):
+        """
+        Suma los fragmentos de todos los hilos
+
+        Returns:
+            tuple: (contadores, histogramas) como diccionarios por (nombre, etiquetas)
+        """
+        total = _Fragmento()
+        with self._lock:
+            self._retirar_terminados()
+            _sumar(total, self._retirado)
+            fragmentos = [fragmento for _, fragmento in self._fragmentos]
+
+        for fragmento in fragmentos:
+            _sumar(total, fragmento)
+        return total.contadores, total.histogramas
+
+    def reiniciar(self):
+        """Descarta todos los valores registrados (para benchmarks y pruebas)"""
+        with self._lock:
+            self._retirado = _Fragmento()
+            for _, fragmento in self._fragmentos:
+                fragmento.contadores.clear()
+                fragmento.histogramas.clear()
+
+    def exportar(self):
+        """
+        Retorna todas las métricas en el formato de texto de Prometheus
+
+        Returns:
+            str: Exposición de texto (version 0.0.4)
+        """
+        contadores, histogramas = self.agregar()
+        lineas = []
+
+        for nombre in sorted({clave[0] for clave in contadores}):
+            self._encabezado(lineas, nombre, 'counter')
+            for (n, etiquetas), valor in sorted(contadores.items()):
+                if n == nombre:
+                    lineas.append(f"{nombre}{_etiquetas(etiquetas)} {_numero(valor)}")
+
+        for nombre in sorted({clave[0] for clave in histogramas}):
+            self._encabezado(lineas, nombre, 'histogram')
+            for (n, etiquetas), serie in sorted(histogramas.items()):
+                if n != nombre:
+                    continue
+                acumulado = 0
+                for limite, conteo in zip(self.limites + (float('inf'),), serie):
+                    acumulado += conteo
+                    le = '+Inf' if limite == float('inf') else repr(limite)
+                    lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas + (('le', le),))} {acumulado}")
+                lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {_numero(serie[-1])}")
+                lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {acumulado}")
+
+        for nombre, (tipo, ayuda, funcion) in sorted(self._medidores.items()):
+            try:
+                valores = funcion()
+            except Exception as e:
+                print(f"Error al calcular el medidor {nombre}: {e}")
+                continue
+            if not isinstance(valores, dict):
+                valores = {(): valores}
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, valor in sorted(valores.items()):
+                lineas.append(f"{nombre}{_etiquetas(etiquetas)} {_numero(valor)}")
+
+        return '\n'.join(lineas) + '\n'
+
+    def _encabezado(self, lineas, nombre, tipo):
+        tipo, ayuda = self._descripciones.get(nombre, (tipo, nombre))
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+
+
+def _sumar(destino, fragmento):
+    """Suma los contadores e histogramas de `fragmento` en `destino`"""
+    # dict.copy() es atómico respecto al hilo que escribe
+    for clave, valor in fragmento.contadores.copy().items():
+        destino.contadores[clave] = destino.contadores.get(clave, 0) + valor
+    for clave, serie in fragmento.histogramas.copy().items():
+        total = destino.histogramas.get(clave)
+        if total is None:
+            destino.histogramas[clave] = list(serie)
+        else:
+            for i, valor in enumerate(serie):
+                total[i] += valor
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# Instancia global del registro
+metricas = RegistroMetricas()
+
+metricas.describir('biblioteca_http_peticion_segundos', 'histogram',
+                   'Duración de las peticiones HTTP por endpoint')
+metricas.describir('biblioteca_http_peticiones_total', 'counter',
+                   'Peticiones HTTP por endpoint, método y código de estado')
+metricas.describir('biblioteca_http_errores_total', 'counter',
+                   'Excepciones no controladas por endpoint')
+metricas.describir('biblioteca_controlador_segundos', 'histogram',
+                   'Duración de los métodos públicos de los controladores')
+metricas.describir('biblioteca_controlador_errores_total', 'counter',
+                   'Excepciones lanzadas por los métodos de los controladores')
+
+
+def medir_controlador(cls):
+    """
+    Decorador de clase: mide la duración de cada método público del
+    controlador en biblioteca_controlador_segundos{controlador, metodo} y lo
+    marca como origen de las consultas que ejecuta
+
+    Ejemplo:
+        @medir_controlador
+        class LibroController: ...
+    """
+    for nombre, metodo in list(vars(cls).items()):
+        if nombre.startswith('_') or not callable(metodo) or isinstance(metodo, (staticmethod, classmethod)):
+            continue
+        setattr(cls, nombre, _medir_metodo(metodo, cls.__name__, nombre))
+    return cls
+
+
+def _medir_metodo(metodo, controlador, nombre):
+    origen = f"{controlador}.{nombre}"
+
+    if inspect.isgeneratorfunction(metodo):
+        # Las exportaciones son generadores: la llamada solo crea el objeto y
+        # el trabajo (y sus errores) ocurre al iterar, así que se mide la
+        # iteración completa. El método en curso se marca en cada reanudación
+        # (no entre un yield y el siguiente, donde corre el código que consume)
+        @functools.wraps(metodo)
+        def envoltura_generador(*args, **kwargs):
+            generador = metodo(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                while True:
+                    token = metodo_en_curso.set(origen)
+                    try:
+                        valor = next(generador)
+                    except StopIteration:
+                        return
+                    finally:
+                        metodo_en_curso.reset(token)
+                    yield valor
+            except Exception:
+                metricas.incrementar('biblioteca_controlador_errores_total', controlador=controlador, metodo=nombre)
+                raise
+            finally:
+                metricas.observar('biblioteca_controlador_segundos', time.perf_counter() - inicio,
+                                  controlador=controlador, metodo=nombre)
+                token = metodo_en_curso.set(origen)
+                try:
+                    generador.close()
+                finally:
+                    metodo_en_curso.reset(token)
+        return envoltura_generador
+
+    @functools.wraps(metodo)
+    def envoltura(*args, **kwargs):
+        # El registro de consultas lentas anota qué método originó cada consulta
+        token = metodo_en_curso.set(origen)
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        except Exception:
+            metricas.incrementar('biblioteca_controlador_errores_total', controlador=controlador, metodo=nombre)
+            raise
+        finally:
+            metricas.observar('biblioteca_controlador_segundos', time.perf_counter() - inicio,
+                              controlador=controlador, metodo=nombre)
+            metodo_en_curso.reset(token)
+    return envoltura
@@ -0,0 +1,86 @@
+# migraciones/__init__.py
+# Ejecutor de migraciones versionadas para SQL Server y SQLite
+#
+# Cada migración es un módulo mNNNN_descripcion.py con VERSION, DESCRIPCION y
+# una función aplicar(conn) que recibe una conexión dentro de una transacción.
+# Las versiones aplicadas se registran en la tabla MigracionesAplicadas.
+#
+# Ejecutar: python -m migraciones [--estado]
+
+import importlib
+import pkgutil
+from datetime import datetime
+from sqlalchemy import Table, Column, String, DateTime, MetaData, select, insert
+from database import db
+
+_metadata = MetaData()
+
+MigracionesAplicadas = Table(
+    'MigracionesAplicadas', _metadata,
+    Column('Version', String(20), primary_key=True),
+    Column('Descripcion', String(200), nullable=False),
+    Column('FechaAplicacion', DateTime, nullable=False)
+)
+
+
+def listar_migraciones():
+    """
+    Retorna los módulos de migración del paquete ordenados por versión
+
+    Returns:
+        list: Módulos con VERSION, DESCRIPCION y aplicar(conn)
+    """
+    modulos = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith('m') and info.name[1:5].isdigit():
+            modulos.append(importlib.import_module(f"{__name__}.{info.name}"))
+    return sorted(modulos, key=lambda modulo: modulo.VERSION)
+
+
+def versiones_aplicadas(engine=None):
+    """
+    Retorna las versiones ya aplicadas en la base de datos
+
+    Returns:
+        dict: Versión -> fecha de aplicación
+    """
+    engine = engine or db.engine
+    MigracionesAplicadas.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return dict(conn.execute(
+            select(MigracionesAplicadas.c.Version, MigracionesAplicadas.c.FechaAplicacion)
+        ).all())
+
+
+def migrar(engine=None, hasta=None):
+    """
+    Aplica en orden las migraciones pendientes; cada una en su propia
+    transacción junto con su registro en MigracionesAplicadas
+
+    Args:
+        engine (Engine): Engine destino (default: el de `db`)
+        hasta (str): Última versión a aplicar (default: todas)
+
+    Returns:
+        list: Versiones aplicadas en esta ejecución
+    """
+    engine = engine or db.engine
+    aplicadas = versiones_aplicadas(engine)
+    nuevas = []
+
+    for migracion in listar_migraciones():
+        if hasta is not None and migracion.VERSION > hasta:
+            break
+        if migracion.VERSION in aplicadas:
+            continue
+
+        with engine.begin() as conn:
+            migracion.aplicar(conn)
+            conn.execute(insert(MigracionesAplicadas).values(
+                Version=migracion.VERSION,
+                Descripcion=migracion.DESCRIPCION,
+                FechaAplicacion=datetime.now()
+            ))
+        nuevas.append(migracion.VERSION)
+
+    return nuevas
@@ -0,0 +1,30 @@
+# migraciones/__main__.py
+# Ejecutar: python -m migraciones [--estado] [--hasta VERSION]
+
+import argparse
+from migraciones import listar_migraciones, versiones_aplicadas, migrar
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aplica las migraciones pendientes de la base de datos')
+    parser.add_argument('--estado', action='store_true', help='Solo mostrar qué migraciones están aplicadas')
+    parser.add_argument('--hasta', help='Última versión a aplicar')
+    args = parser.parse_args()
+
+    if args.estado:
+        aplicadas = versiones_aplicadas()
+        for migracion in listar_migraciones():
+            fecha = aplicadas.get(migracion.VERSION)
+            estado = f"aplicada {fecha:%Y-%m-%d %H:%M}" if fecha else "pendiente"
+            print(f"  {migracion.VERSION}  {migracion.DESCRIPCION:<55} {estado}")
+        return
+
+    nuevas = migrar(hasta=args.hasta)
+    if nuevas:
+        print(f"Migraciones aplicadas: {', '.join(nuevas)}")
+    else:
+        print("La base de datos está al día")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# migraciones/indices.py
+# Creación de índices compatible con SQL Server y SQLite
+
+
+def crear_indice(conn, nombre, tabla, columnas, incluir=()):
+    """
+    Crea un índice si no existe.
+
+    En SQL Server las columnas de `incluir` van en INCLUDE (solo en el
+    nivel hoja, cubren la consulta sin ensanchar la clave); SQLite no tiene
+    INCLUDE, así que se agregan al final de la clave para que el índice
+    también cubra la consulta.
+
+    Args:
+        conn (Connection): Conexión dentro de la transacción de la migración
+        nombre (str): Nombre del índice
+        tabla (str): Tabla
+        columnas (list): Columnas de la clave (pueden llevar ' DESC')
+        incluir (list): Columnas cubiertas adicionales
+    """
+    dialecto = conn.dialect.name
+
+    if dialecto == 'mssql':
+        clave = ', '.join(_columna_mssql(c) for c in columnas)
+        sql = f"CREATE NONCLUSTERED INDEX [{nombre}] ON [dbo].[{tabla}] ({clave})"
+        if incluir:
+            sql += f" INCLUDE ({', '.join(f'[{c}]' for c in incluir)})"
+        conn.exec_driver_sql(
+            f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{nombre}' "
+            f"AND object_id = OBJECT_ID('[dbo].[{tabla}]')) {sql}"
+        )
+    else:
+        clave = ', '.join(list(columnas) + list(incluir))
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({clave})")
+
+
+def eliminar_indice(conn, nombre, tabla):
+    """Elimina un índice si existe"""
+    if conn.dialect.name == 'mssql':
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS [{nombre}] ON [dbo].[{tabla}]")
+    else:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {nombre}")
+
+
+def _columna_mssql(columna):
+    partes = columna.split()
+    return ' '.join([f"[{partes[0]}]"] + partes[1:])
@@ -0,0 +1,17 @@
+# migraciones/m0001_resumen_usuarios.py
+# Tabla ResumenUsuarios para bases creadas antes de que existiera
+
+from sqlalchemy.orm import Session
+from models import ResumenUsuario
+import resumen_usuarios
+
+VERSION = '0001'
+DESCRIPCION = 'Tabla ResumenUsuarios con el resumen inicial de préstamos'
+
+
+def aplicar(conn):
+    ResumenUsuario.__table__.create(conn, checkfirst=True)
+    # Poblar en la misma transacción
+    session = Session(bind=conn)
+    resumen_usuarios.refrescar(session)
+    session.flush()
@@ -0,0 +1,28 @@
+# migraciones/m0002_indices_consultas.py
+# Índices para los predicados más frecuentes de los controladores
+
+from migraciones.indices import crear_indice
+
+VERSION = '0002'
+DESCRIPCION = 'Índices compuestos para préstamos vencidos, elegibilidad, historial y disponibles'
+
+INDICES = [
+    # Listas de vencidos y proceso nocturno de multas:
+    # WHERE Estado = 'Prestado' AND FechaDevolucionEsperada < hoy
+    ('IX_Prestamos_Estado_FechaDevolucion', 'Prestamos',
+     ['Estado', 'FechaDevolucionEsperada'], ['UsuarioID', 'LibroID', 'Multa']),
+    # Elegibilidad y resumen por usuario: WHERE UsuarioID = ? AND Estado = 'Prestado'
+    ('IX_Prestamos_UsuarioID_Estado', 'Prestamos',
+     ['UsuarioID', 'Estado'], ['FechaDevolucionEsperada', 'Multa']),
+    # Historial de un libro: WHERE LibroID = ? ORDER BY FechaPrestamo DESC
+    ('IX_Prestamos_LibroID_FechaPrestamo', 'Prestamos',
+     ['LibroID', 'FechaPrestamo DESC'], ['Estado']),
+    # Libros disponibles: WHERE CopiasDisponibles > 0
+    ('IX_Libros_CopiasDisponibles', 'Libros',
+     ['CopiasDisponibles'], ['Titulo', 'AutorID', 'CategoriaID']),
+]
+
+
+def aplicar(conn):
+    for nombre, tabla, columnas, incluir in INDICES:
+        crear_indice(conn, nombre, tabla, columnas, incluir)
@@ -0,0 +1,14 @@
+# migraciones/m0003_indice_fecha_prestamo.py
+# Índice por fecha de préstamo para reportes y exportaciones por período
+
+from migraciones.indices import crear_indice
+
+VERSION = '0003'
+DESCRIPCION = 'Índice de préstamos por FechaPrestamo (reportes de circulación e historial por período)'
+
+
+def aplicar(conn):
+    # WHERE FechaPrestamo >= ? AND FechaPrestamo < ? GROUP BY LibroID / UsuarioID:
+    # el rango lee solo los préstamos del período y el índice cubre la agregación
+    crear_indice(conn, 'IX_Prestamos_FechaPrestamo', 'Prestamos', ['FechaPrestamo'],
+                 ['LibroID', 'UsuarioID', 'Estado', 'FechaDevolucionEsperada', 'Multa'])
@@ -0,0 +1,15 @@
+# migraciones/m0004_indices_libros_autor_categoria.py
+# Índices de Libros por autor y por categoría
+
+from migraciones.indices import crear_indice
+
+VERSION = '0004'
+DESCRIPCION = 'Índices de Libros por AutorID y CategoriaID (conteo de libros en las listas de autores y categorías)'
+
+
+def aplicar(conn):
+    # biblioteca_setup.sql ya los crea con estos nombres; en las bases creadas
+    # desde los modelos faltaban, y el conteo correlacionado
+    # (SELECT COUNT(*) FROM Libros WHERE AutorID = ...) recorría la tabla por cada fila
+    crear_indice(conn, 'IX_Libros_AutorID', 'Libros', ['AutorID'])
+    crear_indice(conn, 'IX_Libros_CategoriaID', 'Libros', ['CategoriaID'])
@@ -1,7 +1,7 @@
 # models.py
 # Definición de modelos ORM para el Sistema de Biblioteca
 
-from sqlalchemy import Column, Integer, String, Date, DateTime, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Numeric, ForeignKey, inspect
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -136,6 +136,7 @@ class Usuario(Base):
 
     # Relación con Prestamos
     prestamos = relationship("Prestamo", back_populates="usuario")
+    resumen = relationship("ResumenUsuario", back_populates="usuario", uselist=False)
 
     def __repr__(self):
         return f"<Usuario(id={self.UsuarioID}, carnet='{self.NumeroCarnet}')>"
@@ -150,11 +151,28 @@ class Usuario(Base):
         """Retorna los préstamos activos del usuario"""
         return [p for p in self.prestamos if p.esta_activo]
 
+    def _resumen_cargado(self):
+        """Retorna el ResumenUsuario si ya está cargado (sin consultar la base)"""
+        if 'resumen' in inspect(self).unloaded:
+            return None
+        return self.resumen
+
     @property
     def numero_prestamos_activos(self):
-        """Retorna el número de préstamos activos"""
+        """Retorna el número de préstamos activos (del resumen si está cargado)"""
+        resumen = self._resumen_cargado()
+        if resumen is not None:
+            return resumen.PrestamosActivos
         return len(self.prestamos_activos)
 
+    @property
+    def tiene_prestamos_vencidos(self):
+        """Verifica si el usuario tiene algún préstamo vencido"""
+        resumen = self._resumen_cargado()
+        if resumen is not None:
+            return resumen.tiene_vencidos
+        return any(p.esta_vencido for p in self.prestamos)
+
     def to_dict(self):
         """Convierte el objeto a diccionario"""
         return {
@@ -230,6 +248,32 @@ class Prestamo(Base):
         }
 
 
+class ResumenUsuario(Base):
+    """Modelo para la tabla ResumenUsuarios (resumen de préstamos por usuario)"""
+    __tablename__ = 'ResumenUsuarios'
+
+    UsuarioID = Column(Integer, ForeignKey('Usuarios.UsuarioID'), primary_key=True)
+    PrestamosActivos = Column(Integer, nullable=False, default=0)
+    PrestamosVencidos = Column(Integer, nullable=False, default=0)
+    MultasPendientes = Column(Numeric(10, 2), nullable=False, default=0)
+    ProximoVencimiento = Column(Date)
+    UltimaActividad = Column(DateTime)
+
+    # Relación con Usuario
+    usuario = relationship("Usuario", back_populates="resumen")
+
+    def __repr__(self):
+        return f"<ResumenUsuario(usuario={self.UsuarioID}, activos={self.PrestamosActivos})>"
+
+    @property
+    def tiene_vencidos(self):
+        """
+        Verifica si hay préstamos vencidos. Usa el próximo vencimiento, que
+        sigue siendo correcto aunque el proceso nocturno aún no haya corrido
+        """
+        return self.ProximoVencimiento is not None and self.ProximoVencimiento < datetime.now().date()
+
+
 if __name__ == "__main__":
     """
     Script de prueba de los modelos
@@ -245,6 +289,7 @@ if __name__ == "__main__":
     print(f"  - {Libro.__name__}: {Libro.__doc__}")
     print(f"  - {Usuario.__name__}: {Usuario.__doc__}")
     print(f"  - {Prestamo.__name__}: {Prestamo.__doc__}")
+    print(f"  - {ResumenUsuario.__name__}: {ResumenUsuario.__doc__}")
 
     print("\n" + "=" * 80)
     print("Para usar estos modelos, importa desde database.py y models.py")
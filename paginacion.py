@@ -0,0 +1,165 @@
+# paginacion.py
+# Paginación por cursor (keyset) para las listas del Sistema de Biblioteca
+
+import base64
+import json
+from sqlalchemy import and_, or_
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+
+class Pagina:
+    """
+    Página de resultados con cursores opacos hacia la página siguiente
+    y la anterior. Se puede iterar y usar con len() como una lista.
+    """
+
+    def __init__(self, elementos, siguiente=None, anterior=None, limite=LIMITE_POR_DEFECTO):
+        self.elementos = elementos
+        self.siguiente = siguiente
+        self.anterior = anterior
+        self.limite = limite
+
+    def __iter__(self):
+        return iter(self.elementos)
+
+    def __len__(self):
+        return len(self.elementos)
+
+    def __bool__(self):
+        return bool(self.elementos)
+
+    def __repr__(self):
+        return f"<Pagina(elementos={len(self.elementos)}, siguiente={self.siguiente!r}, anterior={self.anterior!r})>"
+
+
+class ResultadosLimitados(list):
+    """
+    Lista de resultados (por ejemplo, de una búsqueda) que recuerda si se
+    recortó al límite pedido, para que la vista pueda avisarlo
+    """
+
+    def __init__(self, elementos=(), limite=None, recortada=False):
+        super().__init__(elementos)
+        self.limite = limite
+        self.recortada = recortada
+
+
+def normalizar_limite(limite):
+    """
+    Ajusta el límite solicitado al rango permitido
+
+    Args:
+        limite (int|str): Límite recibido (puede venir de la URL)
+
+    Returns:
+        int: Límite entre 1 y LIMITE_MAXIMO
+    """
+    try:
+        limite = int(limite)
+    except (TypeError, ValueError):
+        return LIMITE_POR_DEFECTO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def codificar_cursor(valores):
+    """
+    Codifica los valores de la clave de ordenamiento como cursor opaco
+
+    Args:
+        valores (list): Valores de las columnas de ordenamiento
+
+    Returns:
+        str: Cursor en base64 apto para URL
+    """
+    datos = json.dumps(list(valores), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, numero_columnas):
+    """
+    Decodifica un cursor generado por codificar_cursor
+
+    Args:
+        cursor (str): Cursor recibido
+        numero_columnas (int): Número de columnas esperadas
+
+    Returns:
+        list: Valores de la clave o None si el cursor es inválido
+    """
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != numero_columnas:
+        return None
+    return valores
+
+
+def _filtro_keyset(columnas, valores, hacia_adelante):
+    """
+    Construye la condición "clave > cursor" (o "<") expandida como
+    (a > x) OR (a = x AND b > y) ..., ya que SQL Server no soporta
+    comparaciones de tuplas.
+    """
+    condiciones = []
+    for i, columna in enumerate(columnas):
+        iguales = [columnas[j] == valores[j] for j in range(i)]
+        comparacion = columna > valores[i] if hacia_adelante else columna < valores[i]
+        condiciones.append(and_(*iguales, comparacion))
+    return or_(*condiciones)
+
+
+def paginar(query, columnas, after=None, before=None, limite=None):
+    """
+    Aplica paginación keyset a una consulta ORM.
+
+    El costo de cada página depende solo del límite, porque el filtro sobre la
+    clave de ordenamiento usa el índice en lugar de saltar filas con OFFSET.
+    La última columna debe ser única (normalmente la llave primaria).
+
+    Args:
+        query (Query): Consulta ORM sin ORDER BY
+        columnas (list): Columnas de ordenamiento (atributos del modelo)
+        after (str): Cursor: retornar elementos posteriores a este
+        before (str): Cursor: retornar elementos anteriores a este
+        limite (int): Máximo de elementos por página
+
+    Returns:
+        Pagina: Página de resultados
+    """
+    limite = normalizar_limite(limite)
+    valores_before = decodificar_cursor(before, len(columnas))
+    valores_after = None if valores_before else decodificar_cursor(after, len(columnas))
+    hacia_adelante = valores_before is None
+
+    if valores_after:
+        query = query.filter(_filtro_keyset(columnas, valores_after, True))
+    elif valores_before:
+        query = query.filter(_filtro_keyset(columnas, valores_before, False))
+
+    orden = columnas if hacia_adelante else [columna.desc() for columna in columnas]
+    elementos = query.order_by(*orden).limit(limite + 1).all()
+
+    hay_mas = len(elementos) > limite
+    elementos = elementos[:limite]
+    if not hacia_adelante:
+        elementos.reverse()
+
+    def _cursor(elemento):
+        return codificar_cursor([getattr(elemento, columna.key) for columna in columnas])
+
+    siguiente = anterior = None
+    if elementos:
+        if hacia_adelante:
+            siguiente = _cursor(elementos[-1]) if hay_mas else None
+            anterior = _cursor(elementos[0]) if valores_after else None
+        else:
+            siguiente = _cursor(elementos[-1])
+            anterior = _cursor(elementos[0]) if hay_mas else None
+
+    return Pagina(elementos, siguiente=siguiente, anterior=anterior, limite=limite)
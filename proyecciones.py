@@ -0,0 +1,252 @@
+# proyecciones.py
+# Modelos de lectura con __slots__ para las listas y la API (sin objetos del ORM)
+
+from sqlalchemy import select, func, case
+from models import Autor, Categoria, Libro, Usuario, Prestamo, ResumenUsuario
+
+# Las listas solo muestran unas pocas columnas. Hidratar el modelo completo
+# con sus relaciones cuesta un objeto del ORM (con su estado de identidad)
+# por fila y por relación. Aquí cada fila es un objeto con __slots__ y los
+# mismos nombres de atributo que usan las plantillas. Las referencias
+# repetidas (el autor de muchos libros, el usuario de varios préstamos) se
+# comparten entre filas. Las propiedades calculadas reutilizan las de models.py.
+
+
+class AutorRef:
+    """Autor referenciado desde un libro (libro.autor)"""
+    __slots__ = ('AutorID', 'Nombre', 'Apellido')
+
+    def __init__(self, AutorID, Nombre, Apellido):
+        self.AutorID = AutorID
+        self.Nombre = Nombre
+        self.Apellido = Apellido
+
+    nombre_completo = Autor.nombre_completo
+
+    def __repr__(self):
+        return f"<{type(self).__name__}(id={self.AutorID}, nombre='{self.Nombre} {self.Apellido}')>"
+
+
+class AutorLista(AutorRef):
+    """Fila de la lista de autores"""
+    __slots__ = ('Nacionalidad', 'FechaNacimiento', 'total_libros')
+
+    def __init__(self, AutorID, Nombre, Apellido, Nacionalidad, FechaNacimiento, total_libros):
+        super().__init__(AutorID, Nombre, Apellido)
+        self.Nacionalidad = Nacionalidad
+        self.FechaNacimiento = FechaNacimiento
+        self.total_libros = total_libros
+
+
+class CategoriaRef:
+    """Categoría referenciada desde un libro (libro.categoria)"""
+    __slots__ = ('CategoriaID', 'NombreCategoria')
+
+    def __init__(self, CategoriaID, NombreCategoria):
+        self.CategoriaID = CategoriaID
+        self.NombreCategoria = NombreCategoria
+
+    def __repr__(self):
+        return f"<{type(self).__name__}(id={self.CategoriaID}, nombre='{self.NombreCategoria}')>"
+
+
+class CategoriaLista(CategoriaRef):
+    """Fila de la lista de categorías"""
+    __slots__ = ('Descripcion', 'total_libros')
+
+    def __init__(self, CategoriaID, NombreCategoria, Descripcion, total_libros):
+        super().__init__(CategoriaID, NombreCategoria)
+        self.Descripcion = Descripcion
+        self.total_libros = total_libros
+
+
+class LibroRef:
+    """Libro referenciado desde un préstamo (prestamo.libro)"""
+    __slots__ = ('LibroID', 'Titulo')
+
+    def __init__(self, LibroID, Titulo):
+        self.LibroID = LibroID
+        self.Titulo = Titulo
+
+    def __repr__(self):
+        return f"<{type(self).__name__}(id={self.LibroID}, titulo='{self.Titulo}')>"
+
+
+class LibroLista(LibroRef):
+    """Fila de la lista de libros, con su autor y categoría"""
+    __slots__ = ('ISBN', 'CopiasDisponibles', 'CopiasTotal', 'autor', 'categoria')
+
+    def __init__(self, LibroID, Titulo, ISBN, CopiasDisponibles, CopiasTotal, autor, categoria):
+        super().__init__(LibroID, Titulo)
+        self.ISBN = ISBN
+        self.CopiasDisponibles = CopiasDisponibles
+        self.CopiasTotal = CopiasTotal
+        self.autor = autor
+        self.categoria = categoria
+
+    esta_disponible = Libro.esta_disponible
+
+
+class UsuarioRef:
+    """Usuario referenciado desde un préstamo (prestamo.usuario)"""
+    __slots__ = ('UsuarioID', 'NumeroCarnet', 'Nombre', 'Apellido')
+
+    def __init__(self, UsuarioID, NumeroCarnet, Nombre, Apellido):
+        self.UsuarioID = UsuarioID
+        self.NumeroCarnet = NumeroCarnet
+        self.Nombre = Nombre
+        self.Apellido = Apellido
+
+    nombre_completo = Usuario.nombre_completo
+
+    def __repr__(self):
+        return f"<{type(self).__name__}(id={self.UsuarioID}, carnet='{self.NumeroCarnet}')>"
+
+
+class UsuarioLista(UsuarioRef):
+    """Fila de la lista de usuarios, con los contadores de ResumenUsuarios"""
+    __slots__ = ('Email', 'Telefono', 'Estado', 'numero_prestamos_activos', 'ProximoVencimiento')
+
+    def __init__(self, UsuarioID, NumeroCarnet, Nombre, Apellido, Email, Telefono, Estado,
+                 numero_prestamos_activos, ProximoVencimiento):
+        super().__init__(UsuarioID, NumeroCarnet, Nombre, Apellido)
+        self.Email = Email
+        self.Telefono = Telefono
+        self.Estado = Estado
+        self.numero_prestamos_activos = numero_prestamos_activos
+        self.ProximoVencimiento = ProximoVencimiento
+
+    # Mismo criterio que ResumenUsuario.tiene_vencidos
+    tiene_prestamos_vencidos = ResumenUsuario.tiene_vencidos
+
+
+class PrestamoLista:
+    """Fila de las listas de préstamos, con su libro y su usuario"""
+    __slots__ = ('PrestamoID', 'LibroID', 'UsuarioID', 'FechaPrestamo', 'FechaDevolucionEsperada',
+                 'FechaDevolucionReal', 'Estado', 'Multa', 'libro', 'usuario')
+
+    def __init__(self, PrestamoID, LibroID, UsuarioID, FechaPrestamo, FechaDevolucionEsperada,
+                 FechaDevolucionReal, Estado, Multa, libro, usuario):
+        self.PrestamoID = PrestamoID
+        self.LibroID = LibroID
+        self.UsuarioID = UsuarioID
+        self.FechaPrestamo = FechaPrestamo
+        self.FechaDevolucionEsperada = FechaDevolucionEsperada
+        self.FechaDevolucionReal = FechaDevolucionReal
+        self.Estado = Estado
+        self.Multa = Multa
+        self.libro = libro
+        self.usuario = usuario
+
+    esta_activo = Prestamo.esta_activo
+    esta_vencido = Prestamo.esta_vencido
+    dias_restantes = Prestamo.dias_restantes
+
+    def __repr__(self):
+        return f"<PrestamoLista(id={self.PrestamoID}, estado='{self.Estado}')>"
+
+
+# ==================== CONSULTAS Y CONSTRUCCIÓN ====================
+# Cada consulta_* retorna un Query de columnas (admite filtros, order_by y
+# paginar) en el orden que espera su función construir_*.
+
+def consulta_libros(session):
+    """Query de las columnas de LibroLista con su autor y categoría"""
+    return session.query(
+        Libro.LibroID, Libro.Titulo, Libro.ISBN, Libro.CopiasDisponibles, Libro.CopiasTotal,
+        Autor.AutorID, Autor.Nombre, Autor.Apellido, Categoria.CategoriaID, Categoria.NombreCategoria
+    ).join(Autor, Libro.AutorID == Autor.AutorID).join(
+        Categoria, Libro.CategoriaID == Categoria.CategoriaID
+    )
+
+
+def construir_libros(filas):
+    """Convierte filas de consulta_libros en LibroLista compartiendo autores y categorías"""
+    autores = {}
+    categorias = {}
+    libros = []
+    for libro_id, titulo, isbn, disponibles, total, autor_id, nombre, apellido, categoria_id, categoria in filas:
+        ref_autor = autores.get(autor_id)
+        if ref_autor is None:
+            ref_autor = autores[autor_id] = AutorRef(autor_id, nombre, apellido)
+        ref_categoria = categorias.get(categoria_id)
+        if ref_categoria is None:
+            ref_categoria = categorias[categoria_id] = CategoriaRef(categoria_id, categoria)
+        libros.append(LibroLista(libro_id, titulo, isbn, disponibles, total, ref_autor, ref_categoria))
+    return libros
+
+
+def consulta_usuarios(session):
+    """
+    Query de usuarios con préstamos activos y próximo vencimiento del
+    resumen; si el usuario aún no tiene resumen se calculan con subconsultas
+    """
+    sin_resumen = ResumenUsuario.UsuarioID.is_(None)
+    activos = (Prestamo.UsuarioID == Usuario.UsuarioID, Prestamo.Estado == 'Prestado')
+    return session.query(
+        Usuario.UsuarioID, Usuario.NumeroCarnet, Usuario.Nombre, Usuario.Apellido,
+        Usuario.Email, Usuario.Telefono, Usuario.Estado,
+        case((sin_resumen, select(func.count(Prestamo.PrestamoID)).where(*activos).scalar_subquery()),
+             else_=ResumenUsuario.PrestamosActivos),
+        case((sin_resumen, select(func.min(Prestamo.FechaDevolucionEsperada)).where(*activos).scalar_subquery()),
+             else_=ResumenUsuario.ProximoVencimiento)
+    ).outerjoin(ResumenUsuario, ResumenUsuario.UsuarioID == Usuario.UsuarioID)
+
+
+def construir_usuarios(filas):
+    """Convierte filas de consulta_usuarios en UsuarioLista"""
+    return [UsuarioLista(*fila) for fila in filas]
+
+
+def consulta_categorias(session):
+    """Query de categorías con el número de libros de cada una"""
+    total_libros = select(func.count(Libro.LibroID)).where(
+        Libro.CategoriaID == Categoria.CategoriaID
+    ).scalar_subquery()
+    return session.query(Categoria.CategoriaID, Categoria.NombreCategoria, Categoria.Descripcion, total_libros)
+
+
+def construir_categorias(filas):
+    """Convierte filas de consulta_categorias en CategoriaLista"""
+    return [CategoriaLista(*fila) for fila in filas]
+
+
+def consulta_autores(session):
+    """Query de autores con el número de libros de cada uno"""
+    total_libros = select(func.count(Libro.LibroID)).where(Libro.AutorID == Autor.AutorID).scalar_subquery()
+    return session.query(Autor.AutorID, Autor.Nombre, Autor.Apellido, Autor.Nacionalidad,
+                         Autor.FechaNacimiento, total_libros)
+
+
+def construir_autores(filas):
+    """Convierte filas de consulta_autores en AutorLista"""
+    return [AutorLista(*fila) for fila in filas]
+
+
+def consulta_prestamos(session):
+    """Query de las columnas de PrestamoLista con el título del libro y los datos del usuario"""
+    return session.query(
+        Prestamo.PrestamoID, Prestamo.LibroID, Prestamo.UsuarioID, Prestamo.FechaPrestamo,
+        Prestamo.FechaDevolucionEsperada, Prestamo.FechaDevolucionReal, Prestamo.Estado, Prestamo.Multa,
+        Libro.Titulo, Usuario.NumeroCarnet, Usuario.Nombre, Usuario.Apellido
+    ).join(Libro, Prestamo.LibroID == Libro.LibroID).join(
+        Usuario, Prestamo.UsuarioID == Usuario.UsuarioID
+    )
+
+
+def construir_prestamos(filas):
+    """Convierte filas de consulta_prestamos en PrestamoLista compartiendo libros y usuarios"""
+    libros = {}
+    usuarios = {}
+    prestamos = []
+    for (prestamo_id, libro_id, usuario_id, fecha, esperada, real, estado, multa,
+         titulo, carnet, nombre, apellido) in filas:
+        libro = libros.get(libro_id)
+        if libro is None:
+            libro = libros[libro_id] = LibroRef(libro_id, titulo)
+        usuario = usuarios.get(usuario_id)
+        if usuario is None:
+            usuario = usuarios[usuario_id] = UsuarioRef(usuario_id, carnet, nombre, apellido)
+        prestamos.append(PrestamoLista(prestamo_id, libro_id, usuario_id, fecha, esperada, real, estado, multa,
+                                       libro, usuario))
+    return prestamos
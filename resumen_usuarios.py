@@ -0,0 +1,167 @@
+# resumen_usuarios.py
+# Mantenimiento de la tabla ResumenUsuarios (préstamos activos, vencidos,
+# multas pendientes y última actividad de cada usuario)
+#
+# Reconstruir el resumen completo: python resumen_usuarios.py
+
+import time
+from datetime import datetime
+from sqlalchemy import select, update, insert, func, case, and_, exists, literal
+from database import db
+from models import Usuario, Prestamo, ResumenUsuario
+
+
+def registrar_prestamos(session, usuario_id, cantidad, fecha_devolucion, ahora):
+    """
+    Suma préstamos nuevos al resumen del usuario (dentro de la transacción
+    del préstamo). Si el usuario aún no tiene resumen se calcula completo.
+
+    Args:
+        session (Session): Sesión de la transacción en curso (con los préstamos ya enviados)
+        usuario_id (int): ID del usuario
+        cantidad (int): Número de préstamos creados
+        fecha_devolucion (date): Fecha de devolución esperada de los préstamos
+        ahora (datetime): Momento de la operación
+    """
+    resultado = session.execute(
+        update(ResumenUsuario)
+        .where(ResumenUsuario.UsuarioID == usuario_id)
+        .values(
+            PrestamosActivos=ResumenUsuario.PrestamosActivos + cantidad,
+            ProximoVencimiento=case(
+                (and_(ResumenUsuario.ProximoVencimiento.isnot(None),
+                      ResumenUsuario.ProximoVencimiento < fecha_devolucion),
+                 ResumenUsuario.ProximoVencimiento),
+                else_=fecha_devolucion
+            ),
+            UltimaActividad=ahora
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount == 0:
+        refrescar(session, [usuario_id], ahora)
+
+
+def refrescar(session, usuarios=None, ahora=None, hoy=None):
+    """
+    Recalcula el resumen de un conjunto de usuarios a partir de sus
+    préstamos activos con dos sentencias: un INSERT de los resúmenes que
+    falten y un UPDATE con subconsultas correlacionadas.
+
+    Args:
+        session (Session): Sesión de la transacción en curso
+        usuarios (list|Select): IDs de usuario o subconsulta que los selecciona
+            (None para todos los usuarios)
+        ahora (datetime): Si se indica, se registra como última actividad
+        hoy (date): Fecha para decidir qué préstamos están vencidos (default: hoy)
+
+    Returns:
+        int: Número de resúmenes actualizados
+    """
+    hoy = hoy or datetime.now().date()
+
+    # Crear en cero los resúmenes que no existan
+    faltantes = select(Usuario.UsuarioID, literal(0), literal(0), literal(0)).where(
+        ~exists().where(ResumenUsuario.UsuarioID == Usuario.UsuarioID)
+    )
+    if usuarios is not None:
+        faltantes = faltantes.where(Usuario.UsuarioID.in_(usuarios))
+    session.execute(
+        insert(ResumenUsuario).from_select(
+            ['UsuarioID', 'PrestamosActivos', 'PrestamosVencidos', 'MultasPendientes'], faltantes
+        )
+    )
+
+    def _activos(columna):
+        return select(columna).where(
+            Prestamo.UsuarioID == ResumenUsuario.UsuarioID,
+            Prestamo.Estado == 'Prestado'
+        ).scalar_subquery()
+
+    valores = {
+        'PrestamosActivos': _activos(func.count(Prestamo.PrestamoID)),
+        'PrestamosVencidos': _activos(
+            func.count(case((Prestamo.FechaDevolucionEsperada < hoy, Prestamo.PrestamoID)))
+        ),
+        'MultasPendientes': func.coalesce(_activos(func.sum(Prestamo.Multa)), 0),
+        'ProximoVencimiento': _activos(func.min(Prestamo.FechaDevolucionEsperada)),
+    }
+    if ahora is not None:
+        valores['UltimaActividad'] = ahora
+
+    actualizar = update(ResumenUsuario).values(**valores).execution_options(synchronize_session=False)
+    if usuarios is not None:
+        actualizar = actualizar.where(ResumenUsuario.UsuarioID.in_(usuarios))
+    return session.execute(actualizar).rowcount
+
+
+def reconciliar(tamano_lote=5000):
+    """
+    Reconstruye el resumen de todos los usuarios a partir de Prestamos, por
+    lotes de UsuarioID confirmados por separado. La última actividad se toma
+    de la fecha más reciente de préstamo o devolución.
+
+    Args:
+        tamano_lote (int): Usuarios por lote
+
+    Returns:
+        dict: Usuarios procesados, lotes, segundos y error (None si terminó bien)
+    """
+    inicio = time.perf_counter()
+    procesados = lotes = 0
+    ultimo = 0
+    error = None
+
+    session = db.get_session()
+    try:
+        while True:
+            ids = session.scalars(
+                select(Usuario.UsuarioID).where(Usuario.UsuarioID > ultimo)
+                .order_by(Usuario.UsuarioID).limit(tamano_lote)
+            ).all()
+            if not ids:
+                break
+
+            refrescar(session, ids)
+            ultima_actividad = select(
+                func.max(func.coalesce(Prestamo.FechaDevolucionReal, Prestamo.FechaPrestamo))
+            ).where(Prestamo.UsuarioID == ResumenUsuario.UsuarioID).scalar_subquery()
+            session.execute(
+                update(ResumenUsuario)
+                .where(ResumenUsuario.UsuarioID.in_(ids))
+                .values(UltimaActividad=ultima_actividad)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+
+            procesados += len(ids)
+            lotes += 1
+            ultimo = ids[-1]
+    except Exception as e:
+        session.rollback()
+        print(f"Error al reconciliar el resumen de usuarios: {e}")
+        error = str(e)
+    finally:
+        session.close()
+
+    return {
+        'usuarios': procesados,
+        'lotes': lotes,
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'error': error
+    }
+
+
+if __name__ == "__main__":
+    """
+    Reconstruye la tabla ResumenUsuarios
+    Ejecutar: python resumen_usuarios.py
+    """
+    import sys
+
+    resumen = reconciliar()
+    print(f"Resumen reconstruido: {resumen['usuarios']} usuario(s) en {resumen['lotes']} lote(s), "
+          f"{resumen['segundos']:.2f} s")
+    if resumen['error']:
+        print(f"[ERROR] {resumen['error']}")
+        sys.exit(1)
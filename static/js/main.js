@@ -21,36 +21,86 @@ document.addEventListener('DOMContentLoaded', function() {
             bsAlert.close();
         }, 5000);
     });
+
+    // Autocompletado en los campos marcados con data-autocompletar
+    document.querySelectorAll('input[data-autocompletar]').forEach(input => {
+        autocompletar(input, input.dataset.autocompletar);
+    });
 });
 
-// Función para búsqueda en tiempo real (opcional)
-function buscarEnTiempoReal(inputId, tableId) {
-    const input = document.getElementById(inputId);
-    const table = document.getElementById(tableId);
-
-    if (input && table) {
-        input.addEventListener('keyup', function() {
-            const filter = input.value.toUpperCase();
-            const rows = table.getElementsByTagName('tr');
-
-            for (let i = 1; i < rows.length; i++) {
-                const row = rows[i];
-                const cells = row.getElementsByTagName('td');
-                let found = false;
-
-                for (let j = 0; j < cells.length; j++) {
-                    const cell = cells[j];
-                    if (cell) {
-                        const textValue = cell.textContent || cell.innerText;
-                        if (textValue.toUpperCase().indexOf(filter) > -1) {
-                            found = true;
-                            break;
-                        }
-                    }
-                }
+// Autocompletado con espera (debounce) contra /api/autocompletar
+function autocompletar(input, urlApi, esperaMs = 200) {
+    if (!input || !urlApi) {
+        return;
+    }
+
+    const lista = document.createElement('div');
+    lista.className = 'list-group position-absolute autocompletado-lista d-none';
+    input.parentNode.appendChild(lista);
 
-                row.style.display = found ? '' : 'none';
+    const secciones = [['libros', 'Libros'], ['autores', 'Autores'], ['categorias', 'Categorías']];
+    let temporizador = null;
+    let peticion = null;
+
+    function ocultar() {
+        lista.classList.add('d-none');
+        lista.innerHTML = '';
+    }
+
+    function mostrar(datos) {
+        lista.innerHTML = '';
+        secciones.forEach(([clave, titulo]) => {
+            const elementos = datos[clave] || [];
+            if (elementos.length === 0) {
+                return;
             }
+            const encabezado = document.createElement('div');
+            encabezado.className = 'list-group-item small text-muted fw-bold';
+            encabezado.textContent = titulo;
+            lista.appendChild(encabezado);
+
+            elementos.forEach(elemento => {
+                const enlace = document.createElement('a');
+                enlace.className = 'list-group-item list-group-item-action';
+                enlace.href = elemento.url;
+                enlace.textContent = elemento.texto;
+                lista.appendChild(enlace);
+            });
         });
+        lista.classList.toggle('d-none', lista.children.length === 0);
     }
+
+    input.addEventListener('input', function() {
+        clearTimeout(temporizador);
+        const prefijo = input.value.trim();
+        if (prefijo.length === 0) {
+            ocultar();
+            return;
+        }
+
+        temporizador = setTimeout(() => {
+            // Cancelar la petición anterior para no mostrar resultados viejos
+            if (peticion) {
+                peticion.abort();
+            }
+            peticion = new AbortController();
+            fetch(`${urlApi}?q=${encodeURIComponent(prefijo)}`, { signal: peticion.signal })
+                .then(respuesta => respuesta.json())
+                .then(mostrar)
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        ocultar();
+                    }
+                });
+        }, esperaMs);
+    });
+
+    input.addEventListener('keydown', function(e) {
+        if (e.key === 'Escape') {
+            ocultar();
+        }
+    });
+
+    // Esperar un momento para que el clic en una sugerencia alcance a navegar
+    input.addEventListener('blur', () => setTimeout(ocultar, 150));
 }
@@ -0,0 +1,57 @@
+# test_importacion.py
+# Importación de libros interrumpida a mitad de un lote y reanudada: el CSV
+# de rechazados no repite filas y coincide con el contador del resumen.
+#
+# Ejecutar: python -m pytest -q test_importacion.py
+
+import csv
+import os
+import pytest
+from benchmarks.bench_importacion import escribir_csv
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from database import db
+from importacion import ImportacionLibros
+
+
+class ImportacionQueFalla(ImportacionLibros):
+    """Falla al insertar el lote número `fallar_en` (los anteriores quedan confirmados)"""
+
+    def __init__(self, fallar_en, **opciones):
+        super().__init__(**opciones)
+        self.fallar_en = fallar_en
+        self.intentos = 0
+
+    def _insertar_lote(self, lote):
+        self.intentos += 1
+        if self.intentos == self.fallar_en:
+            raise RuntimeError("caída simulada durante el INSERT")
+        super()._insertar_lote(lote)
+
+
+@pytest.fixture
+def base():
+    # Los ISBN "duplicados" de escribir_csv apuntan a los primeros 1000 libros
+    ruta = crear_base_sqlite(libros=1000, usuarios=10, prestamos=0, autores=50)
+    try:
+        yield ruta
+    finally:
+        db.engine.dispose()
+        os.remove(ruta)
+
+
+def test_reanudar_no_duplica_rechazos(base, tmp_path):
+    ruta_csv = str(tmp_path / 'catalogo.csv')
+    filas = 5000
+    validas = escribir_csv(ruta_csv, filas, proporcion_invalidas=0.05, proporcion_duplicadas=0.05)
+    opciones = {'tamano_lote': 500, 'archivo_control': f'{ruta_csv}.control.json',
+                'archivo_rechazados': f'{ruta_csv}.rechazados.csv'}
+
+    primera = ImportacionQueFalla(fallar_en=3, **opciones).ejecutar(ruta_csv)
+    assert primera['error'] and primera['lotes'] == 2
+    segunda = ImportacionLibros(**opciones).ejecutar(ruta_csv)
+    assert segunda['error'] is None and segunda['reanudado_desde']
+
+    with open(opciones['archivo_rechazados'], encoding='utf-8', newline='') as archivo:
+        lineas = [fila[0] for fila in csv.reader(archivo)][1:]
+    assert len(lineas) == len(set(lineas)) == segunda['rechazados'] == filas - validas
+    assert segunda['insertados'] == validas
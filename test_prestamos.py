@@ -0,0 +1,213 @@
+# test_prestamos.py
+# Préstamos y devoluciones sobre la base SQLite sintética: la última copia
+# no se presta dos veces, CopiasDisponibles se mantiene entre 0 y
+# CopiasTotal (igual a CopiasTotal menos los préstamos activos) y
+# ResumenUsuarios coincide con los préstamos después de cada operación.
+#
+# Ejecutar: python -m pytest -q test_prestamos.py
+
+import itertools
+import os
+import threading
+import pytest
+from sqlalchemy import event, select, func
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from controllers import PrestamoController
+from database import db
+from models import Libro, Usuario, Prestamo, ResumenUsuario, Autor, Categoria
+import resumen_usuarios
+
+_secuencia = itertools.count(1)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def base():
+    ruta = crear_base_sqlite(libros=300, usuarios=100, prestamos=1000, autores=30)
+    try:
+        yield ruta
+    finally:
+        db.engine.dispose()
+        os.remove(ruta)
+
+
+@pytest.fixture
+def controller():
+    return PrestamoController()
+
+
+def crear_libros(copias):
+    """Crea un libro por cada valor de `copias` y retorna sus IDs"""
+    session = db.get_session()
+    try:
+        autor_id = session.scalar(select(Autor.AutorID).limit(1))
+        categoria_id = session.scalar(select(Categoria.CategoriaID).limit(1))
+        libros = []
+        for cantidad in copias:
+            numero = next(_secuencia)
+            libros.append(Libro(Titulo=f"Prueba {numero}", ISBN=f"PRUEBA-{numero}", AutorID=autor_id,
+                                CategoriaID=categoria_id, CopiasDisponibles=cantidad, CopiasTotal=cantidad))
+        session.add_all(libros)
+        session.commit()
+        return [libro.LibroID for libro in libros]
+    finally:
+        session.close()
+
+
+def crear_usuarios(cantidad):
+    """Crea usuarios activos sin préstamos y retorna sus IDs"""
+    session = db.get_session()
+    try:
+        usuarios = []
+        for _ in range(cantidad):
+            numero = next(_secuencia)
+            usuarios.append(Usuario(NumeroCarnet=f"P-{numero}", Nombre='Prueba', Apellido=str(numero),
+                                    Email=f"prueba{numero}@example.com", Estado='Activo'))
+        session.add_all(usuarios)
+        session.commit()
+        return [usuario.UsuarioID for usuario in usuarios]
+    finally:
+        session.close()
+
+
+def copias(libro_id):
+    session = db.get_session()
+    try:
+        return session.scalar(select(Libro.CopiasDisponibles).where(Libro.LibroID == libro_id))
+    finally:
+        session.close()
+
+
+def verificar_consistencia():
+    """Copias dentro de rango y de acuerdo con los préstamos activos; resumen al día"""
+    session = db.get_session()
+    try:
+        activos = select(func.count(Prestamo.PrestamoID)).where(
+            Prestamo.LibroID == Libro.LibroID, Prestamo.Estado == 'Prestado'
+        ).scalar_subquery()
+        fuera_de_rango = session.execute(
+            select(Libro.LibroID, Libro.CopiasDisponibles, Libro.CopiasTotal, activos).where(
+                (Libro.CopiasDisponibles < 0) | (Libro.CopiasDisponibles > Libro.CopiasTotal)
+                | (Libro.CopiasDisponibles != Libro.CopiasTotal - activos)
+            )
+        ).all()
+        assert fuera_de_rango == []
+
+        columnas = (ResumenUsuario.UsuarioID, ResumenUsuario.PrestamosActivos, ResumenUsuario.PrestamosVencidos,
+                    ResumenUsuario.MultasPendientes, ResumenUsuario.ProximoVencimiento)
+        guardado = {fila[0]: tuple(fila[1:]) for fila in session.execute(select(*columnas))}
+        # Recalcular todos los resúmenes desde Prestamos y comparar (sin confirmar);
+        # un usuario que nunca pidió un libro puede no tener resumen todavía
+        resumen_usuarios.refrescar(session)
+        recalculado = {fila[0]: tuple(fila[1:]) for fila in session.execute(select(*columnas))}
+        session.rollback()
+        diferencias = {usuario_id: (guardado.get(usuario_id), valores) for usuario_id, valores in recalculado.items()
+                       if guardado.get(usuario_id, (0, 0, 0, None)) != valores}
+        assert diferencias == {}
+    finally:
+        session.close()
+
+
+def test_ultima_copia_no_se_presta_dos_veces(controller):
+    libro_id, = crear_libros([1])
+    primero, segundo = crear_usuarios(2)
+
+    exito, _, prestamo_id = controller.crear_prestamo(libro_id, primero)
+    assert exito and prestamo_id
+    exito, mensaje, prestamo_id = controller.crear_prestamo(libro_id, segundo)
+    assert not exito and prestamo_id is None
+    assert 'No hay copias disponibles' in mensaje
+    assert copias(libro_id) == 0
+    verificar_consistencia()
+
+
+def test_prestamos_simultaneos_no_sobrepasan_las_copias(controller):
+    libro_id, = crear_libros([3])
+    usuarios = crear_usuarios(8)
+    resultados = []
+    barrera = threading.Barrier(len(usuarios))
+
+    def prestar(usuario_id):
+        barrera.wait()
+        resultados.append(controller.crear_prestamo(libro_id, usuario_id)[0])
+
+    hilos = [threading.Thread(target=prestar, args=(usuario_id,)) for usuario_id in usuarios]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert resultados.count(True) == 3
+    assert copias(libro_id) == 0
+    verificar_consistencia()
+
+
+def test_devolver_repone_una_sola_vez(controller):
+    libro_id, = crear_libros([1])
+    usuario_id, = crear_usuarios(1)
+    _, _, prestamo_id = controller.crear_prestamo(libro_id, usuario_id)
+
+    exito, _, _ = controller.devolver_libro(prestamo_id)
+    assert exito
+    exito, mensaje, _ = controller.devolver_libro(prestamo_id)
+    assert not exito and 'ya fue devuelto' in mensaje
+    assert copias(libro_id) == 1
+    verificar_consistencia()
+
+
+def test_lote_con_disponibilidad_parcial(controller):
+    con_una, sin_copias, con_dos = crear_libros([1, 0, 2])
+    usuario_id, otro = crear_usuarios(2)
+    inexistente = 10 ** 9
+
+    exito, _, resultados = controller.crear_prestamos_lote(
+        usuario_id, [con_una, sin_copias, con_dos, con_una, inexistente])
+    assert exito
+    por_libro = {r['libro_id']: r for r in resultados}
+    assert len(resultados) == 4   # el ID repetido se procesa una vez
+    assert por_libro[con_una]['exito'] and por_libro[con_dos]['exito']
+    assert not por_libro[sin_copias]['exito'] and not por_libro[inexistente]['exito']
+    assert (copias(con_una), copias(sin_copias), copias(con_dos)) == (0, 0, 1)
+
+    # Un segundo lote solo obtiene la copia que queda
+    exito, _, resultados = controller.crear_prestamos_lote(otro, [con_una, con_dos])
+    assert [r['exito'] for r in resultados] == [False, True]
+    assert copias(con_dos) == 0
+    verificar_consistencia()
+
+
+def test_devolver_lote_de_mas_de_mil_prestamos(controller):
+    libros = crear_libros([2] * 1200)
+    usuarios = crear_usuarios(4)
+    prestamo_ids = []
+    for i, usuario_id in enumerate(usuarios):
+        _, _, resultados = controller.crear_prestamos_lote(usuario_id, libros[i * 300:(i + 1) * 300])
+        prestamo_ids.extend(r['prestamo_id'] for r in resultados if r['exito'])
+    # Un segundo préstamo de los primeros 100 libros, para devolverlos por ISBN
+    _, _, resultados = controller.crear_prestamos_lote(usuarios[0], libros[:100])
+    assert len(prestamo_ids) == 1200 and all(r['exito'] for r in resultados)
+    verificar_consistencia()
+
+    parametros = []
+
+    def contar_parametros(conn, cursor, sentencia, params, contexto, executemany):
+        if not executemany:
+            parametros.append(len(params or ()))
+
+    session = db.get_session()
+    try:
+        isbns = session.scalars(select(Libro.ISBN).where(Libro.LibroID.in_(libros[:100]))).all()
+    finally:
+        session.close()
+
+    event.listen(db.engine, 'before_cursor_execute', contar_parametros)
+    try:
+        exito, mensaje, resultados = controller.devolver_lote(prestamo_ids=prestamo_ids, isbns=isbns)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar_parametros)
+
+    assert exito, mensaje
+    assert sum(r['exito'] for r in resultados) == 1300
+    # SQL Server admite 2100 parámetros por sentencia
+    assert max(parametros) <= 2100
+    assert all(copias(libro_id) == 2 for libro_id in (libros[0], libros[150], libros[-1]))
+    verificar_consistencia()
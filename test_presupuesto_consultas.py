@@ -0,0 +1,58 @@
+# test_presupuesto_consultas.py
+# Presupuesto de consultas SQL de las listas y la API sobre la base SQLite
+# sintética: una ruta que vuelva a hacer una consulta por fila (N+1) falla.
+#
+# Ejecutar: python -m pytest -q test_presupuesto_consultas.py
+
+import os
+import pytest
+import migraciones
+from benchmarks.datos_sinteticos import crear_base_sqlite
+from database import db
+from instrumentacion import verificar_ruta
+
+# Ruta -> consultas permitidas. Las listas cargan su página con una sola
+# consulta; los formularios suman las listas de selección de la caché.
+PRESUPUESTOS = {
+    '/': 1,
+    '/libros': 1,
+    '/libros?limit=100': 1,
+    '/libros/buscar?q=amor': 2,
+    '/libros/nuevo': 2,
+    '/usuarios': 1,
+    '/categorias': 1,
+    '/categorias/buscar?q=a': 1,
+    '/autores': 1,
+    '/autores/buscar?q=a': 1,
+    '/prestamos': 1,
+    '/prestamos/vencidos': 1,
+    '/prestamos/nuevo': 2,
+    '/prestamos/lote': 2,
+    '/reportes': 5,
+    '/api/libros': 1,
+    '/api/usuarios': 1,
+    '/api/prestamos': 1,
+    '/api/autocompletar?q=am': 3,
+    '/api/libros/exportar': 1,
+    '/api/usuarios/exportar': 1,
+    '/api/prestamos/exportar': 1,
+    '/prestamos/historial/exportar': 1,
+}
+
+
+@pytest.fixture(scope='module')
+def cliente():
+    ruta = crear_base_sqlite(libros=500, usuarios=200, prestamos=1000, autores=50)
+    migraciones.migrar()
+    from app import app
+    try:
+        yield app.test_client()
+    finally:
+        db.engine.dispose()
+        os.remove(ruta)
+
+
+@pytest.mark.parametrize('url', list(PRESUPUESTOS))
+def test_presupuesto_de_consultas(cliente, url):
+    respuesta = verificar_ruta(cliente, url, PRESUPUESTOS[url])
+    assert respuesta.status_code == 200